@@ -0,0 +1,32 @@
+# DB/contadores.py
+from DB.db import db
+from sqlalchemy.dialects import mysql, sqlite
+
+
+def upsert_sumar(modelo, claves, incrementos):
+    """
+    Suma 'incrementos' (dict columna -> delta) a la fila de 'modelo' identificada
+    por 'claves' (dict con la llave primaria), creándola si no existe.
+    Es una sola sentencia (INSERT ... ON DUPLICATE KEY UPDATE en MySQL), así
+    que dos transacciones concurrentes no pueden pisarse el conteo.
+    """
+    tabla = modelo.__table__
+    # Una fila nueva nunca arranca en negativo
+    valores = dict(claves, **{col: max(delta, 0) for col, delta in incrementos.items()})
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == 'mysql':
+        stmt = mysql.insert(tabla).values(**valores)
+        stmt = stmt.on_duplicate_key_update(
+            {col: tabla.c[col] + delta for col, delta in incrementos.items()}
+        )
+    elif dialecto == 'sqlite':
+        stmt = sqlite.insert(tabla).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in tabla.primary_key.columns],
+            set_={col: tabla.c[col] + delta for col, delta in incrementos.items()}
+        )
+    else:
+        raise NotImplementedError(f"upsert_sumar no soporta el dialecto '{dialecto}'")
+
+    db.session.execute(stmt)
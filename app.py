@@ -1,8 +1,9 @@
 # app.py
+import queue
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import (Flask, render_template, request, jsonify, abort,
-                   session, redirect, url_for, flash, Response)
+                   session, redirect, url_for, flash, Response, stream_with_context, send_file)
 from flask_login import (LoginManager, login_user, logout_user,
                          login_required, current_user)
 import random
@@ -17,7 +18,16 @@ from flask_bcrypt import Bcrypt
 from controllers.ticket_controller import TicketController
 from controllers.auth_controller import AuthController
 from controllers.catalogo_controller import CatalogoController
+from controllers.estadisticas_controller import EstadisticasController
 from utils.pdf_rl import crear_comprobante_rl
+from utils.exportacion import generar_csv, generar_xlsx, xlsx_disponible
+from utils.difusion_dashboard import difusor_dashboard, formato_sse, SSE_KEEPALIVE_SEGUNDOS
+from utils.cache_un_vuelo import metricas_caches
+from utils.cache_principales import cache_principales
+from utils.cache_pdf import cache_pdf, clave as clave_pdf
+from utils.pdf_lote import renderizar_lote
+from utils.prerender_pdf import cola_prerender
+from utils.codigos_qr import codigo_qr
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -37,6 +47,9 @@ login_manager.login_message_category = 'error'
 ticket_controller = TicketController()
 auth_controller = AuthController()
 catalogo_controller = CatalogoController()
+estadisticas_controller = EstadisticasController()
+difusor_dashboard.init_app(app, ticket_controller.get_stats_dashboard)
+cola_prerender.init_app(app, ticket_controller.get_datos_comprobante)
 
 
 @login_manager.user_loader
@@ -91,7 +104,9 @@ def login_post():
 @app.get("/admin/dashboard")
 @login_required
 def admin_dashboard():
-    return render_template("admin_dashboard.html")
+    return render_template("admin_dashboard.html",
+                           municipios=catalogo_controller.get_municipios(),
+                           oficinas=catalogo_controller.get_oficinas())
 
 
 @app.get("/logout")
@@ -111,13 +126,34 @@ def logout():
 def admin_turnos_get():
     query = request.args.get("q", "")
     vista = request.args.get("vista", "activos")
-    turnos = ticket_controller.buscar_turnos_admin(query, vista)
+    pagina = ticket_controller.buscar_turnos_admin(query, vista,
+                                                   cursor=request.args.get("cursor"),
+                                                   direccion=request.args.get("dir", "siguiente"))
     return render_template("admin_turnos.html",
-                           turnos=turnos,
+                           turnos=pagina['turnos'],
+                           siguiente=pagina['siguiente'],
+                           anterior=pagina['anterior'],
+                           oficinas=catalogo_controller.get_oficinas(),
                            query=query,
                            vista=vista)
 
 
+@app.get("/admin/turnos/json")
+@login_required
+def admin_turnos_json():
+    """ Misma búsqueda y paginación que /admin/turnos, en JSON. """
+    pagina = ticket_controller.buscar_turnos_admin(request.args.get("q", ""),
+                                                   request.args.get("vista", "activos"),
+                                                   cursor=request.args.get("cursor"),
+                                                   direccion=request.args.get("dir", "siguiente"))
+    return jsonify({
+        'turnos': [dict(t.como_dict(), fecha_solicitud=t.fecha_solicitud.isoformat())
+                   for t in pagina['turnos']],
+        'siguiente': pagina['siguiente'],
+        'anterior': pagina['anterior']
+    })
+
+
 @app.post("/admin/turnos/cambiar_estado")
 @login_required
 def admin_cambiar_estado():
@@ -177,6 +213,102 @@ def admin_crear_post():
         return redirect(url_for('admin_crear_get'))
 
 
+@app.get("/admin/turnos/exportar")
+@login_required
+def admin_exportar_turnos():
+    """
+    Exporta (CSV o XLSX) los turnos que cumplen los mismos filtros del
+    listado, más rango de fechas de cita y oficina. La respuesta se genera
+    por trozos mientras se lee la BD.
+    """
+    formato = request.args.get("formato", "csv")
+    if formato == "xlsx" and not xlsx_disponible():
+        flash("La exportación a Excel requiere instalar openpyxl. Use CSV.", "error")
+        return redirect(url_for('admin_turnos_get'))
+
+    try:
+        desde = datetime.strptime(request.args["desde"], "%Y-%m-%d").date() if request.args.get("desde") else None
+        hasta = datetime.strptime(request.args["hasta"], "%Y-%m-%d").date() if request.args.get("hasta") else None
+    except ValueError:
+        flash("Fechas de exportación inválidas.", "error")
+        return redirect(url_for('admin_turnos_get'))
+
+    filas = ticket_controller.exportar_turnos(request.args.get("q", ""),
+                                              request.args.get("vista", "todos"),
+                                              desde=desde, hasta=hasta,
+                                              id_oficina=request.args.get("oficina", type=int))
+    nombre = f"turnos_{datetime.now():%Y%m%d_%H%M}.{formato if formato == 'xlsx' else 'csv'}"
+    if formato == "xlsx":
+        cuerpo = generar_xlsx(filas)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        cuerpo = generar_csv(filas)
+        mimetype = "text/csv; charset=utf-8"
+
+    # stream_with_context mantiene viva la sesión de BD mientras se envían los trozos
+    return Response(stream_with_context(cuerpo), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={nombre}"})
+
+
+@app.get("/admin/turnos/lote_pdf")
+@login_required
+def admin_lote_pdf():
+    """
+    Impresión del día: la lista y todos los comprobantes de una oficina en
+    una fecha, en un ZIP de PDFs (ver utils/pdf_lote.py).
+    """
+    id_oficina = request.args.get("oficina", type=int)
+    try:
+        fecha = datetime.strptime(request.args.get("fecha", ""), "%Y-%m-%d").date()
+    except ValueError:
+        fecha = None
+    if not id_oficina or not fecha:
+        flash("Seleccione una oficina y una fecha para imprimir.", "error")
+        return redirect(url_for('admin_turnos_get'))
+
+    lista_datos = ticket_controller.get_datos_comprobantes_dia(id_oficina, fecha)
+    if not lista_datos:
+        flash("No hay turnos para esa oficina en esa fecha.", "error")
+        return redirect(url_for('admin_turnos_get'))
+
+    procesos = app.config.get('PDF_LOTE_PROCESOS', 0)
+
+    def enviar():
+        # Los bloques se envían conforme se dibujan: el total se conoce hasta el final
+        reporte = yield from renderizar_lote(lista_datos[0]['oficina'], fecha, lista_datos, procesos=procesos)
+        app.logger.info("Impresión del día: %d páginas en %.2f s (%.1f páginas/s, %d procesos)",
+                        reporte['paginas'], reporte['segundos'], reporte['paginas_por_segundo'], reporte['procesos'])
+
+    nombre = f"turnos_{id_oficina}_{fecha:%Y%m%d}.zip"
+    return Response(enviar(), mimetype="application/zip",
+                    headers={"Content-Disposition": f"attachment; filename={nombre}"})
+
+
+@app.get("/admin/turnos/importar")
+@login_required
+def admin_importar_get():
+    return render_template("admin_importar_turnos.html", reporte=None)
+
+
+@app.post("/admin/turnos/importar")
+@login_required
+def admin_importar_post():
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        flash("Seleccione un archivo CSV.", "error")
+        return redirect(url_for('admin_importar_get'))
+
+    reporte = ticket_controller.importar_turnos_csv(archivo.read())
+    if reporte['error']:
+        flash(reporte['error'], "error")
+        return redirect(url_for('admin_importar_get'))
+
+    flash(f"Importación terminada: {reporte['creados']} turnos creados, "
+          f"{reporte['fallidos']} filas con error.",
+          "success" if not reporte['fallidos'] else "error")
+    return render_template("admin_importar_turnos.html", reporte=reporte)
+
+
 @app.get("/admin/turnos/editar/<int:id_turno>")
 @login_required
 def admin_editar_get(id_turno):
@@ -219,6 +351,65 @@ def admin_dashboard_stats():
         return jsonify({"error": "No se pudieron cargar las estadísticas"}), 500
 
 
+@app.get("/admin/metricas")
+@login_required
+def admin_metricas():
+    """
+    Contadores de los caches de lecturas del admin (aciertos, fallos,
+    agrupadas, invalidaciones), del cache de principales del login y de la
+    cola de pre-render de comprobantes (profundidad y retraso).
+    """
+    return jsonify({"caches": metricas_caches(), "principales": cache_principales.metricas(),
+                    "prerender_pdf": cola_prerender.metricas()})
+
+
+@app.get("/admin/dashboard/stream")
+@login_required
+def admin_dashboard_stream():
+    """
+    Server-Sent Events: primero la foto completa ('completo') y después solo
+    las diferencias ('delta') cada vez que cambian las estadísticas. Todos los
+    dashboards comparten un mismo cálculo por cambio (utils/difusion_dashboard.py).
+    """
+    def eventos():
+        with difusor_dashboard.suscribir() as cola:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento, datos = cola.get(timeout=SSE_KEEPALIVE_SEGUNDOS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield formato_sse(evento, datos)
+
+    # Sin stream_with_context: la conexión puede durar horas y no usa la sesión de BD
+    return Response(eventos(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/admin/dashboard/series")
+@login_required
+def admin_dashboard_series():
+    """
+    Series de tiempo (altas, resoluciones, cancelaciones) para las gráficas
+    de línea. Parámetros: granularidad=hora|dia|semana, desde, hasta
+    (AAAA-MM-DD, por defecto los últimos 30 días), oficina, municipio.
+    """
+    try:
+        hasta = datetime.strptime(request.args["hasta"], "%Y-%m-%d").date() \
+            if request.args.get("hasta") else datetime.now().date()
+        desde = datetime.strptime(request.args["desde"], "%Y-%m-%d").date() \
+            if request.args.get("desde") else hasta - timedelta(days=29)
+        datos = estadisticas_controller.get_series(request.args.get("granularidad", "dia"), desde, hasta,
+                                                   id_oficina=request.args.get("oficina", type=int),
+                                                   id_municipio=request.args.get("municipio", type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if datos is None:
+        return jsonify({"error": "No se pudieron cargar las series"}), 500
+    return jsonify(datos)
+
+
 # ---------------------------
 # RUTAS CRUD CATÁLOGOS
 # ---------------------------
@@ -570,17 +761,32 @@ def eliminar_post():
 # ---------------------------
 # API: Oficinas por municipio
 # ---------------------------
+def _respuesta_json_precalculada(precalculado):
+    """
+    Sirve un JsonPrecalculado con ETag fuerte y Cache-Control; si el cliente
+    (o un proxy) manda If-None-Match con el mismo ETag, responde 304 sin cuerpo.
+    """
+    respuesta = Response(precalculado.cuerpo, mimetype="application/json")
+    respuesta.set_etag(precalculado.etag)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = app.config.get('API_OFICINAS_MAX_AGE', 60)
+    return respuesta.make_conditional(request)
+
+
 @app.get("/api/oficinas")
 def api_oficinas():
     id_municipio = request.args.get("id_municipio", type=int)
     if not id_municipio:
         return jsonify([])
 
-    oficinas = ticket_controller.obtener_oficinas_por_municipio(id_municipio)
-    oficinas_json = [
-        {'id_oficina': o.id_oficina, 'oficina': o.oficina} for o in oficinas
-    ]
-    return jsonify(oficinas_json)
+    # El JSON ya viene serializado desde el cache de catálogos
+    return _respuesta_json_precalculada(ticket_controller.obtener_json_oficinas(id_municipio))
+
+
+@app.get("/api/oficinas/mapa")
+def api_oficinas_mapa():
+    """ Todas las oficinas de todos los municipios en una sola respuesta: {id_municipio: [...]} """
+    return _respuesta_json_precalculada(ticket_controller.obtener_json_mapa_oficinas())
 
 
 # ---------------------------
@@ -588,20 +794,70 @@ def api_oficinas():
 # ---------------------------
 @app.get("/ticket/pdf/<int:id_turno>/<string:curp>")
 def generar_pdf(id_turno, curp):
+    """
+    El comprobante del turno. El ETag es la llave de sus datos en el cache
+    (cambia si el turno se edita o cambia el diseño), así que un navegador que
+    ya lo tiene recibe 304 sin renderizar nada. Las respuestas completas llevan
+    Content-Length y aceptan Range para reanudar descargas interrumpidas.
+    """
     datos = ticket_controller.get_datos_comprobante(id_turno, curp)
 
     if not datos:
         return "Error: Ticket no encontrado o datos incorrectos.", 404
 
-    pdf_bytes = crear_comprobante_rl(datos)
+    etag = clave_pdf(datos)
+    if request.if_none_match.contains_weak(etag):
+        respuesta = Response(status=304)
+        respuesta.set_etag(etag)
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        return respuesta
+
+    # Mismos datos -> mismo archivo en disco; solo se renderiza si no está.
+    # Normalmente ya lo dejó ahí el pre-render al crear el turno.
+    nombre = f"turno_{datos['numero_turno']}_{curp}.pdf"
+    cola_prerender.esperar(datos)
+    ruta, pdf_bytes = cache_pdf.obtener(datos, crear_comprobante_rl)
+    respuesta = None
+    if ruta:
+        try:
+            # send_file entrega el archivo con wsgi.file_wrapper (sendfile en gunicorn)
+            # y resuelve If-Range/Range con el ETag dado (no el del mtime, que cambia en cada acierto)
+            respuesta = send_file(ruta, mimetype="application/pdf", download_name=nombre, etag=etag)
+        except FileNotFoundError:
+            pdf_bytes = crear_comprobante_rl(datos)  # Otro proceso lo purgó justo ahora
+
+    if respuesta is None:
+        respuesta = Response(
+            pdf_bytes,
+            mimetype="application/pdf",
+            headers={
+                "Content-Disposition": f"inline;filename={nombre}"
+            }
+        )
+        respuesta.set_etag(etag)
+        respuesta = respuesta.make_conditional(request, accept_ranges=True, complete_length=len(pdf_bytes))
+
+    # Datos personales: solo el navegador lo guarda, y revalida antes de reutilizarlo
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+@app.get("/ticket/qr/<int:id_turno>/<string:curp>/<any(png, svg):formato>")
+def ticket_qr(id_turno, curp, formato):
+    """ El QR del turno como imagen, para mostrarlo en la página sin generar el PDF. """
+    contenido = ticket_controller.get_codigo_qr(id_turno, curp)
+    if not contenido:
+        return "Error: Ticket no encontrado o datos incorrectos.", 404
 
-    return Response(
-        pdf_bytes,
-        mimetype="application/pdf",
-        headers={
-            "Content-Disposition": f"inline;filename=turno_{datos['numero_turno']}_{curp}.pdf"
-        }
-    )
+    codigo = codigo_qr(contenido)
+    if formato == "svg":
+        cuerpo, mimetype = codigo.svg(), "image/svg+xml"
+    else:
+        cuerpo, mimetype = codigo.png(), "image/png"
+    # El contenido del QR de un turno no cambia
+    return Response(cuerpo, mimetype=mimetype, headers={"Cache-Control": "private, max-age=86400"})
 
 
 # ---------------------------
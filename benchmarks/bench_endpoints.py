@@ -0,0 +1,206 @@
+# benchmarks/bench_endpoints.py
+"""
+Benchmark de carga de los endpoints públicos: crear turno, /ver, /api/oficinas
+y /ticket/pdf. Simula ciudadanos concurrentes con el test client de Flask y
+reporta rendimiento, latencias p50/p95/p99 y consultas SQL por petición.
+
+Uso (desde la raíz del repo, contra una BD DEDICADA):
+
+    export DATABASE_URL="mysql+pymysql://root:@localhost:3306/ticket_bench"
+    python -m benchmarks.bench_endpoints --sembrar --turnos 300000
+    python -m benchmarks.bench_endpoints --guardar antes.json
+    # ... aplicar el cambio ...
+    python -m benchmarks.bench_endpoints --guardar despues.json --comparar antes.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import func
+
+from benchmarks.datos import sembrar, curp_sintetica, ContadorConsultas, NIVELES, ASUNTOS
+from app import app
+from DB.db import db
+from models.db_models import OficinasRegionales, Turnos, Solicitantes
+
+ESCENARIOS = ('crear', 'ver', 'api_oficinas', 'pdf')
+
+
+def percentil(valores, p):
+    """ Percentil por rango más cercano (valores ya ordenados). """
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class Escenarios:
+    """ Genera la petición de cada escenario con datos que existen en la BD sembrada. """
+
+    def __init__(self, semilla):
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._siguiente_curp = 0
+        with app.app_context():
+            self.oficinas = db.session.execute(
+                db.select(OficinasRegionales.id_oficina, OficinasRegionales.id_municipio)
+            ).all()
+            self.turnos = db.session.execute(
+                db.select(Turnos.id_turno, Turnos.numero_turno, Solicitantes.curp)
+                .join(Turnos.solicitante)
+                .order_by(Turnos.id_turno.desc())
+                .limit(5000)
+            ).all()
+            self._siguiente_curp = db.session.scalar(db.select(func.max(Solicitantes.id_solicitante))) or 0
+        self._siguiente_curp += 10_000_000  # CURPs nuevas que no chocan con la siembra
+
+    def _nueva_curp(self):
+        with self._lock:
+            self._siguiente_curp += 1
+            return curp_sintetica(self._siguiente_curp)
+
+    def peticion(self, cliente, escenario):
+        if escenario == 'crear':
+            id_oficina, id_municipio = self._rnd.choice(self.oficinas)
+            respuesta = cliente.post('/crear', data={
+                'nombreCompleto': 'TRAMITANTE BENCHMARK', 'curp': self._nueva_curp(),
+                'nombre': 'ALUMNO', 'paterno': 'PRUEBA', 'materno': 'CARGA',
+                'telefono': '', 'celular': '5512345678', 'correo': 'bench@example.com',
+                'nivel': self._rnd.randint(1, len(NIVELES)), 'municipio': id_municipio,
+                'oficina': id_oficina, 'asunto': self._rnd.randint(1, len(ASUNTOS))
+            })
+            # Con éxito se renderiza ticket_generado.html; un error redirige a /crear
+            return respuesta.status_code == 200
+        if escenario == 'ver':
+            _, numero_turno, curp = self._rnd.choice(self.turnos)
+            respuesta = cliente.get('/ver', query_string={'turno': numero_turno, 'curp': curp})
+            return respuesta.status_code == 200
+        if escenario == 'api_oficinas':
+            _, id_municipio = self._rnd.choice(self.oficinas)
+            respuesta = cliente.get('/api/oficinas', query_string={'id_municipio': id_municipio})
+            return respuesta.status_code == 200
+        if escenario == 'pdf':
+            id_turno, _, curp = self._rnd.choice(self.turnos)
+            respuesta = cliente.get(f'/ticket/pdf/{id_turno}/{curp}')
+            return respuesta.status_code == 200
+        raise ValueError(f"Escenario desconocido: {escenario}")
+
+
+def correr_escenario(escenarios, escenario, peticiones, concurrencia, contador):
+    latencias = []
+    consultas = []
+    errores = 0
+    lock = threading.Lock()
+
+    def trabajador(n):
+        nonlocal errores
+        cliente = app.test_client()
+        for _ in range(n):
+            contador.reiniciar()
+            inicio = time.perf_counter()
+            try:
+                ok = escenarios.peticion(cliente, escenario)
+            except Exception as e:
+                print(f"  ! {escenario}: {e}")
+                ok = False
+            transcurrido = time.perf_counter() - inicio
+            with lock:
+                latencias.append(transcurrido)
+                consultas.append(contador.total)
+                if not ok:
+                    errores += 1
+
+    reparto = [peticiones // concurrencia + (1 if i < peticiones % concurrencia else 0)
+               for i in range(concurrencia)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(trabajador, reparto))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'concurrencia': concurrencia,
+        'rps': round(len(latencias) / duracion, 2) if duracion else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'consultas_por_peticion': round(sum(consultas) / len(consultas), 2) if consultas else 0.0
+    }
+
+
+def imprimir(resultados, base=None):
+    columnas = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'consultas_por_peticion')
+    print(f"{'escenario':<14}{'peticiones':>11}{'errores':>9}" + ''.join(f"{c:>24}" for c in columnas))
+    for escenario, r in resultados['escenarios'].items():
+        linea = f"{escenario:<14}{r['peticiones']:>11}{r['errores']:>9}"
+        for c in columnas:
+            celda = f"{r[c]}"
+            anterior = (base or {}).get('escenarios', {}).get(escenario, {}).get(c)
+            if anterior:
+                celda += f" ({(r[c] - anterior) / anterior * 100:+.1f}%)"
+            linea += f"{celda:>24}"
+        print(linea)
+
+
+def version_git():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de los endpoints de turnos.")
+    parser.add_argument('--sembrar', action='store_true', help="Recrea y siembra la BD antes de medir.")
+    parser.add_argument('--municipios', type=int, default=125)
+    parser.add_argument('--oficinas-por-municipio', type=int, default=2)
+    parser.add_argument('--turnos', type=int, default=300_000)
+    parser.add_argument('--escenarios', nargs='+', choices=ESCENARIOS, default=list(ESCENARIOS))
+    parser.add_argument('--peticiones', type=int, default=500, help="Peticiones por escenario.")
+    parser.add_argument('--concurrencia', type=int, default=8, help="Ciudadanos simultáneos.")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--guardar', help="Guarda los resultados en este archivo JSON.")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para mostrar la diferencia.")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.sembrar:
+            inicio = time.perf_counter()
+            sembrar(args.municipios, args.oficinas_por_municipio, args.turnos, args.semilla)
+            print(f"BD sembrada con {args.turnos} turnos en {time.perf_counter() - inicio:.1f}s")
+        contador = ContadorConsultas(db.engine)
+
+    escenarios = Escenarios(args.semilla)
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': version_git(),
+        'bd': app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1],
+        'escenarios': {}
+    }
+    for escenario in args.escenarios:
+        resultados['escenarios'][escenario] = correr_escenario(
+            escenarios, escenario, args.peticiones, args.concurrencia, contador
+        )
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"Comparando contra {args.comparar} (commit {base.get('commit')})")
+    imprimir(resultados, base)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.guardar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_lecturas.py
+"""
+Compara, para las páginas de listado del admin, cargar objetos ORM completos
+(joinedload, como antes) contra las proyecciones por columnas en registros
+con __slots__ (TurnoResumen, HorarioResumen). Mide tiempo por página y
+memoria asignada (tracemalloc) incluyendo el render de la plantilla.
+
+Uso (desde la raíz del repo, contra una BD sembrada con bench_endpoints --sembrar):
+
+    export DATABASE_URL="mysql+pymysql://root:@localhost:3306/ticket_bench"
+    python -m benchmarks.bench_lecturas --repeticiones 200
+"""
+import argparse
+import time
+import tracemalloc
+
+from flask import render_template
+from sqlalchemy.orm import joinedload
+
+from app import app, ticket_controller, catalogo_controller
+from DB.db import db
+from models.db_models import Turnos, HorariosAtencion
+from models.horario import HorarioResumen
+from utils.paginacion import TAMANO_PAGINA
+from benchmarks.bench_endpoints import percentil
+
+
+class _TurnoOrmPlano:
+    """ Adapta un Turnos ORM a los nombres planos que usa la plantilla actual (el costo medido es la hidratación). """
+
+    def __init__(self, turno):
+        self.id_turno = turno.id_turno
+        self.numero_turno = turno.numero_turno
+        self.fecha_solicitud = turno.fecha_solicitud
+        self.estado = turno.estado
+        self.nombre_solicitante = turno.solicitante.nombre_solicitante
+        self.paterno_solicitante = turno.solicitante.paterno_solicitante
+        self.curp = turno.solicitante.curp
+        self.oficina = turno.oficina.oficina
+
+
+def turnos_orm():
+    """ La consulta anterior: objetos Turnos con solicitante y oficina por joinedload. """
+    turnos = db.session.scalars(
+        db.select(Turnos)
+        .options(joinedload(Turnos.solicitante), joinedload(Turnos.oficina))
+        .join(Turnos.solicitante)
+        .where(Turnos.estado != 'cancelado')
+        .order_by(Turnos.fecha_solicitud.desc(), Turnos.id_turno.desc())
+        .limit(TAMANO_PAGINA + 1)
+    ).all()
+    return [_TurnoOrmPlano(t) for t in turnos[:TAMANO_PAGINA]]
+
+
+def turnos_proyeccion():
+    # La consulta directa: buscar_turnos_admin('') saldría del cache de un vuelo
+    return ticket_controller._consultar_turnos_admin('', 'activos', None, 'siguiente')['turnos']
+
+
+def horarios_orm():
+    """ La consulta anterior: objetos HorariosAtencion con su oficina por joinedload. """
+    horarios = db.session.scalars(
+        db.select(HorariosAtencion)
+        .options(joinedload(HorariosAtencion.oficina))
+        .order_by(HorariosAtencion.id_oficina, HorariosAtencion.dia_semana)
+    ).all()
+    return [HorarioResumen(h.id_horario, h.id_oficina, h.oficina.oficina if h.oficina else None,
+                           h.dia_semana, h.hora_apertura, h.hora_cierre, h.max_turnos_dia)
+            for h in horarios]
+
+
+def horarios_proyeccion():
+    return catalogo_controller._consultar_horarios()
+
+
+def render_turnos(turnos):
+    return render_template("admin_turnos.html", turnos=turnos, siguiente=None, anterior=None,
+                           oficinas=(), query='', vista='activos')
+
+
+def render_horarios(horarios):
+    return render_template("admin_cat_horarios.html", horarios=horarios,
+                           oficinas=catalogo_controller.get_oficinas())
+
+
+def medir(cargar, renderizar, repeticiones):
+    """ Tiempo por página (ms) y memoria asignada en la última repetición (KiB). """
+    tiempos = []
+    for _ in range(repeticiones):
+        with app.test_request_context():
+            inicio = time.perf_counter()
+            renderizar(cargar())
+            tiempos.append(time.perf_counter() - inicio)
+            db.session.remove()  # Identity map vacío en cada página, como en una petición real
+
+    with app.test_request_context():
+        tracemalloc.start()
+        renderizar(cargar())
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.session.remove()
+
+    tiempos.sort()
+    return {'p50_ms': percentil(tiempos, 50) * 1000, 'p95_ms': percentil(tiempos, 95) * 1000,
+            'memoria_kib': pico / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM completo vs. proyecciones en los listados del admin.")
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    casos = [
+        ('turnos ORM', turnos_orm, render_turnos),
+        ('turnos proyección', turnos_proyeccion, render_turnos),
+        ('horarios ORM', horarios_orm, render_horarios),
+        ('horarios proyección', horarios_proyeccion, render_horarios),
+    ]
+    print(f"{'caso':<22}{'p50 ms':>10}{'p95 ms':>10}{'memoria KiB':>14}")
+    for nombre, cargar, renderizar in casos:
+        r = medir(cargar, renderizar, args.repeticiones)
+        print(f"{nombre:<22}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['memoria_kib']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
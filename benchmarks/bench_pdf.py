@@ -0,0 +1,87 @@
+# benchmarks/bench_pdf.py
+"""
+Micro-benchmark del comprobante PDF: modo directo (los PNG se leen, comprimen
+y comprimen en cada página) contra el modo plantilla (logos decodificados y
+reducidos a su tamaño impreso una vez por proceso, y encabezado como forma,
+comprimido una vez por documento).
+--paginas N dibuja N comprobantes en el mismo documento, como el lote del día
+(utils/pdf_lote.py). No usa la BD.
+
+Uso (desde la raíz del repo):
+
+    python -m benchmarks.bench_pdf --repeticiones 300
+    python -m benchmarks.bench_pdf --repeticiones 20 --paginas 25
+"""
+import argparse
+import io
+import time
+from datetime import datetime
+
+from reportlab.lib.pagesizes import LETTER
+from reportlab.pdfgen import canvas
+
+from utils.pdf_rl import crear_comprobante_rl, dibujar_comprobante
+from benchmarks.bench_endpoints import percentil
+from benchmarks.datos import curp_sintetica
+
+DATOS = {
+    'numero_turno': 1234,
+    'fecha_solicitud': datetime(2025, 3, 10, 9, 30),
+    'hora_solicitud': datetime(2025, 3, 10, 9, 30).time(),
+    'nombre_tramitante': 'MARÍA FERNANDA LÓPEZ PEÑA',
+    'nombre_solicitante': 'JOSÉ',
+    'paterno_solicitante': 'LÓPEZ',
+    'materno_solicitante': 'PEÑA',
+    'curp': curp_sintetica(1234),
+    'codigo_qr': curp_sintetica(1234),
+    'telefono': '',
+    'celular': '5512345678',
+    'correo': 'bench@example.com',
+    'nivel': 'Secundaria',
+    'descripcion': 'Duplicado de certificado',
+    'municipio': 'Municipio 001',
+    'oficina': 'Oficina Regional 001-1',
+}
+
+
+def documento(plantilla, paginas):
+    if paginas == 1:
+        return crear_comprobante_rl(DATOS, plantilla=plantilla)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=LETTER)
+    for _ in range(paginas):
+        dibujar_comprobante(c, DATOS, plantilla)
+    c.save()
+    return buffer.getvalue()
+
+
+def medir(plantilla, repeticiones, paginas):
+    documento(plantilla, paginas)  # Calentamiento (y decodificación de logos)
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        documento(plantilla, paginas)
+        tiempos.append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio_total
+    tiempos.sort()
+    return {'pdf_por_segundo': repeticiones / total,
+            'paginas_por_segundo': repeticiones * paginas / total,
+            'p50_ms': percentil(tiempos, 50) * 1000, 'p95_ms': percentil(tiempos, 95) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDFs por segundo: modo directo vs. plantilla.")
+    parser.add_argument('--repeticiones', type=int, default=300)
+    parser.add_argument('--paginas', type=int, default=1, help="comprobantes por documento")
+    args = parser.parse_args()
+
+    print(f"{'modo':<12}{'PDF/s':>10}{'págs/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for nombre, plantilla in (('directo', False), ('plantilla', True)):
+        r = medir(plantilla, args.repeticiones, args.paginas)
+        print(f"{nombre:<12}{r['pdf_por_segundo']:>10.1f}{r['paginas_por_segundo']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
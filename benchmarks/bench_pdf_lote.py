@@ -0,0 +1,62 @@
+# benchmarks/bench_pdf_lote.py
+"""
+Páginas por segundo de la impresión del día (utils/pdf_lote.py) según el
+número de procesos, y segundos hasta el primer bloque de comprobantes (lo
+que espera el navegador antes de empezar a recibirlos). Con 1 proceso los
+bloques se dibujan en este proceso; con más se reparten en el pool. No usa
+la BD.
+
+Uso (desde la raíz del repo):
+
+    python -m benchmarks.bench_pdf_lote --turnos 300 --procesos 1 2 4 8
+"""
+import argparse
+import os
+import time
+from datetime import date
+
+from utils.pdf_lote import renderizar_lote
+from benchmarks.bench_pdf import DATOS
+from benchmarks.datos import curp_sintetica
+
+
+def lista_sintetica(num_turnos):
+    return [dict(DATOS, numero_turno=n, curp=curp_sintetica(n), codigo_qr=curp_sintetica(n)) for n in range(1, num_turnos + 1)]
+
+
+def medir(lista_datos, procesos):
+    """ Consume el ZIP como lo haría la respuesta; agrega 'bytes' y 'primer_bloque_s' al reporte. """
+    generador = renderizar_lote(DATOS['oficina'], date(2025, 3, 10), lista_datos, procesos=procesos)
+    inicio = time.perf_counter()
+    total = 0
+    primer_bloque = None
+    trozos = 0
+    while True:
+        try:
+            trozo = next(generador)
+        except StopIteration as fin:
+            return dict(fin.value, bytes=total, primer_bloque_s=primer_bloque or 0.0)
+        total += len(trozo)
+        trozos += 1
+        if trozos == 2:  # La lista del día y el primer bloque de comprobantes
+            primer_bloque = time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Páginas/s de la impresión del día por número de procesos.")
+    parser.add_argument('--turnos', type=int, default=300)
+    parser.add_argument('--procesos', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    lista_datos = lista_sintetica(args.turnos)
+    print(f"{'procesos':<10}{'páginas':>10}{'segundos':>10}{'páginas/s':>12}{'1er bloque s':>14}{'MB':>8}")
+    for procesos in args.procesos:
+        medir(lista_datos[:procesos], procesos)  # Calentamiento: arranca el pool y decodifica los logos
+        r = medir(lista_datos, procesos)
+        print(f"{r['procesos']:<10}{r['paginas']:>10}{r['segundos']:>10.2f}{r['paginas_por_segundo']:>12.1f}"
+              f"{r['primer_bloque_s']:>14.2f}{r['bytes'] / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
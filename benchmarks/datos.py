@@ -0,0 +1,201 @@
+# benchmarks/datos.py
+"""
+Siembra una BD local con un catálogo realista y un historial grande de turnos,
+para los benchmarks de este directorio.
+
+La BD se toma de DATABASE_URL (ver config.py). Usar SIEMPRE una BD dedicada:
+sembrar() borra y recrea todas las tablas.
+"""
+import random
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import event, SmallInteger
+from sqlalchemy.dialects.mysql import TINYINT
+from sqlalchemy.ext.compiler import compiles
+
+from DB.db import db
+from models.db_models import (
+    Municipios, NivelesEducativos, Asuntos, OficinasRegionales, HorariosAtencion,
+    ContadorTurnos, Solicitantes, Turnos, ReservasHorario, OcupacionOficinaDia, ResumenTurnos,
+    EstadisticasDia
+)
+from utils.agenda import DIAS_SEMANA_ES, SLOT_DURATION_MINUTES
+from utils import indice_busqueda
+
+
+# --- Compatibilidad para correr los benchmarks sobre SQLite ---
+# (los modelos usan tipos de MySQL; en SQLite un PK SMALLINT no es autoincremental)
+@compiles(TINYINT, 'sqlite')
+@compiles(SmallInteger, 'sqlite')
+def _entero_sqlite(tipo, compilador, **kw):
+    return 'INTEGER'
+
+
+NIVELES = ['Preescolar', 'Primaria', 'Secundaria', 'Media Superior']
+ASUNTOS = ['Inscripción', 'Reinscripción', 'Cambio de escuela', 'Revalidación de estudios',
+           'Duplicado de certificado', 'Aclaración de calificaciones']
+NOMBRES = ['JUAN', 'MARIA', 'JOSE', 'GUADALUPE', 'LUIS', 'ANA', 'CARLOS', 'SOFIA', 'MIGUEL', 'VALERIA']
+APELLIDOS = ['HERNANDEZ', 'GARCIA', 'MARTINEZ', 'LOPEZ', 'GONZALEZ', 'PEREZ', 'RODRIGUEZ',
+             'SANCHEZ', 'RAMIREZ', 'CRUZ', 'FLORES', 'GOMEZ']
+
+HORA_APERTURA = time(9, 0)
+HORA_CIERRE = time(15, 0)
+SLOTS_POR_DIA = 12  # 09:00 a 14:30, cada 30 minutos
+TAMANO_LOTE = 5000
+
+
+def curp_sintetica(n):
+    """ CURP ficticia de 18 caracteres, única por n. """
+    return f"BNCH{n:010d}XXXX"
+
+
+def sembrar(num_municipios=125, oficinas_por_municipio=2, num_turnos=300_000, semilla=42):
+    """
+    Recrea el esquema y lo llena con:
+    - municipios, oficinas, niveles y asuntos,
+    - horario lunes a viernes 09:00-15:00 para cada oficina,
+    - 'num_turnos' turnos históricos (hacia atrás desde ayer), cada uno con
+      su solicitante, más reservas_horario, ocupacion_oficina_dia, resumen_turnos,
+      estadisticas_dia, indice_busqueda y contadores coherentes.
+    Los días a partir de hoy quedan libres para crear turnos nuevos.
+    """
+    rnd = random.Random(semilla)
+    db.drop_all()
+    db.create_all()
+
+    db.session.execute(db.insert(Municipios), [
+        {'id_municipio': i, 'municipio': f'Municipio {i:03d}'} for i in range(1, num_municipios + 1)
+    ])
+    db.session.execute(db.insert(NivelesEducativos), [
+        {'id_nivel': i, 'nivel': nivel} for i, nivel in enumerate(NIVELES, start=1)
+    ])
+    db.session.execute(db.insert(Asuntos), [
+        {'id_asunto': i, 'descripcion': asunto} for i, asunto in enumerate(ASUNTOS, start=1)
+    ])
+
+    oficinas = []
+    for id_municipio in range(1, num_municipios + 1):
+        for j in range(oficinas_por_municipio):
+            oficinas.append({
+                'id_oficina': len(oficinas) + 1,
+                'oficina': f'Oficina Regional {id_municipio:03d}-{j + 1}',
+                'id_municipio': id_municipio
+            })
+    db.session.execute(db.insert(OficinasRegionales), oficinas)
+
+    db.session.execute(db.insert(HorariosAtencion), [
+        {'id_oficina': o['id_oficina'], 'dia_semana': DIAS_SEMANA_ES[d],
+         'hora_apertura': HORA_APERTURA, 'hora_cierre': HORA_CIERRE, 'max_turnos_dia': SLOTS_POR_DIA}
+        for o in oficinas for d in range(5)
+    ])
+
+    # --- Historial: se reparten los turnos entre oficinas, llenando días hábiles hacia atrás ---
+    ultimo_folio = {}
+    ocupacion = {}
+    resumen = {}
+    series = {}
+    solicitantes, turnos, reservas = [], [], []
+    siguiente_slot = {o['id_oficina']: (date.today() - timedelta(days=1), 0) for o in oficinas}
+    paso = timedelta(minutes=SLOT_DURATION_MINUTES)
+
+    for n in range(1, num_turnos + 1):
+        oficina = oficinas[rnd.randrange(len(oficinas))]
+        id_oficina = oficina['id_oficina']
+        fecha, slot = siguiente_slot[id_oficina]
+        while fecha.weekday() >= 5:
+            fecha -= timedelta(days=1)
+        hora = (datetime.combine(fecha, HORA_APERTURA) + slot * paso).time()
+        siguiente_slot[id_oficina] = (fecha, slot + 1) if slot + 1 < SLOTS_POR_DIA \
+            else (fecha - timedelta(days=1), 0)
+
+        folio = ultimo_folio.get(oficina['id_municipio'], 0) + 1
+        ultimo_folio[oficina['id_municipio']] = folio
+        estado = rnd.choices(['resuelto', 'pendiente', 'cancelado'], weights=[80, 12, 8])[0]
+        curp = curp_sintetica(n)
+
+        solicitantes.append({
+            'id_solicitante': n,
+            'nombre_tramitante': f'{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}',
+            'nombre_solicitante': rnd.choice(NOMBRES),
+            'paterno_solicitante': rnd.choice(APELLIDOS),
+            'materno_solicitante': rnd.choice(APELLIDOS),
+            'curp': curp,
+            'celular': f'55{n:08d}',
+            'correo': f'bench{n}@example.com'
+        })
+        turnos.append({
+            'id_turno': n, 'id_solicitante': n, 'id_oficina': id_oficina, 'numero_turno': folio,
+            'fecha_solicitud': datetime.combine(fecha, hora), 'hora_solicitud': hora,
+            'id_nivel': rnd.randint(1, len(NIVELES)), 'id_asunto': rnd.randint(1, len(ASUNTOS)),
+            'estado': estado, 'codigo_qr': curp
+        })
+        clave_resumen = (oficina['id_municipio'], id_oficina, estado, fecha)
+        resumen[clave_resumen] = resumen.get(clave_resumen, 0) + 1
+        # Series: el alta se pidió 1-14 días antes de la cita; se resolvió o canceló el día de la cita
+        for dia, tipo in ((fecha - timedelta(days=rnd.randint(1, 14)), 'creado'), (fecha, estado)):
+            if tipo != 'pendiente':
+                clave_serie = (dia, oficina['id_municipio'], id_oficina, tipo)
+                series[clave_serie] = series.get(clave_serie, 0) + 1
+        if estado != 'cancelado':
+            reservas.append({'id_oficina': id_oficina, 'fecha': fecha, 'hora': hora, 'id_turno': n})
+            ocupacion[(id_oficina, fecha)] = ocupacion.get((id_oficina, fecha), 0) + 1
+
+        if len(turnos) >= TAMANO_LOTE:
+            _insertar_lote(solicitantes, turnos, reservas)
+
+    _insertar_lote(solicitantes, turnos, reservas)
+
+    filas_ocupacion = [{'id_oficina': k[0], 'fecha': k[1], 'turnos_asignados': v} for k, v in ocupacion.items()]
+    for i in range(0, len(filas_ocupacion), TAMANO_LOTE):
+        db.session.execute(db.insert(OcupacionOficinaDia), filas_ocupacion[i:i + TAMANO_LOTE])
+    filas_resumen = [{'id_municipio': k[0], 'id_oficina': k[1], 'estado': k[2], 'fecha': k[3], 'total': v}
+                     for k, v in resumen.items()]
+    for i in range(0, len(filas_resumen), TAMANO_LOTE):
+        db.session.execute(db.insert(ResumenTurnos), filas_resumen[i:i + TAMANO_LOTE])
+    filas_series = [{'fecha': k[0], 'id_municipio': k[1], 'id_oficina': k[2], 'tipo': k[3], 'total': v}
+                    for k, v in series.items()]
+    for i in range(0, len(filas_series), TAMANO_LOTE):
+        db.session.execute(db.insert(EstadisticasDia), filas_series[i:i + TAMANO_LOTE])
+    if ultimo_folio:
+        db.session.execute(db.insert(ContadorTurnos), [
+            {'id_municipio': k, 'ultimo_turno': v} for k, v in ultimo_folio.items()
+        ])
+    db.session.commit()
+
+
+def _insertar_lote(solicitantes, turnos, reservas):
+    if solicitantes:
+        db.session.execute(db.insert(Solicitantes), solicitantes)
+        db.session.execute(db.insert(Turnos), turnos)
+        indice_busqueda.indexar({
+            s['id_solicitante']: (s['curp'], s['nombre_solicitante'], s['paterno_solicitante'],
+                                  s['materno_solicitante'], s['nombre_tramitante'])
+            for s in solicitantes
+        }, nuevos=True)
+    if reservas:
+        db.session.execute(db.insert(ReservasHorario), reservas)
+    solicitantes.clear()
+    turnos.clear()
+    reservas.clear()
+
+
+class ContadorConsultas:
+    """
+    Cuenta las sentencias SQL ejecutadas por hilo, para reportar
+    consultas por petición.
+    """
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._al_ejecutar)
+
+    def _al_ejecutar(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.total = getattr(self._local, 'total', 0) + 1
+
+    def reiniciar(self):
+        self._local.total = 0
+
+    @property
+    def total(self):
+        return getattr(self._local, 'total', 0)
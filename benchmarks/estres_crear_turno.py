@@ -0,0 +1,255 @@
+# benchmarks/estres_crear_turno.py
+"""
+Arnés de concurrencia para crear_turno: lanza muchas llamadas simultáneas
+(hilos y/o procesos) contra la misma oficina o contra varias oficinas de un
+mismo municipio y al final verifica los invariantes:
+
+- ningún slot (oficina, fecha, hora) con dos turnos activos,
+- ningún día por encima de max_turnos_dia,
+- folios únicos por municipio (y sin huecos si FOLIO_BLOCK_SIZE = 1),
+- ocupacion_oficina_dia y reservas_horario coinciden con 'turnos'.
+
+También registra tiempo de espera en locks (sentencias FOR UPDATE),
+deadlocks y reintentos por conflicto en reservas_horario.
+
+Uso (BD DEDICADA, idealmente MySQL; SQLite serializa todas las escrituras):
+
+    export DATABASE_URL="mysql+pymysql://root:@localhost:3306/ticket_bench"
+    python -m benchmarks.estres_crear_turno --sembrar --procesos 4 --hilos 8 --turnos-por-hilo 20
+    python -m benchmarks.estres_crear_turno --oficinas 1      # todos a la misma oficina
+    FOLIO_BLOCK_SIZE=20 python -m benchmarks.estres_crear_turno --procesos 4
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+
+from benchmarks.datos import sembrar, curp_sintetica
+from benchmarks.bench_endpoints import percentil
+
+
+class MetricasConexion:
+    """ Escucha el engine y acumula esperas de lock, deadlocks y reintentos. """
+
+    def __init__(self, engine):
+        self._lock = threading.Lock()
+        self.espera_locks = 0.0
+        self.sentencias_for_update = 0
+        self.deadlocks = 0
+        self.conflictos_reserva = 0
+        event.listen(engine, 'before_cursor_execute', self._antes)
+        event.listen(engine, 'after_cursor_execute', self._despues)
+        event.listen(engine, 'handle_error', self._error)
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['inicio_sentencia'] = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        if 'FOR UPDATE' in statement:
+            transcurrido = time.perf_counter() - conn.info.pop('inicio_sentencia', time.perf_counter())
+            with self._lock:
+                self.espera_locks += transcurrido
+                self.sentencias_for_update += 1
+
+    def _error(self, contexto):
+        mensaje = str(contexto.original_exception)
+        with self._lock:
+            if 'Deadlock' in mensaje or '1213' in mensaje:
+                self.deadlocks += 1
+            elif isinstance(contexto.sqlalchemy_exception, IntegrityError) \
+                    and 'reservas_horario' in (contexto.statement or ''):
+                self.conflictos_reserva += 1
+
+    def como_dict(self):
+        return {
+            'espera_locks_s': round(self.espera_locks, 4),
+            'sentencias_for_update': self.sentencias_for_update,
+            'deadlocks': self.deadlocks,
+            'conflictos_reserva': self.conflictos_reserva
+        }
+
+
+def _formulario(curp, id_oficina, id_municipio):
+    return {
+        'nombreCompleto': 'TRAMITANTE ESTRES', 'curp': curp,
+        'nombre': 'ALUMNO', 'paterno': 'PRUEBA', 'materno': 'CONCURRENCIA',
+        'telefono': '', 'celular': '5512345678', 'correo': 'estres@example.com',
+        'nivel': '1', 'municipio': str(id_municipio), 'oficina': str(id_oficina), 'asunto': '1'
+    }
+
+
+def trabajo_proceso(num_proceso, hilos, turnos_por_hilo, oficinas, base_curp):
+    """ Corre en cada proceso: 'hilos' hilos que llaman crear_turno en paralelo. """
+    from werkzeug.datastructures import MultiDict
+    from app import app, ticket_controller
+    from DB.db import db
+    from models.db_models import Turnos
+
+    with app.app_context():
+        metricas = MetricasConexion(db.engine)
+
+    latencias, errores = [], Counter()
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def hilo(num_hilo):
+        barrera.wait()  # todos arrancan a la vez
+        for i in range(turnos_por_hilo):
+            id_oficina, id_municipio = oficinas[(num_hilo + i) % len(oficinas)]
+            n = base_curp + (num_proceso * hilos + num_hilo) * turnos_por_hilo + i
+            formulario = MultiDict(_formulario(curp_sintetica(n), id_oficina, id_municipio))
+            inicio = time.perf_counter()
+            with app.app_context():
+                resultado = ticket_controller.crear_turno(formulario)
+                ok = isinstance(resultado, Turnos)
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+                if not ok:
+                    errores[str(resultado)[:80]] += 1
+
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        list(executor.map(hilo, range(hilos)))
+
+    return {'latencias': latencias, 'errores': dict(errores), **metricas.como_dict()}
+
+
+def verificar_invariantes(folios_sin_huecos):
+    """ Revisa la BD completa y regresa una lista de violaciones (vacía = todo bien). """
+    from DB.db import db
+    from models.db_models import Turnos, OficinasRegionales, ReservasHorario, OcupacionOficinaDia
+    from utils.cache_horarios import cache_horarios
+
+    violaciones = []
+    activos = Turnos.estado != 'cancelado'
+    fecha_cita = func.date(Turnos.fecha_solicitud)
+
+    dobles = db.session.execute(
+        db.select(Turnos.id_oficina, Turnos.fecha_solicitud, func.count())
+        .where(activos)
+        .group_by(Turnos.id_oficina, Turnos.fecha_solicitud)
+        .having(func.count() > 1)
+    ).all()
+    violaciones += [f"Slot doble: oficina {o} en {f} ({n} turnos)" for o, f, n in dobles]
+
+    cache_horarios.invalidar()
+    por_dia = db.session.execute(
+        db.select(Turnos.id_oficina, fecha_cita, func.count())
+        .where(activos)
+        .group_by(Turnos.id_oficina, fecha_cita)
+    ).all()
+    ocupacion = dict(((o, str(f)), n) for o, f, n in db.session.execute(
+        db.select(OcupacionOficinaDia.id_oficina, OcupacionOficinaDia.fecha,
+                  OcupacionOficinaDia.turnos_asignados)
+    ).all())
+    for id_oficina, fecha, total in por_dia:
+        if isinstance(fecha, str):  # SQLite devuelve DATE() como texto
+            fecha = date.fromisoformat(fecha)
+        horario = cache_horarios.obtener(id_oficina)[fecha.weekday()]
+        if horario and total > horario.max_turnos_dia:
+            violaciones.append(f"Cupo excedido: oficina {id_oficina} el {fecha} ({total} > {horario.max_turnos_dia})")
+        if ocupacion.get((id_oficina, str(fecha)), 0) != total:
+            violaciones.append(f"Ocupación desfasada: oficina {id_oficina} el {fecha} "
+                               f"({ocupacion.get((id_oficina, str(fecha)), 0)} != {total})")
+
+    reservas = db.session.scalar(db.select(func.count()).select_from(ReservasHorario))
+    total_activos = db.session.scalar(db.select(func.count()).select_from(Turnos).where(activos))
+    if reservas != total_activos:
+        violaciones.append(f"reservas_horario ({reservas}) no coincide con turnos activos ({total_activos})")
+
+    folios = db.session.execute(
+        db.select(OficinasRegionales.id_municipio, Turnos.numero_turno)
+        .join(Turnos.oficina)
+    ).all()
+    por_municipio = {}
+    for id_municipio, numero in folios:
+        por_municipio.setdefault(id_municipio, []).append(numero)
+    for id_municipio, numeros in por_municipio.items():
+        repetidos = [n for n, c in Counter(numeros).items() if c > 1]
+        if repetidos:
+            violaciones.append(f"Folios repetidos en municipio {id_municipio}: {repetidos[:10]}")
+        if folios_sin_huecos and len(set(numeros)) != max(numeros):
+            violaciones.append(f"Folios con huecos en municipio {id_municipio}: "
+                               f"{max(numeros) - len(set(numeros))} faltantes")
+    return violaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arnés de concurrencia para crear_turno.")
+    parser.add_argument('--sembrar', action='store_true', help="Recrea y siembra una BD pequeña primero.")
+    parser.add_argument('--turnos-semilla', type=int, default=20_000)
+    parser.add_argument('--procesos', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=8, help="Hilos por proceso.")
+    parser.add_argument('--turnos-por-hilo', type=int, default=10)
+    parser.add_argument('--oficinas', type=int, default=2,
+                        help="Oficinas (del mismo municipio) a las que se dirigen las llamadas; 1 = todas a la misma.")
+    args = parser.parse_args()
+
+    from app import app
+    from DB.db import db
+    from models.db_models import OficinasRegionales, Solicitantes
+
+    with app.app_context():
+        if args.sembrar:
+            sembrar(num_municipios=10, oficinas_por_municipio=max(2, args.oficinas), num_turnos=args.turnos_semilla)
+        id_municipio = db.session.scalar(
+            db.select(OficinasRegionales.id_municipio)
+            .group_by(OficinasRegionales.id_municipio)
+            .order_by(func.count().desc())
+        )
+        oficinas = [tuple(r) for r in db.session.execute(
+            db.select(OficinasRegionales.id_oficina, OficinasRegionales.id_municipio)
+            .where(OficinasRegionales.id_municipio == id_municipio)
+            .order_by(OficinasRegionales.id_oficina)
+            .limit(args.oficinas)
+        ).all()]
+        base_curp = (db.session.scalar(db.select(func.max(Solicitantes.id_solicitante))) or 0) + 20_000_000
+        folios_sin_huecos = app.config.get('FOLIO_BLOCK_SIZE', 1) <= 1
+        db.session.remove()
+
+    total = args.procesos * args.hilos * args.turnos_por_hilo
+    print(f"{total} llamadas a crear_turno: {args.procesos} procesos x {args.hilos} hilos, "
+          f"oficinas {[o[0] for o in oficinas]} del municipio {id_municipio}")
+
+    inicio = time.perf_counter()
+    tareas = [(p, args.hilos, args.turnos_por_hilo, oficinas, base_curp) for p in range(args.procesos)]
+    if args.procesos == 1:
+        resultados = [trabajo_proceso(*tareas[0])]
+    else:
+        with multiprocessing.get_context('spawn').Pool(args.procesos) as pool:
+            resultados = pool.starmap(trabajo_proceso, tareas)
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(l for r in resultados for l in r['latencias'])
+    errores = Counter()
+    for r in resultados:
+        errores.update(r['errores'])
+    print(f"Duración: {duracion:.2f}s  ({len(latencias) / duracion:.1f} turnos/s)")
+    print(f"Latencia p50/p95/p99: {percentil(latencias, 50) * 1000:.1f} / "
+          f"{percentil(latencias, 95) * 1000:.1f} / {percentil(latencias, 99) * 1000:.1f} ms")
+    print(f"Espera en locks FOR UPDATE: {sum(r['espera_locks_s'] for r in resultados):.3f}s "
+          f"en {sum(r['sentencias_for_update'] for r in resultados)} sentencias")
+    print(f"Deadlocks: {sum(r['deadlocks'] for r in resultados)}  "
+          f"Reintentos por slot tomado: {sum(r['conflictos_reserva'] for r in resultados)}")
+    print(f"Fallidos: {sum(errores.values())}")
+    for mensaje, veces in errores.most_common(5):
+        print(f"  {veces} x {mensaje}")
+
+    with app.app_context():
+        violaciones = verificar_invariantes(folios_sin_huecos)
+    if violaciones:
+        print(f"❌ {len(violaciones)} violaciones de invariantes:")
+        for v in violaciones[:50]:
+            print(f"  - {v}")
+        raise SystemExit(1)
+    print("✅ Invariantes OK: sin slots dobles, sin cupos excedidos, folios únicos"
+          + (" y sin huecos." if folios_sin_huecos else "."))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,60 @@ class Config:
     DB_PORT     = os.getenv("DB_PORT", "3306")
     DB_NAME     = os.getenv("DB_NAME", "ticket_sistema")
 
-    SQLALCHEMY_DATABASE_URI = (
+    # DATABASE_URL permite apuntar a otra BD completa (ej. la de benchmarks)
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "clave-secreta-dev")
+
+    # Folios por bloque (hi/lo). 1 = folios consecutivos sin huecos, asignados
+    # dentro de la transacción del turno. Ver utils/folios.py para la política de huecos.
+    FOLIO_BLOCK_SIZE = int(os.getenv("FOLIO_BLOCK_SIZE", "1"))
+
+    # Cada cuántos segundos un proceso revisa la versión de los catálogos
+    # (ver utils/version_catalogos.py). 0 = en cada uso.
+    CATALOGO_POLL_SECONDS = float(os.getenv("CATALOGO_POLL_SECONDS", "5"))
+
+    # Segundos que navegador/proxy pueden reutilizar /api/oficinas sin revalidar;
+    # después revalidan con If-None-Match y reciben 304 si no cambió.
+    API_OFICINAS_MAX_AGE = int(os.getenv("API_OFICINAS_MAX_AGE", "60"))
+
+    # Días que se conservan las estadísticas por hora; el compactador borra
+    # las más viejas (las diarias se conservan siempre).
+    ESTADISTICAS_HORAS_DIAS = int(os.getenv("ESTADISTICAS_HORAS_DIAS", "90"))
+
+    # Dashboard en vivo (SSE, ver utils/difusion_dashboard.py): segundos para
+    # agrupar cambios antes de recalcular, y broker entre workers (vacío = local).
+    # Cada dashboard abierto mantiene una conexión (y un hilo del worker) todo
+    # el tiempo: con workers síncronos de un hilo, unos cuantos admins bastan
+    # para bloquear el sitio. Desplegar con hilos o gevent, p. ej.
+    #   gunicorn -k gthread --threads 32 app:app   o   gunicorn -k gevent app:app
+    DASHBOARD_SSE_ESPERA = float(os.getenv("DASHBOARD_SSE_ESPERA", "1"))
+    DASHBOARD_BROKER_URL = os.getenv("DASHBOARD_BROKER_URL", "")
+
+    # Segundos que se reutilizan las lecturas caras del admin (dashboard,
+    # primera página de turnos, horarios; ver utils/cache_un_vuelo.py). Los
+    # cambios las invalidan antes; el TTL acota lo que ven otros workers.
+    CACHE_ADMIN_TTL = float(os.getenv("CACHE_ADMIN_TTL", "5"))
+
+    # Cache en disco de comprobantes PDF (ver utils/cache_pdf.py); sin valor
+    # se usa instance/cache_pdf, privado de la app (no /tmp, compartido)
+    PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR")
+    PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "200"))
+
+    # Procesos para renderizar la impresión del día (ver utils/pdf_lote.py); 0 = todos los núcleos
+    PDF_LOTE_PROCESOS = int(os.getenv("PDF_LOTE_PROCESOS", "0"))
+
+    # Pre-render de comprobantes al crear el turno (ver utils/prerender_pdf.py):
+    # hilos (0 = desactivado), turnos en espera como máximo, y segundos que
+    # /ticket/pdf espera a un comprobante que un hilo está dibujando.
+    PDF_PRERENDER_HILOS = int(os.getenv("PDF_PRERENDER_HILOS", "2"))
+    PDF_PRERENDER_COLA = int(os.getenv("PDF_PRERENDER_COLA", "200"))
+    PDF_PRERENDER_ESPERA = float(os.getenv("PDF_PRERENDER_ESPERA", "1"))
+
+    # Segundos que el user_loader reutiliza el administrador de la sesión sin
+    # consultar la BD (ver utils/cache_principales.py). Los cambios del mismo
+    # proceso lo invalidan antes; el TTL acota lo que ven otros workers.
+    PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
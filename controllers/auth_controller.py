@@ -1,6 +1,8 @@
 # controllers/auth_controller.py
-from DB import db
+from DB.db import db
 from models.db_models import Administradores
+from models.admin import Admin
+from utils.cache_principales import cache_principales
 from flask_bcrypt import Bcrypt
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -34,10 +36,20 @@ class AuthController:
     def get_user_by_id(self, user_id):
         """
         Obtiene un usuario por su ID. Requerido por flask-login.
+        Retorna un Admin inmutable del cache de principales; la BD solo se
+        consulta en un fallo (ver utils/cache_principales.py).
         """
         try:
-            # db.session.get() es la forma más rápida de obtener por Primary Key
-            return db.session.get(Administradores, int(user_id))
+            id_admin = int(user_id)
+        except (TypeError, ValueError):
+            return None  # Sesión con un ID inválido: se trata como anónima
+        try:
+            return cache_principales.obtener(id_admin, self._cargar_principal)
         except SQLAlchemyError as e:
             print(f"Error en BD en get_user_by_id: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _cargar_principal(self, id_admin):
+        # db.session.get() es la forma más rápida de obtener por Primary Key
+        admin = db.session.get(Administradores, id_admin)
+        return Admin.desde_registro(admin) if admin else None
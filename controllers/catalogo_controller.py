@@ -1,8 +1,20 @@
 # controllers/catalogo_controller.py
 from DB.db import db
-from models.db_models import Municipios, NivelesEducativos, Asuntos, OficinasRegionales, HorariosAtencion
+from models.db_models import (
+    Municipios, NivelesEducativos, Asuntos, OficinasRegionales, HorariosAtencion, ResumenTurnos
+)
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from datetime import time
+from models.horario import HorarioResumen
+from utils.cache_catalogos import cache_catalogos
+from utils.version_catalogos import version_catalogos
+from utils.difusion_dashboard import difusor_dashboard
+from utils.cache_un_vuelo import CacheUnVuelo
+
+# Listado de horarios del admin, compartido entre peticiones simultáneas;
+# cualquier cambio de catálogos (de este u otro proceso) lo invalida.
+cache_horarios_admin = CacheUnVuelo('horarios_admin')
+version_catalogos.suscribir(cache_horarios_admin.invalidar)
 
 
 class CatalogoController:
@@ -10,14 +22,31 @@ class CatalogoController:
     def __init__(self):
         pass  # Ya no necesitamos self.db
 
+    def _commit_catalogo(self):
+        """
+        Commit de cualquier cambio de catálogo: la versión sube en la misma
+        transacción y los catálogos en memoria de este proceso se descartan
+        (los demás procesos lo notan al sondear la versión). El dashboard en
+        vivo se recalcula porque agrupa por nombre de municipio.
+
+        Los avisos van después del commit: si fallan, el cambio ya está
+        guardado y no se reporta como error (solo se registra). Este proceso
+        lo notará en el siguiente sondeo de la versión.
+        """
+        version_catalogos.incrementar()
+        db.session.commit()
+        try:
+            version_catalogos.notificar()
+        except Exception as e:
+            db.session.rollback()  # Deja la sesión usable si falló la lectura de la versión
+            print(f"Error al invalidar los catálogos en memoria: {e}")
+        difusor_dashboard.notificar_cambio()  # Registra sus propios errores, nunca lanza
+
     # --- Métodos para MUNICIPIOS ---
 
     def get_municipios(self):
-        """ Obtiene todos los municipios (como objetos ORM). """
-        # .scalars() obtiene los objetos del modelo, .all() los pone en una lista
-        return db.session.scalars(
-            db.select(Municipios).order_by(Municipios.municipio)
-        ).all()
+        """ Obtiene todos los municipios (registros inmutables del cache de catálogos). """
+        return cache_catalogos.municipios()
 
     def get_municipio_by_id(self, id_municipio):
         """ Obtiene un municipio específico por su ID. """
@@ -32,7 +61,7 @@ class CatalogoController:
         db.session.add(nuevo_municipio)
 
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Municipio creado con éxito."
         except IntegrityError as e:
             db.session.rollback()
@@ -54,7 +83,7 @@ class CatalogoController:
 
         municipio.municipio = municipio_nombre
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Municipio actualizado con éxito."
         except IntegrityError as e:
             db.session.rollback()
@@ -71,7 +100,7 @@ class CatalogoController:
 
         db.session.delete(municipio)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Municipio eliminado con éxito."
         except IntegrityError as e:
             db.session.rollback()
@@ -86,9 +115,7 @@ class CatalogoController:
     # --- Métodos para NIVELES EDUCATIVOS (siguen el mismo patrón) ---
 
     def get_niveles(self):
-        return db.session.scalars(
-            db.select(NivelesEducativos).order_by(NivelesEducativos.id_nivel)
-        ).all()
+        return cache_catalogos.niveles()
 
     def get_nivel_by_id(self, id_nivel):
         return db.session.get(NivelesEducativos, id_nivel)
@@ -98,7 +125,7 @@ class CatalogoController:
         nuevo = NivelesEducativos(nivel=nivel_nombre)
         db.session.add(nuevo)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Nivel creado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -113,7 +140,7 @@ class CatalogoController:
         if not nivel_obj: return False, "Nivel no encontrado."
         nivel_obj.nivel = nivel_nombre
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Nivel actualizado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -127,7 +154,7 @@ class CatalogoController:
         if not nivel_obj: return False, "Nivel no encontrado."
         db.session.delete(nivel_obj)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Nivel eliminado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -139,9 +166,7 @@ class CatalogoController:
     # --- Métodos para ASUNTOS (siguen el mismo patrón) ---
 
     def get_asuntos(self):
-        return db.session.scalars(
-            db.select(Asuntos).order_by(Asuntos.descripcion)
-        ).all()
+        return cache_catalogos.asuntos()
 
     def get_asunto_by_id(self, id_asunto):
         return db.session.get(Asuntos, id_asunto)
@@ -151,7 +176,7 @@ class CatalogoController:
         nuevo = Asuntos(descripcion=descripcion)
         db.session.add(nuevo)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Asunto creado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -166,7 +191,7 @@ class CatalogoController:
         if not asunto_obj: return False, "Asunto no encontrado."
         asunto_obj.descripcion = descripcion
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Asunto actualizado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -180,7 +205,7 @@ class CatalogoController:
         if not asunto_obj: return False, "Asunto no encontrado."
         db.session.delete(asunto_obj)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Asunto eliminado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -192,12 +217,8 @@ class CatalogoController:
     # --- Métodos para OFICINAS REGIONALES (siguen el mismo patrón) ---
 
     def get_oficinas(self):
-        # Usamos joinedload para traer el nombre del municipio en la misma consulta
-        return db.session.scalars(
-            db.select(OficinasRegionales)
-            .options(db.joinedload(OficinasRegionales.municipio))
-            .order_by(OficinasRegionales.oficina)
-        ).all()
+        # Cada registro trae su municipio (o.municipio.municipio), sin consultar la BD
+        return cache_catalogos.oficinas()
 
     def get_oficina_by_id(self, id_oficina):
         return db.session.get(OficinasRegionales, id_oficina)
@@ -208,7 +229,7 @@ class CatalogoController:
         nuevo = OficinasRegionales(oficina=oficina_nombre, id_municipio=id_municipio)
         db.session.add(nuevo)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Oficina creada con éxito."
         except IntegrityError as e:
             db.session.rollback()
@@ -223,10 +244,18 @@ class CatalogoController:
         oficina_obj = db.session.get(OficinasRegionales, id_oficina)
         if not oficina_obj: return False, "Oficina no encontrada."
 
+        municipio_anterior = oficina_obj.id_municipio
         oficina_obj.oficina = oficina_nombre
         oficina_obj.id_municipio = id_municipio
         try:
-            db.session.commit()
+            if str(municipio_anterior) != str(id_municipio):
+                # El resumen del dashboard guarda el municipio de cada oficina
+                db.session.execute(
+                    db.update(ResumenTurnos)
+                    .where(ResumenTurnos.id_oficina == id_oficina)
+                    .values(id_municipio=id_municipio)
+                )
+            self._commit_catalogo()
             return True, "Oficina actualizada con éxito."
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -237,7 +266,7 @@ class CatalogoController:
         if not oficina_obj: return False, "Oficina no encontrada."
         db.session.delete(oficina_obj)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Oficina eliminada con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -249,12 +278,19 @@ class CatalogoController:
     # --- Métodos para HORARIOS DE ATENCIÓN (ACTUALIZADOS) ---
 
     def get_horarios(self):
-        """ Obtiene todos los horarios, uniéndolos con sus oficinas. """
-        return db.session.scalars(
-            db.select(HorariosAtencion)
-            .options(db.joinedload(HorariosAtencion.oficina))
+        """ Obtiene todos los horarios con el nombre de su oficina (registros HorarioResumen). """
+        version_catalogos.verificar()
+        return cache_horarios_admin.obtener('todos', self._consultar_horarios)
+
+    def _consultar_horarios(self):
+        filas = db.session.execute(
+            db.select(HorariosAtencion.id_horario, HorariosAtencion.id_oficina, OficinasRegionales.oficina,
+                      HorariosAtencion.dia_semana, HorariosAtencion.hora_apertura,
+                      HorariosAtencion.hora_cierre, HorariosAtencion.max_turnos_dia)
+            .outerjoin(HorariosAtencion.oficina)
             .order_by(HorariosAtencion.id_oficina, HorariosAtencion.dia_semana)
-        ).all()
+        )
+        return tuple(HorarioResumen(*fila) for fila in filas)
 
     def get_horario_by_id(self, id_horario):
         """ Obtiene un horario específico por su ID. """
@@ -287,7 +323,7 @@ class CatalogoController:
                 db.session.add(nuevo_horario)
 
             # Hacemos commit una sola vez al final del bucle
-            db.session.commit()
+            self._commit_catalogo()
 
             # Mensaje de éxito
             num_dias = len(dias_seleccionados)
@@ -318,7 +354,7 @@ class CatalogoController:
             horario.hora_cierre = time.fromisoformat(form_data.get('hora_cierre'))
             horario.max_turnos_dia = form_data.get('max_turnos_dia')
 
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Horario actualizado con éxito."
         except IntegrityError:
             db.session.rollback()
@@ -335,7 +371,7 @@ class CatalogoController:
 
         db.session.delete(horario)
         try:
-            db.session.commit()
+            self._commit_catalogo()
             return True, "Horario eliminado con éxito."
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -0,0 +1,173 @@
+# controllers/estadisticas_controller.py
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from DB.db import db
+from DB.contadores import upsert_sumar
+from models.db_models import EventosTurno, EstadisticasHora, EstadisticasDia
+
+TIPOS_EVENTO = ('creado', 'resuelto', 'cancelado')
+# Rango máximo (en días) que se puede pedir en cada granularidad
+MAX_DIAS = {'hora': 31, 'dia': 366, 'semana': 366 * 3}
+TAMANO_LOTE_COMPACTACION = 5000
+
+
+class EstadisticasController:
+    """
+    Series de tiempo del dashboard: altas ('creado'), resoluciones y
+    cancelaciones por hora, día o semana.
+
+    TicketController anota cada evento en 'eventos_turno' dentro de la
+    transacción del cambio; compactar_eventos() (cron) los suma en
+    'estadisticas_hora' y 'estadisticas_dia' y los borra. Una serie de un
+    año lee a lo más unas decenas de miles de filas diarias ya agregadas,
+    más los eventos que aún no se compactan.
+    """
+
+    def compactar_eventos(self):
+        """
+        Vacía 'eventos_turno' hacia las tablas por hora y por día, por lotes.
+        Cada lote se suma y se borra en la misma transacción, y solo se borran
+        los ids que se sumaron (un evento que se confirma tarde queda para la
+        siguiente corrida). SKIP LOCKED evita que dos compactadores cuenten
+        el mismo lote. Después purga las horas más viejas que
+        ESTADISTICAS_HORAS_DIAS. Retorna el número de eventos compactados.
+        """
+        total = 0
+        try:
+            while True:
+                eventos = db.session.execute(
+                    db.select(EventosTurno.id_evento, EventosTurno.fecha, EventosTurno.id_municipio,
+                              EventosTurno.id_oficina, EventosTurno.tipo, EventosTurno.cantidad)
+                    .order_by(EventosTurno.id_evento)
+                    .limit(TAMANO_LOTE_COMPACTACION)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                if not eventos:
+                    break
+
+                por_hora, por_dia = defaultdict(int), defaultdict(int)
+                for e in eventos:
+                    hora = e.fecha.replace(minute=0, second=0, microsecond=0)
+                    por_hora[(hora, e.id_municipio, e.id_oficina, e.tipo)] += e.cantidad
+                    por_dia[(hora.date(), e.id_municipio, e.id_oficina, e.tipo)] += e.cantidad
+
+                for (hora, id_municipio, id_oficina, tipo), cantidad in por_hora.items():
+                    upsert_sumar(EstadisticasHora,
+                                 {'hora': hora, 'id_municipio': id_municipio, 'id_oficina': id_oficina, 'tipo': tipo},
+                                 {'total': cantidad})
+                for (fecha, id_municipio, id_oficina, tipo), cantidad in por_dia.items():
+                    upsert_sumar(EstadisticasDia,
+                                 {'fecha': fecha, 'id_municipio': id_municipio, 'id_oficina': id_oficina, 'tipo': tipo},
+                                 {'total': cantidad})
+                db.session.execute(
+                    db.delete(EventosTurno).where(EventosTurno.id_evento.in_([e.id_evento for e in eventos]))
+                )
+                db.session.commit()
+
+                total += len(eventos)
+                if len(eventos) < TAMANO_LOTE_COMPACTACION:
+                    break
+
+            dias = current_app.config.get('ESTADISTICAS_HORAS_DIAS', 90)
+            limite = datetime.combine(date.today() - timedelta(days=dias), time.min)
+            db.session.execute(db.delete(EstadisticasHora).where(EstadisticasHora.hora < limite))
+            db.session.commit()
+            return total
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error al compactar eventos de turnos: {e}")
+            return None
+
+    def _cubeta(self, momento, granularidad):
+        """ Inicio de la hora, día o semana (lunes) que contiene 'momento'. """
+        if granularidad == 'hora':
+            return momento.replace(minute=0, second=0, microsecond=0)
+        dia = momento.date() if isinstance(momento, datetime) else momento
+        if granularidad == 'semana':
+            return dia - timedelta(days=dia.weekday())
+        return dia
+
+    def _cubetas(self, desde, hasta, granularidad):
+        """ Todas las cubetas del rango, en orden (las vacías también, para que la gráfica no tenga huecos). """
+        if granularidad == 'hora':
+            actual, fin, paso = datetime.combine(desde, time.min), datetime.combine(hasta, time.max), timedelta(hours=1)
+        else:
+            actual, fin = self._cubeta(desde, granularidad), hasta
+            paso = timedelta(days=7 if granularidad == 'semana' else 1)
+        cubetas = []
+        while actual <= fin:
+            cubetas.append(actual)
+            actual += paso
+        return cubetas
+
+    def _filtrar(self, stmt, modelo, id_oficina, id_municipio):
+        if id_oficina:
+            stmt = stmt.where(modelo.id_oficina == id_oficina)
+        if id_municipio:
+            stmt = stmt.where(modelo.id_municipio == id_municipio)
+        return stmt
+
+    def get_series(self, granularidad, desde, hasta, id_oficina=None, id_municipio=None):
+        """
+        Altas, resoluciones y cancelaciones por cubeta entre 'desde' y 'hasta'
+        (fechas, inclusivas), opcionalmente de una oficina o un municipio.
+        Por semana el rango se extiende a semanas completas (de lunes a
+        domingo): cada cubeta se etiqueta con su lunes y suma sus siete días.
+        Lanza ValueError si los parámetros no son válidos; retorna None si
+        falla la BD.
+
+        Formato: {'granularidad', 'etiquetas': [...], 'series': {tipo: [...]},
+        'totales': {tipo: n}}.
+        """
+        if granularidad not in MAX_DIAS:
+            raise ValueError("Granularidad inválida (hora, dia o semana).")
+        if desde > hasta:
+            raise ValueError("La fecha inicial es posterior a la final.")
+        if (hasta - desde).days + 1 > MAX_DIAS[granularidad]:
+            raise ValueError(f"El rango máximo por {granularidad} es de {MAX_DIAS[granularidad]} días.")
+        if granularidad == 'semana':
+            desde = self._cubeta(desde, 'semana')
+            hasta = self._cubeta(hasta, 'semana') + timedelta(days=6)
+
+        inicio, fin = datetime.combine(desde, time.min), datetime.combine(hasta + timedelta(days=1), time.min)
+        conteos = defaultdict(int)
+        try:
+            # Ya compactado: una fila por (cubeta de la tabla, tipo)
+            if granularidad == 'hora':
+                stmt = db.select(EstadisticasHora.hora, EstadisticasHora.tipo, func.sum(EstadisticasHora.total)) \
+                    .where(EstadisticasHora.hora >= inicio, EstadisticasHora.hora < fin) \
+                    .group_by(EstadisticasHora.hora, EstadisticasHora.tipo)
+                stmt = self._filtrar(stmt, EstadisticasHora, id_oficina, id_municipio)
+            else:
+                stmt = db.select(EstadisticasDia.fecha, EstadisticasDia.tipo, func.sum(EstadisticasDia.total)) \
+                    .where(EstadisticasDia.fecha >= desde, EstadisticasDia.fecha <= hasta) \
+                    .group_by(EstadisticasDia.fecha, EstadisticasDia.tipo)
+                stmt = self._filtrar(stmt, EstadisticasDia, id_oficina, id_municipio)
+            for momento, tipo, total in db.session.execute(stmt):
+                conteos[(self._cubeta(momento, granularidad), tipo)] += int(total or 0)
+
+            # Aún sin compactar. En MySQL (REPEATABLE READ) ambas lecturas ven la
+            # misma foto, así que un compactador concurrente no duplica ni pierde eventos.
+            stmt = db.select(EventosTurno.fecha, EventosTurno.tipo, EventosTurno.cantidad) \
+                .where(EventosTurno.fecha >= inicio, EventosTurno.fecha < fin)
+            stmt = self._filtrar(stmt, EventosTurno, id_oficina, id_municipio)
+            for momento, tipo, cantidad in db.session.execute(stmt):
+                conteos[(self._cubeta(momento, granularidad), tipo)] += cantidad
+        except SQLAlchemyError as e:
+            print(f"Error al obtener series de estadísticas: {e}")
+            return None
+
+        cubetas = self._cubetas(desde, hasta, granularidad)
+        formato = '%Y-%m-%d %H:00' if granularidad == 'hora' else '%Y-%m-%d'
+        series = {tipo: [conteos.get((c, tipo), 0) for c in cubetas] for tipo in TIPOS_EVENTO}
+        return {
+            'granularidad': granularidad,
+            'etiquetas': [c.strftime(formato) for c in cubetas],
+            'series': series,
+            'totales': {tipo: sum(valores) for tipo, valores in series.items()},
+        }
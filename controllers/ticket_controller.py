@@ -2,24 +2,42 @@
 from DB.db import db
 from models.db_models import (
     Turnos, Solicitantes, Municipios, NivelesEducativos,
-    Asuntos, OficinasRegionales, ContadorTurnos, HorariosAtencion
+    Asuntos, OficinasRegionales,
+    ReservasHorario, OcupacionOficinaDia, ResumenTurnos, EventosTurno
 )
+from DB.contadores import upsert_sumar
+from models.turno import TurnoResumen
+from utils.cache_horarios import cache_horarios, SIN_HORARIO
+from utils.cache_catalogos import cache_catalogos
+from utils.folios import asignador_folios
+from utils.difusion_dashboard import difusor_dashboard
+from utils.prerender_pdf import cola_prerender
+from utils.cache_un_vuelo import CacheUnVuelo
+from utils import indice_busqueda
+from utils.paginacion import TAMANO_PAGINA, codificar_cursor, decodificar_cursor
+from utils.importacion_csv import leer_csv, validar_filas, indexar_catalogo
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy import or_, func, and_  # Para búsquedas OR, funciones SQL y AND
 from datetime import datetime, timedelta, time
+from utils.agenda import ventana_busqueda, iterar_slots_libres
 
-# --- DICCIONARIO PARA MAPEAR DÍAS ---
-DIAS_SEMANA_ES = {
-    0: 'lunes',
-    1: 'martes',
-    2: 'miercoles',
-    3: 'jueves',
-    4: 'viernes',
-    5: 'sabado',
-    6: 'domingo'
-}
-SLOT_DURATION_MINUTES = 30
+TAMANO_BLOQUE_IN = 500  # Máximo de valores por cláusula IN en las consultas por lote
+REINTENTOS_IMPORTACION = 3
+TAMANO_BLOQUE_EXPORTACION = 1000  # Filas que se traen del cursor del servidor por vuelta
+VISTAS_ADMIN = ('activos', 'cancelados', 'todos')
+
+
+# Lecturas caras del admin compartidas entre peticiones simultáneas. Cada
+# aviso de cambio de turnos (de este u otro worker) las invalida.
+cache_estadisticas = CacheUnVuelo('estadisticas_dashboard')
+cache_listado_admin = CacheUnVuelo('turnos_admin_primera_pagina')
+difusor_dashboard.al_cambiar(cache_estadisticas.invalidar)
+difusor_dashboard.al_cambiar(cache_listado_admin.invalidar)
+
+
+class _AgendaCambiada(Exception):
+    """ Otra transacción ocupó slots o cupo mientras se asignaba un lote. """
 
 
 class TicketController:
@@ -29,111 +47,260 @@ class TicketController:
 
     # --- NUEVOS MÉTODOS PRIVADOS PARA LÓGICA DE HORARIOS ---
 
-    def _round_up_time(self, dt, minutes_res):
-        """ Redondea un datetime.datetime hacia arriba al próximo intervalo. """
-        min_dt = datetime.min.time()
-        delta = datetime.combine(dt.date(), dt.time()) - datetime.combine(dt.date(), min_dt)
-        minutes = (delta.seconds // 60 + minutes_res - 1) // minutes_res * minutes_res
-        return datetime.combine(dt.date(), min_dt) + timedelta(minutes=minutes)
-
-    def _get_dia_semana_es(self, date_obj):
-        """ Obtiene el nombre del día en español a partir de un objeto date. """
-        return DIAS_SEMANA_ES[date_obj.weekday()]
-
-    def _encontrar_proximo_horario(self, id_oficina):
+    def _cargar_agenda(self, id_oficina):
         """
-        Encuentra el próximo slot de cita disponible para una oficina.
-        Retorna (fecha_cita, hora_cita) o (None, None)
+        Reúne todo lo necesario para buscar slots de una oficina: el horario
+        semanal compilado (en memoria, ver utils/cache_horarios.py) y, en dos
+        consultas, los slots reservados de la ventana de búsqueda y la ocupación
+        por día. Retorna (horarios, ocupados, conteos, ahora).
         """
         ahora = datetime.now()
-        inicio_busqueda = self._round_up_time(ahora, SLOT_DURATION_MINUTES)
 
-        for i in range(30):
-            fecha_a_revisar = (inicio_busqueda + timedelta(days=i)).date()
-            dia_semana = self._get_dia_semana_es(fecha_a_revisar)
+        horarios = cache_horarios.obtener(id_oficina)
+        if horarios == SIN_HORARIO:
+            return horarios, set(), {}, ahora
 
-            horario_db = db.session.scalar(
-                db.select(HorariosAtencion).where(
-                    HorariosAtencion.id_oficina == id_oficina,
-                    HorariosAtencion.dia_semana == dia_semana
-                )
+        _, primer_dia, dia_limite = ventana_busqueda(ahora)
+        ocupados = set(db.session.execute(
+            db.select(ReservasHorario.fecha, ReservasHorario.hora).where(
+                ReservasHorario.id_oficina == id_oficina,
+                ReservasHorario.fecha >= primer_dia,
+                ReservasHorario.fecha < dia_limite
             )
+        ).all())
+        conteos = dict(db.session.execute(
+            db.select(OcupacionOficinaDia.fecha, OcupacionOficinaDia.turnos_asignados).where(
+                OcupacionOficinaDia.id_oficina == id_oficina,
+                OcupacionOficinaDia.fecha >= primer_dia,
+                OcupacionOficinaDia.fecha < dia_limite
+            )
+        ).all())
 
-            if not horario_db:
-                continue
+        return horarios, ocupados, conteos, ahora
 
-            max_turnos_hoy = horario_db.max_turnos_dia
-            turnos_hoy_count = db.session.scalar(
-                db.select(func.count(Turnos.id_turno)).where(
-                    Turnos.id_oficina == id_oficina,
-                    func.date(Turnos.fecha_solicitud) == fecha_a_revisar
-                )
+    def _ocupar_cupo(self, id_oficina, fecha, max_turnos=None, cantidad=1):
+        """
+        Suma 'cantidad' turnos a la ocupación de la oficina en 'fecha'.
+        Con 'max_turnos' el incremento es condicional (UPDATE ... WHERE <= max - cantidad):
+        retorna False si no caben en el día.
+        """
+        claves = {'id_oficina': id_oficina, 'fecha': fecha}
+        if max_turnos is None:
+            upsert_sumar(OcupacionOficinaDia, claves, {'turnos_asignados': cantidad})
+            return True
+
+        upsert_sumar(OcupacionOficinaDia, claves, {'turnos_asignados': 0})
+        resultado = db.session.execute(
+            db.update(OcupacionOficinaDia)
+            .where(
+                OcupacionOficinaDia.id_oficina == id_oficina,
+                OcupacionOficinaDia.fecha == fecha,
+                OcupacionOficinaDia.turnos_asignados <= max_turnos - cantidad
             )
+            .values(turnos_asignados=OcupacionOficinaDia.turnos_asignados + cantidad)
+        )
+        return resultado.rowcount == 1
 
-            if turnos_hoy_count >= max_turnos_hoy:
-                continue
+    def _ocupar_cupo_de_cita(self, id_oficina, fecha):
+        """
+        Ocupa un lugar para una cita que ya tiene fecha (un turno que sale de
+        'cancelado' o que cambia de oficina), respetando el max_turnos_dia de
+        ese día. Lanza ValueError si el día está lleno o la oficina no atiende.
+        """
+        horario = cache_horarios.obtener(id_oficina)[fecha.weekday()]
+        if horario is None:
+            raise ValueError(f"La oficina {id_oficina} no atiende el {fecha:%Y-%m-%d}.")
+        if not self._ocupar_cupo(id_oficina, fecha, horario.max_turnos_dia):
+            raise ValueError(f"La oficina {id_oficina} ya no tiene cupo el {fecha:%Y-%m-%d}.")
 
-            # --- INICIO DE CORRECCIÓN (BUGS DE HORA DE INICIO) ---
+    def _liberar_cupo(self, id_oficina, fecha):
+        """
+        Resta un turno a la ocupación de la oficina en 'fecha'. Nunca baja de
+        0 (p. ej. si la tabla no se cargó desde los turnos previos): la resta
+        sobre SMALLINT UNSIGNED falla en MySQL estricto, así que se filtra antes.
+        """
+        db.session.execute(
+            db.update(OcupacionOficinaDia)
+            .where(
+                OcupacionOficinaDia.id_oficina == id_oficina,
+                OcupacionOficinaDia.fecha == fecha,
+                OcupacionOficinaDia.turnos_asignados > 0
+            )
+            .values(turnos_asignados=OcupacionOficinaDia.turnos_asignados - 1)
+        )
 
-            hora_apertura_oficina = horario_db.hora_apertura
-            hora_cierre_dt = datetime.combine(fecha_a_revisar, horario_db.hora_cierre)
-            hora_cierre_limite = (hora_cierre_dt - timedelta(minutes=SLOT_DURATION_MINUTES)).time()
+    def _reservar_proximo_horario(self, id_oficina):
+        """
+        Reserva el próximo slot libre: inserta la fila en 'reservas_horario' y
+        ocupa un lugar del cupo diario, ambos dentro de un SAVEPOINT.
+        Si otra transacción ya se quedó con el slot (uq_reserva_slot) se intenta
+        el siguiente candidato; si el día se llenó, se salta al día siguiente.
+        Retorna el objeto ReservasHorario o None si no hay slots.
+        """
+        horarios, ocupados, conteos, ahora = self._cargar_agenda(id_oficina)
+        dias_llenos = set()
 
-            if fecha_a_revisar == ahora.date():
-                # Si es hoy, empezamos desde la hora redondeada (ej. 13:00)
-                hora_inicio_busqueda = inicio_busqueda.time()
+        for fecha_cita, hora_cita in iterar_slots_libres(horarios, ocupados, conteos, ahora):
+            if fecha_cita in dias_llenos:
+                continue
 
-                # FIX 1: Nos aseguramos de no empezar ANTES de la hora de apertura
-                # Usamos el máximo entre la hora de apertura y la hora redondeada
-                hora_inicio_slots = max(hora_inicio_busqueda, hora_apertura_oficina)
-            else:
-                # Si es un día futuro, empezamos a la hora de apertura
-                hora_inicio_slots = hora_apertura_oficina
+            max_turnos = horarios[fecha_cita.weekday()].max_turnos_dia
+            reserva = ReservasHorario(id_oficina=id_oficina, fecha=fecha_cita, hora=hora_cita)
+            try:
+                with db.session.begin_nested() as savepoint:
+                    db.session.add(reserva)
+                    db.session.flush()
+                    if not self._ocupar_cupo(id_oficina, fecha_cita, max_turnos):
+                        dias_llenos.add(fecha_cita)
+                        savepoint.rollback()
+                        continue
+            except IntegrityError:
+                continue
+            return reserva
+        return None
 
-            # FIX 2: Verificar si ya es demasiado tarde para buscar slots HOY.
-            # Si la hora de inicio (ej: 15:00) ya superó el último slot (ej: 14:30),
-            # saltamos a mañana.
-            if hora_inicio_slots > hora_cierre_limite:
-                continue  # Saltar al siguiente día (loop 'for i in range(30)')
+    def _liberar_cita(self, turno):
+        """ Un turno cancelado devuelve su slot y su lugar en el cupo del día. """
+        if turno.reserva is not None:
+            db.session.delete(turno.reserva)
+        self._liberar_cupo(turno.id_oficina, turno.fecha_solicitud.date())
 
-            # --- FIN DE CORRECCIÓN ---
+    def _recuperar_cita(self, turno):
+        """
+        Un turno que sale de 'cancelado' vuelve a ocupar su slot y su cupo.
+        Si el slot ya fue tomado por otro turno, el INSERT lanza IntegrityError;
+        si el día ya está lleno, ValueError.
+        """
+        db.session.add(ReservasHorario(
+            id_oficina=turno.id_oficina,
+            fecha=turno.fecha_solicitud.date(),
+            hora=turno.hora_solicitud,
+            turno=turno
+        ))
+        db.session.flush()
+        self._ocupar_cupo_de_cita(turno.id_oficina, turno.fecha_solicitud.date())
+
+    def _contar_en_resumen(self, id_municipio, id_oficina, fecha, estado, delta):
+        """
+        Suma 'delta' en resumen_turnos, dentro de la transacción del cambio.
+        Una resta es un UPDATE que nunca baja de 0, como en _liberar_cupo:
+        sobre INT UNSIGNED fallaría en MySQL estricto (p. ej. un turno previo
+        a la carga del resumen), y no debe crear la fila.
+        """
+        if delta >= 0:
+            upsert_sumar(ResumenTurnos,
+                         {'id_municipio': id_municipio, 'id_oficina': id_oficina, 'estado': estado, 'fecha': fecha},
+                         {'total': delta})
+            return
+        db.session.execute(
+            db.update(ResumenTurnos)
+            .where(
+                ResumenTurnos.id_municipio == id_municipio,
+                ResumenTurnos.id_oficina == id_oficina,
+                ResumenTurnos.estado == estado,
+                ResumenTurnos.fecha == fecha,
+                ResumenTurnos.total >= -delta
+            )
+            .values(total=ResumenTurnos.total + delta)
+        )
 
-            slot_actual_dt = datetime.combine(fecha_a_revisar, hora_inicio_slots)
+    def _registrar_evento(self, id_municipio, id_oficina, tipo, cantidad=1):
+        """ Anota un alta, resolución o cancelación para las series de tiempo (ver EstadisticasController). """
+        db.session.execute(db.insert(EventosTurno).values(
+            fecha=datetime.now(), id_municipio=id_municipio, id_oficina=id_oficina, tipo=tipo, cantidad=cantidad
+        ))
 
-            while slot_actual_dt.time() <= hora_cierre_limite:
-                slot_time = slot_actual_dt.time()
+    def _cambiar_estado_en_resumen(self, turno, estado_nuevo):
+        """ Pasa un turno de su estado actual a 'estado_nuevo' en resumen_turnos. """
+        id_municipio = turno.oficina.id_municipio
+        fecha_cita = turno.fecha_solicitud.date()
+        self._contar_en_resumen(id_municipio, turno.id_oficina, fecha_cita, turno.estado, -1)
+        self._contar_en_resumen(id_municipio, turno.id_oficina, fecha_cita, estado_nuevo, 1)
 
-                slot_ocupado = db.session.scalar(
-                    db.select(Turnos.id_turno).where(
-                        Turnos.id_oficina == id_oficina,
-                        func.date(Turnos.fecha_solicitud) == fecha_a_revisar,
-                        Turnos.hora_solicitud == slot_time
-                    )
+    def reconstruir_resumen(self):
+        """
+        Recalcula 'resumen_turnos' desde 'turnos' (carga inicial o conciliación).
+        Retorna el número de filas generadas.
+        """
+        fecha_cita = func.date(Turnos.fecha_solicitud)
+        try:
+            db.session.execute(db.delete(ResumenTurnos))
+            db.session.execute(
+                db.insert(ResumenTurnos).from_select(
+                    ['id_municipio', 'id_oficina', 'estado', 'fecha', 'total'],
+                    db.select(OficinasRegionales.id_municipio, Turnos.id_oficina, Turnos.estado,
+                              fecha_cita, func.count(Turnos.id_turno))
+                    .join(Turnos.oficina)
+                    .where(Turnos.estado.is_not(None))
+                    .group_by(OficinasRegionales.id_municipio, Turnos.id_oficina, Turnos.estado, fecha_cita)
                 )
+            )
+            db.session.commit()
+            difusor_dashboard.notificar_cambio()
+            return db.session.scalar(db.select(func.count()).select_from(ResumenTurnos))
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error al reconstruir el resumen de turnos: {e}")
+            return None
 
-                if not slot_ocupado:
-                    return (fecha_a_revisar, slot_time)
-
-                slot_actual_dt += timedelta(minutes=SLOT_DURATION_MINUTES)
+    def reconstruir_indice_busqueda(self):
+        """
+        Regenera 'indice_busqueda' desde 'solicitantes' (carga inicial o tras
+        cambiar las reglas de normalización). Retorna el número de solicitantes.
+        """
+        try:
+            total = indice_busqueda.reconstruir()
+            db.session.commit()
+            return total
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error al reconstruir el índice de búsqueda: {e}")
+            return None
 
-        return (None, None)
+    def reconstruir_ocupacion(self):
+        """
+        Recalcula 'ocupacion_oficina_dia' desde 'turnos' (por si hubo un desfase).
+        Retorna el número de filas (oficina, día) generadas.
+        """
+        fecha_cita = func.date(Turnos.fecha_solicitud)
+        try:
+            db.session.execute(db.delete(OcupacionOficinaDia))
+            db.session.execute(
+                db.insert(OcupacionOficinaDia).from_select(
+                    ['id_oficina', 'fecha', 'turnos_asignados'],
+                    db.select(Turnos.id_oficina, fecha_cita, func.count(Turnos.id_turno))
+                    .where(Turnos.estado != 'cancelado')
+                    .group_by(Turnos.id_oficina, fecha_cita)
+                )
+            )
+            db.session.commit()
+            return db.session.scalar(db.select(func.count()).select_from(OcupacionOficinaDia))
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error al reconstruir la ocupación: {e}")
+            return None
 
     # --- MÉTODOS PARA OBTENER CATÁLOGOS ---
+    # Se sirven desde memoria (utils/cache_catalogos.py) como registros inmutables.
     def obtener_municipios(self):
-        return db.session.scalars(db.select(Municipios).order_by(Municipios.municipio)).all()
+        return cache_catalogos.municipios()
 
     def obtener_niveles(self):
-        return db.session.scalars(db.select(NivelesEducativos).order_by(NivelesEducativos.id_nivel)).all()
+        return cache_catalogos.niveles()
 
     def obtener_asuntos(self):
-        return db.session.scalars(db.select(Asuntos).order_by(Asuntos.descripcion)).all()
+        return cache_catalogos.asuntos()
 
     def obtener_oficinas_por_municipio(self, id_municipio):
-        return db.session.scalars(
-            db.select(OficinasRegionales)
-            .where(OficinasRegionales.id_municipio == id_municipio)
-            .order_by(OficinasRegionales.oficina)
-        ).all()
+        return cache_catalogos.oficinas_por_municipio(id_municipio)
+
+    def obtener_json_oficinas(self, id_municipio):
+        """ Oficinas del municipio ya serializadas para /api/oficinas (cuerpo + ETag). """
+        return cache_catalogos.json_oficinas(id_municipio)
+
+    def obtener_json_mapa_oficinas(self):
+        """ Mapa completo municipio -> oficinas ya serializado (cuerpo + ETag). """
+        return cache_catalogos.json_mapa_oficinas()
 
     # --- LÓGICA PRINCIPAL DEL TICKET (ACTUALIZADA Y CORREGIDA) ---
     def crear_turno(self, form_data):
@@ -148,19 +315,22 @@ class TicketController:
             print("❌ Error al crear turno: ID de oficina inválido o nulo.")
             return "ID de oficina inválido o nulo."
 
-        # 1. NO LLAMAR A _encontrar_proximo_horario() AQUÍ FUERA
+        # 1. NO BUSCAR EL SLOT (_reservar_proximo_horario) AQUÍ FUERA
 
         try:
             # 2. Iniciar la transacción PRIMERO
             with db.session.begin():
 
-                # 3. Buscar el horario DENTRO de la transacción
-                (fecha_cita, hora_cita) = self._encontrar_proximo_horario(id_oficina)
+                # 3. Reservar el slot DENTRO de la transacción. El INSERT en
+                #    reservas_horario y el UPDATE condicional del cupo diario
+                #    son los que resuelven la concurrencia.
+                reserva = self._reservar_proximo_horario(id_oficina)
 
                 # 4. Si no hay slot, lanzar un error para forzar el ROLLBACK
-                if fecha_cita is None:
+                if reserva is None:
                     raise ValueError(
                         "No se encontraron horarios disponibles. Asegúrese de que la oficina tenga horarios configurados en el admin.")
+                fecha_cita, hora_cita = reserva.fecha, reserva.hora
 
                 # --- El resto de la lógica original ---
                 curp_form = form_data.get('curp')
@@ -168,6 +338,7 @@ class TicketController:
                 solicitante = db.session.scalar(
                     db.select(Solicitantes).where(Solicitantes.curp == curp_form)
                 )
+                textos_previos = indice_busqueda.textos_de(solicitante) if solicitante else None
 
                 if not solicitante:
                     solicitante = Solicitantes(
@@ -190,27 +361,22 @@ class TicketController:
                     solicitante.celular = form_data.get('celular')
                     solicitante.correo = form_data.get('correo')
 
+                # El índice de búsqueda solo se toca si cambió algún campo buscable
+                if indice_busqueda.textos_de(solicitante) != textos_previos:
+                    db.session.flush()
+                    indice_busqueda.indexar({solicitante.id_solicitante: indice_busqueda.textos_de(solicitante)},
+                                            nuevos=textos_previos is None)
+
                 oficina_obj = db.session.get(OficinasRegionales, id_oficina)
                 if not oficina_obj:
                     raise ValueError(f"ID de oficina no válido: {id_oficina}")
 
                 id_municipio = oficina_obj.id_municipio
 
-                contador = db.session.scalars(
-                    db.select(ContadorTurnos)
-                    .where(ContadorTurnos.id_municipio == id_municipio)
-                    .with_for_update()
-                ).one_or_none()
-
-                if contador is None:
-                    contador = ContadorTurnos(
-                        id_municipio=id_municipio,
-                        ultimo_turno=0
-                    )
-                    db.session.add(contador)
-
-                contador.ultimo_turno += 1
-                siguiente_turno_folio = contador.ultimo_turno
+                # El folio se pide al final: en modo clásico el contador del
+                # municipio queda bloqueado (FOR UPDATE) solo hasta el commit;
+                # con FOLIO_BLOCK_SIZE > 1 sale de un bloque en memoria.
+                siguiente_turno_folio = asignador_folios.siguiente(id_municipio)
 
                 nuevo_turno = Turnos(
                     numero_turno=siguiente_turno_folio,
@@ -224,10 +390,16 @@ class TicketController:
                 nuevo_turno.oficina = oficina_obj
                 nuevo_turno.nivel = db.session.get(NivelesEducativos, form_data.get('nivel'))
                 nuevo_turno.asunto = db.session.get(Asuntos, form_data.get('asunto'))
+                nuevo_turno.reserva = reserva
 
                 db.session.add(nuevo_turno)
+                self._contar_en_resumen(id_municipio, id_oficina, fecha_cita, 'pendiente', 1)
+                self._registrar_evento(id_municipio, id_oficina, 'creado')
 
             # Si todo sale bien (el 'with' termina), el commit es automático
+            difusor_dashboard.notificar_cambio()
+            # El ciudadano casi siempre abre el PDF enseguida: se dibuja en segundo plano
+            cola_prerender.encolar(nuevo_turno.id_turno, curp_form)
             return nuevo_turno
 
         except (SQLAlchemyError, ValueError) as e:
@@ -236,6 +408,206 @@ class TicketController:
             print(error_msg)
             return error_msg  # Devolver el STRING del error original
 
+    # --- IMPORTACIÓN MASIVA (CSV) ---
+    def importar_turnos_csv(self, archivo_bytes):
+        """
+        Crea turnos a partir de un CSV (una fila por alumno, mismas columnas
+        que el formulario). Todas las filas se validan antes de tocar la BD y
+        las válidas se asignan en una sola pasada (ver _crear_turnos_lote).
+        Retorna {'error': str | None, 'resultados': [...], 'creados': int, 'fallidos': int};
+        cada resultado es un dict con 'fila', 'curp', 'ok' y 'mensaje'.
+        """
+        filas, error = leer_csv(archivo_bytes)
+        if error:
+            return {'error': error, 'resultados': [], 'creados': 0, 'fallidos': 0}
+
+        oficinas = cache_catalogos.oficinas()
+        validas, errores = validar_filas(
+            filas,
+            niveles=indexar_catalogo(self.obtener_niveles(), 'id_nivel', 'nivel'),
+            oficinas=indexar_catalogo(oficinas, 'id_oficina', 'oficina', 'id_municipio'),
+            asuntos=indexar_catalogo(self.obtener_asuntos(), 'id_asunto', 'descripcion'),
+            municipios=indexar_catalogo(self.obtener_municipios(), 'id_municipio', 'municipio')
+        )
+        municipio_de = {o.id_oficina: o.id_municipio for o in oficinas}
+
+        # codigo_qr (la CURP) es único: una CURP que ya tiene turno no puede sacar otro
+        con_turno = set()
+        curps = [fila['curp'] for fila in validas]
+        for i in range(0, len(curps), TAMANO_BLOQUE_IN):
+            con_turno.update(db.session.scalars(
+                db.select(Turnos.codigo_qr).where(Turnos.codigo_qr.in_(curps[i:i + TAMANO_BLOQUE_IN]))
+            ))
+        for fila in validas:
+            if fila['curp'] in con_turno:
+                errores[fila['fila']] = "La CURP ya tiene un turno registrado."
+        validas = [fila for fila in validas if fila['curp'] not in con_turno]
+
+        creados, sin_lugar = {}, []
+        if validas:
+            for _ in range(REINTENTOS_IMPORTACION):
+                try:
+                    creados, sin_lugar = self._crear_turnos_lote(validas, municipio_de)
+                    db.session.commit()
+                    if creados:
+                        difusor_dashboard.notificar_cambio()
+                    break
+                except (IntegrityError, _AgendaCambiada) as e:
+                    # Otra solicitud se llevó un slot o un lugar del cupo: se recalcula el lote
+                    db.session.rollback()
+                    print(f"Reintentando importación por conflicto de agenda: {e}")
+                    creados, sin_lugar = {}, []
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    print(f"❌ Error al importar turnos: {e}")
+                    return {'error': "Error de base de datos; no se creó ningún turno.",
+                            'resultados': [], 'creados': 0, 'fallidos': len(filas)}
+            else:
+                for fila in validas:
+                    errores[fila['fila']] = "Conflicto de agenda persistente; intente de nuevo."
+
+        for fila in sin_lugar:
+            errores[fila['fila']] = "No hay horarios disponibles en la oficina."
+
+        resultados = [{'fila': n, 'curp': (filas[n - 2].get('curp') or '').strip().upper(),
+                       'ok': False, 'mensaje': mensaje} for n, mensaje in errores.items()]
+        for fila in validas:
+            turno = creados.get(fila['fila'])
+            if turno:
+                resultados.append({
+                    'fila': fila['fila'], 'curp': fila['curp'], 'ok': True,
+                    'mensaje': f"Turno #{turno['numero_turno']} el "
+                               f"{turno['fecha_solicitud'].strftime('%Y-%m-%d %H:%M')}",
+                    'numero_turno': turno['numero_turno']
+                })
+        resultados.sort(key=lambda r: r['fila'])
+        return {'error': None, 'resultados': resultados,
+                'creados': len(creados), 'fallidos': len(resultados) - len(creados)}
+
+    def _crear_turnos_lote(self, filas, municipio_de):
+        """
+        Asigna y guarda un lote ya validado, sin hacer commit:
+        - una carga de agenda por oficina y asignación de slots en memoria,
+        - un UPDATE condicional de cupo por (oficina, día),
+        - upsert de Solicitantes por bloques,
+        - un bloque de folios por municipio,
+        - INSERT múltiple de turnos y de reservas_horario.
+        Retorna ({fila: datos del turno}, filas_sin_lugar). Lanza IntegrityError
+        o _AgendaCambiada si otra transacción ganó algún slot o cupo.
+        """
+        # 1. Slots en memoria, oficina por oficina
+        por_oficina = {}
+        for fila in filas:
+            por_oficina.setdefault(fila['oficina'], []).append(fila)
+
+        asignadas, sin_lugar = [], []
+        nuevos_por_dia, max_por_dia = {}, {}
+        for id_oficina, grupo in por_oficina.items():
+            horarios, ocupados, conteos, ahora = self._cargar_agenda(id_oficina)
+            slots = iterar_slots_libres(horarios, ocupados, conteos, ahora)
+            for fila in grupo:
+                for fecha_cita, hora_cita in slots:
+                    dia = (id_oficina, fecha_cita)
+                    max_por_dia[dia] = horarios[fecha_cita.weekday()].max_turnos_dia
+                    if conteos.get(fecha_cita, 0) + nuevos_por_dia.get(dia, 0) < max_por_dia[dia]:
+                        break
+                else:
+                    sin_lugar.append(fila)
+                    continue
+                nuevos_por_dia[dia] = nuevos_por_dia.get(dia, 0) + 1
+                asignadas.append((fila, fecha_cita, hora_cita))
+
+        if not asignadas:
+            return {}, sin_lugar
+
+        # 2. Cupo diario: el UPDATE condicional detecta si alguien más llenó el día.
+        #    El resumen del dashboard se suma con la misma granularidad.
+        for (id_oficina, fecha_cita), cantidad in nuevos_por_dia.items():
+            if not self._ocupar_cupo(id_oficina, fecha_cita, max_por_dia[(id_oficina, fecha_cita)], cantidad):
+                raise _AgendaCambiada(f"oficina {id_oficina}, {fecha_cita}")
+            self._contar_en_resumen(municipio_de[id_oficina], id_oficina, fecha_cita, 'pendiente', cantidad)
+            self._registrar_evento(municipio_de[id_oficina], id_oficina, 'creado', cantidad)
+
+        # 3. Solicitantes: los existentes se actualizan, los nuevos se insertan
+        def datos_solicitante(fila):
+            return {
+                'nombre_tramitante': fila['nombreCompleto'],
+                'nombre_solicitante': fila['nombre'],
+                'paterno_solicitante': fila['paterno'],
+                'materno_solicitante': fila['materno'],
+                'curp': fila['curp'],
+                'telefono': fila['telefono'],
+                'celular': fila['celular'],
+                'correo': fila['correo']
+            }
+
+        curps = [fila['curp'] for fila, _, _ in asignadas]
+        id_por_curp = self._ids_solicitantes(curps)
+        existentes = [dict(datos_solicitante(fila), id_solicitante=id_por_curp[fila['curp']])
+                      for fila, _, _ in asignadas if fila['curp'] in id_por_curp]
+        nuevos = [datos_solicitante(fila) for fila, _, _ in asignadas if fila['curp'] not in id_por_curp]
+        if existentes:
+            db.session.execute(db.update(Solicitantes), existentes)
+        if nuevos:
+            db.session.execute(db.insert(Solicitantes), nuevos)
+            id_por_curp.update(self._ids_solicitantes([s['curp'] for s in nuevos]))
+
+        def textos(datos):
+            return (datos['curp'], datos['nombre_solicitante'], datos['paterno_solicitante'],
+                    datos['materno_solicitante'], datos['nombre_tramitante'])
+
+        if existentes:
+            indice_busqueda.indexar({s['id_solicitante']: textos(s) for s in existentes})
+        if nuevos:
+            indice_busqueda.indexar({id_por_curp[s['curp']]: textos(s) for s in nuevos}, nuevos=True)
+
+        # 4. Folios: un solo pedido por municipio
+        por_municipio = {}
+        for fila, _, _ in asignadas:
+            por_municipio.setdefault(municipio_de[fila['oficina']], []).append(fila['fila'])
+        folio_de = {}
+        for id_municipio, numeros_fila in por_municipio.items():
+            folio_de.update(zip(numeros_fila, asignador_folios.reservar(id_municipio, len(numeros_fila))))
+
+        # 5. Turnos y reservas
+        turnos = {}
+        for fila, fecha_cita, hora_cita in asignadas:
+            turnos[fila['fila']] = {
+                'id_solicitante': id_por_curp[fila['curp']],
+                'id_oficina': fila['oficina'],
+                'numero_turno': folio_de[fila['fila']],
+                'fecha_solicitud': datetime.combine(fecha_cita, hora_cita),
+                'hora_solicitud': hora_cita,
+                'id_nivel': fila['nivel'],
+                'id_asunto': fila['asunto'],
+                'estado': 'pendiente',
+                'codigo_qr': fila['curp']
+            }
+        db.session.execute(db.insert(Turnos), list(turnos.values()))
+
+        id_turno_de = {}
+        for i in range(0, len(curps), TAMANO_BLOQUE_IN):
+            id_turno_de.update(db.session.execute(
+                db.select(Turnos.codigo_qr, Turnos.id_turno)
+                .where(Turnos.codigo_qr.in_(curps[i:i + TAMANO_BLOQUE_IN]))
+            ).all())
+        db.session.execute(db.insert(ReservasHorario), [
+            {'id_oficina': t['id_oficina'], 'fecha': t['fecha_solicitud'].date(),
+             'hora': t['hora_solicitud'], 'id_turno': id_turno_de[t['codigo_qr']]}
+            for t in turnos.values()
+        ])
+        return turnos, sin_lugar
+
+    def _ids_solicitantes(self, curps):
+        """ {curp: id_solicitante} de las CURPs que ya existen, consultando por bloques. """
+        ids = {}
+        for i in range(0, len(curps), TAMANO_BLOQUE_IN):
+            ids.update(db.session.execute(
+                db.select(Solicitantes.curp, Solicitantes.id_solicitante)
+                .where(Solicitantes.curp.in_(curps[i:i + TAMANO_BLOQUE_IN]))
+            ).all())
+        return ids
+
     def buscar_turno(self, numero_turno, curp):
         """ Busca un turno usando relaciones ORM. """
         return db.session.scalar(
@@ -253,6 +625,17 @@ class TicketController:
             )
         )
 
+    def get_codigo_qr(self, id_turno, curp):
+        """ Contenido del QR del turno (codigo_qr), o None si el turno y la CURP no coinciden. """
+        return db.session.scalar(
+            db.select(Turnos.codigo_qr)
+            .join(Turnos.solicitante)
+            .where(
+                Turnos.id_turno == id_turno,
+                Solicitantes.curp == curp
+            )
+        )
+
     def get_datos_comprobante(self, id_turno, curp):
         """ Obtiene todos los datos para el PDF y los devuelve como un DICT. """
         turno = db.session.scalar(
@@ -273,6 +656,34 @@ class TicketController:
         if not turno:
             return None
 
+        return self._datos_comprobante(turno)
+
+    def get_datos_comprobantes_dia(self, id_oficina, fecha):
+        """
+        Los datos de comprobante (mismo DICT que get_datos_comprobante) de
+        todos los turnos no cancelados de una oficina en una fecha, en orden
+        de hora. Para la impresión del día (utils/pdf_lote.py).
+        """
+        inicio = datetime.combine(fecha, time.min)
+        turnos = db.session.scalars(
+            db.select(Turnos)
+            .options(
+                joinedload(Turnos.solicitante),
+                joinedload(Turnos.oficina).joinedload(OficinasRegionales.municipio),
+                joinedload(Turnos.nivel),
+                joinedload(Turnos.asunto)
+            )
+            .where(
+                Turnos.id_oficina == id_oficina,
+                Turnos.fecha_solicitud >= inicio,
+                Turnos.fecha_solicitud < inicio + timedelta(days=1),
+                Turnos.estado != 'cancelado'
+            )
+            .order_by(Turnos.hora_solicitud, Turnos.numero_turno)
+        )
+        return [self._datos_comprobante(turno) for turno in turnos]
+
+    def _datos_comprobante(self, turno):
         return {
             'numero_turno': turno.numero_turno,
             'fecha_solicitud': turno.fecha_solicitud,
@@ -282,6 +693,7 @@ class TicketController:
             'paterno_solicitante': turno.solicitante.paterno_solicitante,
             'materno_solicitante': turno.solicitante.materno_solicitante,
             'curp': turno.solicitante.curp,
+            'codigo_qr': turno.codigo_qr,  # Lo mismo que sirve /ticket/qr (get_codigo_qr)
             'telefono': turno.solicitante.telefono,
             'celular': turno.solicitante.celular,
             'correo': turno.solicitante.correo,
@@ -299,7 +711,7 @@ class TicketController:
             'municipios': self.obtener_municipios(),
             'niveles': self.obtener_niveles(),
             'asuntos': self.obtener_asuntos(),
-            'oficinas': db.session.scalars(db.select(OficinasRegionales)).all()  # Cargar todas para el admin
+            'oficinas': cache_catalogos.oficinas()  # Cargar todas para el admin
         }
 
     def buscar_turno_para_editar(self, numero_turno, curp):
@@ -401,6 +813,8 @@ class TicketController:
                     return False
 
                 # 2. Actualizar datos del Solicitante
+                textos_previos = indice_busqueda.textos_de(solicitante)
+                curp_previa = solicitante.curp
                 solicitante.nombre_tramitante = form_data.get('nombreCompleto')
                 solicitante.nombre_solicitante = form_data.get('nombre')
                 solicitante.paterno_solicitante = form_data.get('paterno')
@@ -409,15 +823,45 @@ class TicketController:
                 solicitante.telefono = form_data.get('telefono')
                 solicitante.celular = form_data.get('celular')
                 solicitante.correo = form_data.get('correo')
+                if indice_busqueda.textos_de(solicitante) != textos_previos:
+                    indice_busqueda.indexar({solicitante.id_solicitante: indice_busqueda.textos_de(solicitante)})
+                if solicitante.curp != curp_previa:
+                    # El QR del turno es su CURP: el comprobante y /ticket/qr deben seguir coincidiendo
+                    db.session.execute(
+                        db.update(Turnos)
+                        .where(Turnos.id_solicitante == solicitante.id_solicitante,
+                               Turnos.codigo_qr == curp_previa)
+                        .values(codigo_qr=solicitante.curp)
+                    )
 
                 # 3. Actualizar datos del Turno
+                id_oficina_nueva = form_data.get('oficina', type=int)
+                if turno.id_oficina != id_oficina_nueva:
+                    # El resumen del dashboard cuenta todos los estados, incluso cancelados
+                    oficina_nueva = db.session.get(OficinasRegionales, id_oficina_nueva)
+                    if not oficina_nueva:
+                        raise ValueError(f"ID de oficina no válido: {id_oficina_nueva}")
+                    fecha_cita = turno.fecha_solicitud.date()
+                    self._contar_en_resumen(turno.oficina.id_municipio, turno.id_oficina, fecha_cita, turno.estado, -1)
+                    self._contar_en_resumen(oficina_nueva.id_municipio, id_oficina_nueva, fecha_cita, turno.estado, 1)
+                if turno.id_oficina != id_oficina_nueva and turno.estado != 'cancelado':
+                    # La cita se mueve con el turno; si el slot ya está tomado
+                    # en la nueva oficina, uq_reserva_slot aborta la edición.
+                    if turno.reserva is not None:
+                        turno.reserva.id_oficina = id_oficina_nueva
+                    fecha_cita = turno.fecha_solicitud.date()
+                    self._liberar_cupo(turno.id_oficina, fecha_cita)
+                    self._ocupar_cupo_de_cita(id_oficina_nueva, fecha_cita)
+
                 turno.id_nivel = form_data.get('nivel', type=int)
-                turno.id_oficina = form_data.get('oficina', type=int)
+                turno.id_oficina = id_oficina_nueva
                 turno.id_asunto = form_data.get('asunto', type=int)
 
                 # (Nota: No actualizamos la fecha/hora/folio, solo los datos del trámite)
 
-            # Si el 'with' termina sin error, el commit es automático
+            # Si el 'with' termina sin error, el commit es automático.
+            # El aviso también invalida la primera página del listado del admin.
+            difusor_dashboard.notificar_cambio()
             return True
         except (SQLAlchemyError, ValueError) as e:
             db.session.rollback()
@@ -426,46 +870,164 @@ class TicketController:
 
     # --- FIN DE FUNCIONES FALTANTES ---
 
-    def buscar_turnos_admin(self, query, vista="activos"):
-        """ Busca turnos usando ORM con JOINs y filtro ILIKE. """
-        try:
-            search_query = f"%{query}%"
-            stmt = db.select(Turnos).options(
-                joinedload(Turnos.solicitante),
-                joinedload(Turnos.oficina)
-            ).join(Turnos.solicitante)
-
-            if query:
-                stmt = stmt.where(
-                    or_(
-                        Solicitantes.curp.ilike(search_query),
-                        Solicitantes.nombre_solicitante.ilike(search_query)
-                    )
-                )
+    def _filtrar_turnos_admin(self, stmt, query, vista, desde=None, hasta=None, id_oficina=None):
+        """
+        Filtros comunes del listado y la exportación del admin. 'stmt' ya debe
+        incluir el JOIN con Solicitantes. 'vista' es 'activos', 'cancelados' o
+        'todos'; 'desde'/'hasta' son fechas (date) inclusivas de la cita.
+        """
+        query = (query or '').strip()
+        if query:
+            condiciones = []
+            por_texto = indice_busqueda.condicion(query)
+            if por_texto is not None:
+                condiciones.append(por_texto)
+            if query.isdigit():
+                condiciones.append(Turnos.numero_turno == int(query))
+            if not condiciones:
+                # Búsqueda de un solo carácter: no está en el índice; se busca
+                # como antes en la CURP y el nombre del alumno
+                condiciones.append(Solicitantes.curp.ilike(f"%{query}%"))
+                condiciones.append(Solicitantes.nombre_solicitante.ilike(f"%{query}%"))
+            stmt = stmt.where(or_(*condiciones))
+
+        if vista == "cancelados":
+            stmt = stmt.where(Turnos.estado == 'cancelado')
+        elif vista != "todos":
+            stmt = stmt.where(Turnos.estado != 'cancelado')
+
+        if desde:
+            stmt = stmt.where(Turnos.fecha_solicitud >= datetime.combine(desde, time.min))
+        if hasta:
+            stmt = stmt.where(Turnos.fecha_solicitud < datetime.combine(hasta + timedelta(days=1), time.min))
+        if id_oficina:
+            stmt = stmt.where(Turnos.id_oficina == id_oficina)
+        return stmt
+
+    def exportar_turnos(self, query, vista="todos", desde=None, hasta=None, id_oficina=None):
+        """
+        Generador de filas (tuplas planas) para exportar turnos con solicitante,
+        oficina, nivel y asunto. Usa un cursor del lado del servidor
+        (stream_results + yield_per): la memoria no depende del número de filas.
+        El primer elemento son los encabezados.
+        """
+        stmt = (
+            db.select(
+                Turnos.numero_turno, Turnos.fecha_solicitud, Turnos.hora_solicitud, Turnos.estado,
+                Solicitantes.curp, Solicitantes.nombre_solicitante, Solicitantes.paterno_solicitante,
+                Solicitantes.materno_solicitante, Solicitantes.nombre_tramitante,
+                Solicitantes.celular, Solicitantes.telefono, Solicitantes.correo,
+                Municipios.municipio, OficinasRegionales.oficina,
+                NivelesEducativos.nivel, Asuntos.descripcion
+            )
+            .join(Turnos.solicitante)
+            .join(Turnos.oficina)
+            .join(OficinasRegionales.municipio)
+            .join(Turnos.nivel)
+            .join(Turnos.asunto)
+        )
+        stmt = self._filtrar_turnos_admin(stmt, query, vista, desde, hasta, id_oficina)
+        stmt = stmt.order_by(Turnos.fecha_solicitud, Turnos.id_turno)
 
-            if vista == "cancelados":
-                stmt = stmt.where(Turnos.estado == 'cancelado')
-            else:
-                stmt = stmt.where(Turnos.estado != 'cancelado')
+        yield ('Folio', 'Fecha', 'Hora', 'Estado', 'CURP', 'Nombre', 'Paterno', 'Materno', 'Tramitante',
+               'Celular', 'Teléfono', 'Correo', 'Municipio', 'Oficina', 'Nivel', 'Asunto')
+        resultado = db.session.execute(stmt.execution_options(stream_results=True, yield_per=TAMANO_BLOQUE_EXPORTACION))
+        for fila in resultado:
+            yield tuple(fila)
+
+    def buscar_turnos_admin(self, query, vista="activos", cursor=None, direccion="siguiente"):
+        """
+        Busca turnos por CURP, nombre, apellidos, tramitante (subcadenas, vía
+        'indice_busqueda') o folio exacto, más recientes primero.
+
+        Paginación por llave sobre (fecha_solicitud, id_turno), sin OFFSET:
+        'cursor' es el de la última fila vista ('siguiente') o el de la primera
+        ('anterior'). Retorna {'turnos': [...], 'siguiente': cursor | None,
+        'anterior': cursor | None}.
 
-            stmt = stmt.order_by(Turnos.fecha_solicitud.desc()).limit(50)
-            return db.session.scalars(stmt).all()
+        La primera página sin búsqueda (la que abren todos al entrar) sale de
+        cache_listado_admin: peticiones simultáneas comparten una consulta.
+        """
+        try:
+            if not (query or '').strip() and not cursor and vista in VISTAS_ADMIN:
+                return cache_listado_admin.obtener(
+                    vista, lambda: self._consultar_turnos_admin('', vista, None, direccion)
+                )
+            return self._consultar_turnos_admin(query, vista, cursor, direccion)
         except SQLAlchemyError as e:
             print(f"Error al buscar turnos (admin): {e}")
-            return []
+            return {'turnos': [], 'siguiente': None, 'anterior': None}
+
+    def _consultar_turnos_admin(self, query, vista, cursor, direccion):
+        """ La consulta de buscar_turnos_admin; deja pasar SQLAlchemyError. """
+        vacio = {'turnos': [], 'siguiente': None, 'anterior': None}
+        # Solo las columnas que muestra el listado, en registros TurnoResumen
+        stmt = db.select(
+            Turnos.id_turno, Turnos.numero_turno, Turnos.fecha_solicitud, Turnos.estado,
+            Solicitantes.nombre_solicitante, Solicitantes.paterno_solicitante, Solicitantes.curp,
+            OficinasRegionales.oficina
+        ).join(Turnos.solicitante).join(Turnos.oficina)
+        stmt = self._filtrar_turnos_admin(stmt, query, vista)
+
+        hacia_atras = direccion == "anterior"
+        llave = decodificar_cursor(cursor)
+        if llave:
+            fecha, id_turno = llave
+            if hacia_atras:
+                stmt = stmt.where(or_(Turnos.fecha_solicitud > fecha,
+                                      and_(Turnos.fecha_solicitud == fecha, Turnos.id_turno > id_turno)))
+            else:
+                stmt = stmt.where(or_(Turnos.fecha_solicitud < fecha,
+                                      and_(Turnos.fecha_solicitud == fecha, Turnos.id_turno < id_turno)))
+
+        if hacia_atras and llave:
+            stmt = stmt.order_by(Turnos.fecha_solicitud.asc(), Turnos.id_turno.asc())
+        else:
+            stmt = stmt.order_by(Turnos.fecha_solicitud.desc(), Turnos.id_turno.desc())
+
+        # Una fila de más indica si hay otra página en esa dirección
+        filas = [TurnoResumen(*fila) for fila in db.session.execute(stmt.limit(TAMANO_PAGINA + 1))]
+        hay_mas = len(filas) > TAMANO_PAGINA
+        turnos = filas[:TAMANO_PAGINA]
+        if hacia_atras and llave:
+            turnos.reverse()
+        if not turnos:
+            return vacio
+
+        primero = codificar_cursor(turnos[0].fecha_solicitud, turnos[0].id_turno)
+        ultimo = codificar_cursor(turnos[-1].fecha_solicitud, turnos[-1].id_turno)
+        if hacia_atras and llave:
+            return {'turnos': turnos, 'siguiente': ultimo, 'anterior': primero if hay_mas else None}
+        return {'turnos': turnos, 'siguiente': ultimo if hay_mas else None,
+                'anterior': primero if llave else None}
 
     def cambiar_estado_turno(self, id_turno, nuevo_estado):
-        """ Actualiza el estado de un turno. """
-        if nuevo_estado not in ('pendiente', 'resuelto'):
+        """
+        Actualiza el estado de un turno. Al entrar o salir de 'cancelado'
+        se libera o se vuelve a ocupar su slot y su cupo del día.
+        """
+        if nuevo_estado not in ('pendiente', 'resuelto', 'cancelado'):
             return False
         try:
-            turno = db.session.get(Turnos, id_turno)
+            # FOR UPDATE: dos cancelaciones simultáneas no deben liberar el cupo dos veces
+            turno = db.session.get(Turnos, id_turno, with_for_update=True)
             if turno:
+                if nuevo_estado == 'cancelado' and turno.estado != 'cancelado':
+                    self._liberar_cita(turno)
+                elif nuevo_estado != 'cancelado' and turno.estado == 'cancelado':
+                    self._recuperar_cita(turno)
+                if nuevo_estado != turno.estado:
+                    self._cambiar_estado_en_resumen(turno, nuevo_estado)
+                    if nuevo_estado != 'pendiente':
+                        self._registrar_evento(turno.oficina.id_municipio, turno.id_oficina, nuevo_estado)
+                cambio = nuevo_estado != turno.estado
                 turno.estado = nuevo_estado
                 db.session.commit()
+                if cambio:
+                    difusor_dashboard.notificar_cambio()
                 return True
             return False
-        except SQLAlchemyError as e:
+        except (SQLAlchemyError, ValueError) as e:
             db.session.rollback()
             print(f"Error al cambiar estado: {e}")
             return False
@@ -475,37 +1037,44 @@ class TicketController:
         return self.cambiar_estado_turno(id_turno, 'cancelado')
 
     def get_stats_dashboard(self):
-        """ Obtiene las estadísticas para el dashboard usando ORM. """
+        """
+        Obtiene las estadísticas para el dashboard desde 'resumen_turnos'
+        (unos cientos de filas) en lugar de agrupar toda la tabla 'turnos'.
+        Las peticiones simultáneas comparten un cálculo (cache_estadisticas).
+        """
         try:
-            totales_query = db.select(Turnos.estado, func.count(Turnos.id_turno)) \
-                .group_by(Turnos.estado)
-            totales_data_raw = db.session.execute(totales_query).all()
-            totales_data = [{'estado': r[0], 'total': r[1]} for r in totales_data_raw]
-
-            municipios_query = db.select(Municipios.municipio, Turnos.estado, func.count(Turnos.id_turno)) \
-                .join(Turnos.oficina) \
-                .join(OficinasRegionales.municipio) \
-                .where(Turnos.estado.in_(['pendiente', 'resuelto', 'cancelado'])) \
-                .group_by(Municipios.municipio, Turnos.estado) \
-                .order_by(Municipios.municipio, Turnos.estado)
-            municipios_data_raw = db.session.execute(municipios_query).all()
-
-            municipios_proc = {}
-            for row in municipios_data_raw:
-                muni, estado, total = row
-                if muni not in municipios_proc:
-                    municipios_proc[muni] = {'pendiente': 0, 'resuelto': 0, 'cancelado': 0}
-                if estado in municipios_proc[muni]:
-                    municipios_proc[muni][estado] = total
-
-            return {
-                "totales": totales_data,
-                "por_municipio": municipios_proc
-            }
+            return cache_estadisticas.obtener('dashboard', self._calcular_stats_dashboard)
         except SQLAlchemyError as e:
             print(f"Error al obtener estadísticas del dashboard: {e}")
             return None
 
+    def _calcular_stats_dashboard(self):
+        """ La consulta de get_stats_dashboard; deja pasar SQLAlchemyError. """
+        totales_query = db.select(ResumenTurnos.estado, func.sum(ResumenTurnos.total)) \
+            .group_by(ResumenTurnos.estado)
+        totales_data_raw = db.session.execute(totales_query).all()
+        totales_data = [{'estado': r[0], 'total': int(r[1] or 0)} for r in totales_data_raw]
+
+        municipios_query = db.select(Municipios.municipio, ResumenTurnos.estado, func.sum(ResumenTurnos.total)) \
+            .join(Municipios, Municipios.id_municipio == ResumenTurnos.id_municipio) \
+            .group_by(Municipios.municipio, ResumenTurnos.estado) \
+            .having(func.sum(ResumenTurnos.total) > 0) \
+            .order_by(Municipios.municipio, ResumenTurnos.estado)
+        municipios_data_raw = db.session.execute(municipios_query).all()
+
+        municipios_proc = {}
+        for row in municipios_data_raw:
+            muni, estado, total = row
+            if muni not in municipios_proc:
+                municipios_proc[muni] = {'pendiente': 0, 'resuelto': 0, 'cancelado': 0}
+            if estado in municipios_proc[muni]:
+                municipios_proc[muni][estado] = int(total)
+
+        return {
+            "totales": [t for t in totales_data if t['total'] > 0],
+            "por_municipio": municipios_proc
+        }
+
     def eliminar_turno_publico(self, numero_turno, curp):
         """
         Busca un turno por su número y CURP del solicitante,
@@ -521,13 +1090,18 @@ class TicketController:
                     Solicitantes.curp == curp,
                     Turnos.estado == 'pendiente'
                 )
+                .with_for_update()
             )
 
             if not turno_a_cancelar:
                 return False
 
+            self._liberar_cita(turno_a_cancelar)
+            self._cambiar_estado_en_resumen(turno_a_cancelar, 'cancelado')
+            self._registrar_evento(turno_a_cancelar.oficina.id_municipio, turno_a_cancelar.id_oficina, 'cancelado')
             turno_a_cancelar.estado = 'cancelado'
             db.session.commit()
+            difusor_dashboard.notificar_cambio()
             return True
 
         except SQLAlchemyError as e:
@@ -0,0 +1,73 @@
+# mantenimiento.py
+import argparse
+from flask import Flask
+from DB.db import db  # Importamos la instancia de BD
+from config import Config
+from controllers.ticket_controller import TicketController
+from controllers.estadisticas_controller import EstadisticasController
+
+
+def crear_app_temporal():
+    # Creamos una app temporal solo para este script (igual que create_admin.py)
+    temp_app = Flask(__name__)
+    temp_app.config.from_object(Config)
+    db.init_app(temp_app)
+    return temp_app
+
+
+def reconstruir_ocupacion(args):
+    total = TicketController().reconstruir_ocupacion()
+    if total is None:
+        print("❌ No se pudo reconstruir la ocupación por oficina/día.")
+    else:
+        print(f"✅ Ocupación reconstruida: {total} filas (oficina, día).")
+
+
+def reconstruir_indice(args):
+    total = TicketController().reconstruir_indice_busqueda()
+    if total is None:
+        print("❌ No se pudo reconstruir el índice de búsqueda.")
+    else:
+        print(f"✅ Índice de búsqueda reconstruido: {total} solicitantes.")
+
+
+def reconstruir_estadisticas(args):
+    total = TicketController().reconstruir_resumen()
+    if total is None:
+        print("❌ No se pudo reconstruir el resumen del dashboard.")
+    else:
+        print(f"✅ Resumen del dashboard reconstruido: {total} filas.")
+
+
+def compactar_eventos(args):
+    total = EstadisticasController().compactar_eventos()
+    if total is None:
+        print("❌ No se pudieron compactar los eventos de turnos.")
+    else:
+        print(f"✅ Eventos compactados en estadisticas_hora/estadisticas_dia: {total}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la BD de turnos.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subparsers.add_parser("ocupacion", help="Recalcula ocupacion_oficina_dia desde turnos.")
+    sub.set_defaults(func=reconstruir_ocupacion)
+
+    sub = subparsers.add_parser("indice", help="Regenera indice_busqueda desde solicitantes.")
+    sub.set_defaults(func=reconstruir_indice)
+
+    sub = subparsers.add_parser("estadisticas", help="Recalcula resumen_turnos (dashboard) desde turnos.")
+    sub.set_defaults(func=reconstruir_estadisticas)
+
+    sub = subparsers.add_parser("compactar",
+                                help="Suma eventos_turno en las series por hora/día (programar en cron).")
+    sub.set_defaults(func=compactar_eventos)
+
+    args = parser.parse_args()
+    with crear_app_temporal().app_context():
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,24 @@ from flask_login import UserMixin
 
 class Admin(UserMixin):
     """
-    Modelo para la tabla 'administradores' de la base de datos.
+    El administrador de la sesión (current_user): solo lo que se necesita
+    para identificarlo, sin el hash de la contraseña. Es inmutable porque la
+    misma instancia se comparte entre peticiones (ver utils/cache_principales.py).
     UserMixin proporciona implementaciones para métodos que flask-login espera
     (is_authenticated, is_active, is_anonymous, get_id).
     """
-    def __init__(self, id_admin, usuario, password, rol, nombre, **kwargs):
-        """
-        Constructor actualizado para aceptar 'nombre' y cualquier
-        otro campo de la BD (gracias a **kwargs).
-        """
-        self.id = id_admin # flask-login espera un atributo 'id'
-        self.id_admin = id_admin
-        self.usuario = usuario
-        self.password = password
-        self.rol = rol
-        self.nombre = nombre # <-- ¡LA LÍNEA QUE FALTABA!
\ No newline at end of file
+    def __init__(self, id_admin, usuario, rol, nombre, **kwargs):
+        """ Acepta cualquier otro campo de la BD (p. ej. password) y lo ignora. """
+        object.__setattr__(self, 'id', id_admin)  # flask-login espera un atributo 'id'
+        object.__setattr__(self, 'id_admin', id_admin)
+        object.__setattr__(self, 'usuario', usuario)
+        object.__setattr__(self, 'rol', rol)
+        object.__setattr__(self, 'nombre', nombre)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("Admin es inmutable")
+
+    @classmethod
+    def desde_registro(cls, registro):
+        """ Copia de un registro ORM de Administradores. """
+        return cls(registro.id_admin, registro.usuario, registro.rol, registro.nombre)
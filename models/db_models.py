@@ -87,6 +87,98 @@ class HorariosAtencion(db.Model):
 
 # --- MODELOS DE CONTROL ---
 
+#
+class OcupacionOficinaDia(db.Model):
+    """
+    Turnos activos (no cancelados) por oficina y día de cita. Se mantiene en la
+    misma transacción que crea/cancela turnos para que revisar el cupo contra
+    HorariosAtencion.max_turnos_dia sea una lectura por llave primaria.
+    """
+    __tablename__ = 'ocupacion_oficina_dia'
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    turnos_asignados = db.Column(db.SmallInteger, default=0, nullable=False)
+
+
+#
+class ResumenTurnos(db.Model):
+    """
+    Conteo de turnos por (municipio, oficina, estado, día de la cita). Se
+    actualiza en la misma transacción que cada alta o cambio de estado, para
+    que el dashboard lea unos cientos de filas en lugar de todo 'turnos'.
+    """
+    __tablename__ = 'resumen_turnos'
+    id_municipio = db.Column(db.SmallInteger, db.ForeignKey('municipios.id_municipio'), primary_key=True)
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), primary_key=True)
+    estado = db.Column(db.Enum('pendiente', 'resuelto', 'cancelado'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+
+
+#
+class EventosTurno(db.Model):
+    """
+    Bitácora corta de altas, resoluciones y cancelaciones. Se escribe en la
+    misma transacción que el cambio y el compactador (mantenimiento.py
+    compactar) la vacía hacia estadisticas_hora / estadisticas_dia.
+    """
+    __tablename__ = 'eventos_turno'
+    id_evento = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    fecha = db.Column(db.DateTime, nullable=False, index=True)
+    id_municipio = db.Column(db.SmallInteger, db.ForeignKey('municipios.id_municipio'), nullable=False)
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), nullable=False)
+    tipo = db.Column(db.Enum('creado', 'resuelto', 'cancelado'), nullable=False)
+    cantidad = db.Column(db.Integer, default=1, nullable=False)
+
+
+#
+class EstadisticasHora(db.Model):
+    """ Eventos compactados por hora (hora truncada), municipio, oficina y tipo. """
+    __tablename__ = 'estadisticas_hora'
+    hora = db.Column(db.DateTime, primary_key=True)
+    id_municipio = db.Column(db.SmallInteger, db.ForeignKey('municipios.id_municipio'), primary_key=True)
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), primary_key=True)
+    tipo = db.Column(db.Enum('creado', 'resuelto', 'cancelado'), primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+
+
+#
+class EstadisticasDia(db.Model):
+    """ Eventos compactados por día, municipio, oficina y tipo. """
+    __tablename__ = 'estadisticas_dia'
+    fecha = db.Column(db.Date, primary_key=True)
+    id_municipio = db.Column(db.SmallInteger, db.ForeignKey('municipios.id_municipio'), primary_key=True)
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), primary_key=True)
+    tipo = db.Column(db.Enum('creado', 'resuelto', 'cancelado'), primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+
+
+#
+class IndiceBusqueda(db.Model):
+    """
+    Índice de búsqueda de solicitantes: cada palabra de CURP, nombre, apellidos
+    y tramitante se guarda normalizada con todos sus sufijos, así que buscar
+    una subcadena se vuelve un LIKE 'texto%' sobre la llave primaria
+    (ver utils/indice_busqueda.py).
+    """
+    __tablename__ = 'indice_busqueda'
+    token = db.Column(db.String(60), primary_key=True)
+    id_solicitante = db.Column(db.Integer, db.ForeignKey('solicitantes.id_solicitante'),
+                               primary_key=True, index=True)
+
+
+#
+class VersionCatalogos(db.Model):
+    """
+    Una sola fila (id_version = 1) cuya 'version' sube con cada cambio de
+    catálogo. Los procesos la consultan cada pocos segundos para saber si
+    deben descartar sus catálogos en memoria (ver utils/version_catalogos.py).
+    """
+    __tablename__ = 'version_catalogos'
+    id_version = db.Column(TINYINT(unsigned=True), primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
 #
 class ContadorTurnos(db.Model):
     __tablename__ = 'contador_turnos'
@@ -137,7 +229,7 @@ class Turnos(db.Model):
     id_turno = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_solicitante = db.Column(db.Integer, db.ForeignKey('solicitantes.id_solicitante'), nullable=False)
     id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), nullable=False)
-    numero_turno = db.Column(db.SmallInteger, nullable=False)
+    numero_turno = db.Column(db.SmallInteger, nullable=False, index=True)  # Búsqueda por folio
 
     # --- CAMPOS MODIFICADOS ---
     # Almacena la fecha Y hora de la CITA
@@ -160,4 +252,31 @@ class Turnos(db.Model):
     solicitante = db.relationship('Solicitantes', back_populates='turnos')
     oficina = db.relationship('OficinasRegionales', back_populates='turnos')
     nivel = db.relationship('NivelesEducativos', back_populates='turnos')
-    asunto = db.relationship('Asuntos', back_populates='turnos')
\ No newline at end of file
+    asunto = db.relationship('Asuntos', back_populates='turnos')
+    reserva = db.relationship('ReservasHorario', back_populates='turno', uselist=False)
+
+    __table_args__ = (
+        # Paginación por llave (keyset) del listado del admin
+        db.Index('idx_fecha_turno', 'fecha_solicitud', 'id_turno'),
+    )
+
+
+#
+class ReservasHorario(db.Model):
+    """
+    Libro de reservas de slots: una fila por (oficina, fecha, hora) ocupada.
+    La restricción única es la que impide que dos solicitudes concurrentes
+    se queden con la misma cita.
+    """
+    __tablename__ = 'reservas_horario'
+    id_reserva = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_oficina = db.Column(db.SmallInteger, db.ForeignKey('oficinas_regionales.id_oficina'), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    hora = db.Column(db.Time, nullable=False)
+    id_turno = db.Column(db.Integer, db.ForeignKey('turnos.id_turno'), nullable=True, unique=True)
+
+    turno = db.relationship('Turnos', back_populates='reserva')
+
+    __table_args__ = (
+        db.UniqueConstraint('id_oficina', 'fecha', 'hora', name='uq_reserva_slot'),
+    )
\ No newline at end of file
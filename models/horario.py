@@ -0,0 +1,18 @@
+# models/horario.py
+class HorarioResumen:
+    """
+    Fila del listado de horarios de atención del admin, con el nombre de la
+    oficina ya resuelto (ver CatalogoController.get_horarios).
+    """
+    __slots__ = ('id_horario', 'id_oficina', 'oficina', 'dia_semana',
+                 'hora_apertura', 'hora_cierre', 'max_turnos_dia')
+
+    def __init__(self, id_horario, id_oficina, oficina, dia_semana,
+                 hora_apertura, hora_cierre, max_turnos_dia):
+        self.id_horario = id_horario
+        self.id_oficina = id_oficina
+        self.oficina = oficina  # Nombre de la oficina
+        self.dia_semana = dia_semana
+        self.hora_apertura = hora_apertura
+        self.hora_cierre = hora_cierre
+        self.max_turnos_dia = max_turnos_dia
@@ -24,4 +24,26 @@ class Turno:
             id_oficina=form_data.get('oficina'),  # Necesitaremos un select de oficinas
             id_nivel=form_data.get('nivel'),
             id_asunto=form_data.get('asunto')
-        )
\ No newline at end of file
+        )
+
+class TurnoResumen:
+    """
+    Fila del listado de turnos del admin: solo las columnas que se muestran,
+    sin objetos ORM ni relaciones (ver TicketController.buscar_turnos_admin).
+    """
+    __slots__ = ('id_turno', 'numero_turno', 'fecha_solicitud', 'estado',
+                 'nombre_solicitante', 'paterno_solicitante', 'curp', 'oficina')
+
+    def __init__(self, id_turno, numero_turno, fecha_solicitud, estado,
+                 nombre_solicitante, paterno_solicitante, curp, oficina):
+        self.id_turno = id_turno
+        self.numero_turno = numero_turno
+        self.fecha_solicitud = fecha_solicitud
+        self.estado = estado
+        self.nombre_solicitante = nombre_solicitante
+        self.paterno_solicitante = paterno_solicitante
+        self.curp = curp
+        self.oficina = oficina  # Nombre de la oficina
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
@@ -0,0 +1,83 @@
+# utils/agenda.py
+from datetime import datetime, timedelta
+
+# --- DICCIONARIO PARA MAPEAR DÍAS ---
+DIAS_SEMANA_ES = {
+    0: 'lunes',
+    1: 'martes',
+    2: 'miercoles',
+    3: 'jueves',
+    4: 'viernes',
+    5: 'sabado',
+    6: 'domingo'
+}
+SLOT_DURATION_MINUTES = 30
+DIAS_BUSQUEDA = 30
+
+
+def redondear_hacia_arriba(dt, minutes_res):
+    """ Redondea un datetime.datetime hacia arriba al próximo intervalo. """
+    min_dt = datetime.min.time()
+    delta = datetime.combine(dt.date(), dt.time()) - datetime.combine(dt.date(), min_dt)
+    minutes = (delta.seconds // 60 + minutes_res - 1) // minutes_res * minutes_res
+    return datetime.combine(dt.date(), min_dt) + timedelta(minutes=minutes)
+
+
+def ventana_busqueda(ahora, dias=DIAS_BUSQUEDA):
+    """
+    Devuelve (inicio_busqueda, primer_dia, dia_limite) para una búsqueda que
+    empieza en 'ahora'. 'dia_limite' es exclusivo (primer día fuera de la ventana).
+    """
+    inicio_busqueda = redondear_hacia_arriba(ahora, SLOT_DURATION_MINUTES)
+    primer_dia = inicio_busqueda.date()
+    return inicio_busqueda, primer_dia, primer_dia + timedelta(days=dias)
+
+
+def iterar_slots_libres(horarios, ocupados, conteos, ahora, dias=DIAS_BUSQUEDA):
+    """
+    Genera, en orden, los slots (fecha, hora) libres de una oficina.
+
+    - horarios: tupla de 7 HorarioCompilado indexada por weekday() (None = no abre),
+      ver utils/cache_horarios.py.
+    - ocupados: set de (fecha, hora) ya reservados.
+    - conteos: dict fecha -> turnos ya asignados (para el tope max_turnos_dia).
+
+    Replica exactamente el recorrido del antiguo bucle día por día / slot por slot,
+    pero sin tocar la BD.
+    """
+    inicio_busqueda = redondear_hacia_arriba(ahora, SLOT_DURATION_MINUTES)
+    paso = timedelta(minutes=SLOT_DURATION_MINUTES)
+
+    for i in range(dias):
+        fecha_a_revisar = (inicio_busqueda + timedelta(days=i)).date()
+        horario = horarios[fecha_a_revisar.weekday()]
+
+        if not horario:
+            continue
+
+        if conteos.get(fecha_a_revisar, 0) >= horario.max_turnos_dia:
+            continue
+
+        hora_cierre_limite = horario.ultimo_slot
+
+        if fecha_a_revisar == ahora.date():
+            # Si es hoy, no empezamos antes de la hora redondeada ni de la apertura
+            hora_inicio_slots = max(inicio_busqueda.time(), horario.hora_apertura)
+        else:
+            hora_inicio_slots = horario.hora_apertura
+
+        # Ya es demasiado tarde para buscar slots en este día
+        if hora_inicio_slots > hora_cierre_limite:
+            continue
+
+        slot_actual_dt = datetime.combine(fecha_a_revisar, hora_inicio_slots)
+
+        while slot_actual_dt.time() <= hora_cierre_limite:
+            slot_time = slot_actual_dt.time()
+            if (fecha_a_revisar, slot_time) not in ocupados:
+                yield (fecha_a_revisar, slot_time)
+
+            slot_actual_dt += paso
+            # Evita dar la vuelta a medianoche con horarios que cierran a las 00:00
+            if slot_actual_dt.date() != fecha_a_revisar:
+                break
@@ -0,0 +1,127 @@
+# utils/cache_catalogos.py
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+from DB.db import db
+from models.db_models import Municipios, NivelesEducativos, Asuntos, OficinasRegionales
+from utils.version_catalogos import version_catalogos
+
+# Registros inmutables con los mismos nombres de atributo que los modelos,
+# para que las plantillas funcionen igual con unos u otros.
+RegistroMunicipio = namedtuple('RegistroMunicipio', ['id_municipio', 'municipio'])
+RegistroNivel = namedtuple('RegistroNivel', ['id_nivel', 'nivel'])
+RegistroAsunto = namedtuple('RegistroAsunto', ['id_asunto', 'descripcion'])
+# 'municipio' es el RegistroMunicipio completo (como la relación del modelo: o.municipio.municipio)
+RegistroOficina = namedtuple('RegistroOficina', ['id_oficina', 'oficina', 'id_municipio', 'municipio'])
+
+# Respuesta de /api/oficinas ya serializada: el cuerpo JSON (bytes) y su ETag fuerte
+JsonPrecalculado = namedtuple('JsonPrecalculado', ['cuerpo', 'etag'])
+
+_Catalogos = namedtuple('_Catalogos', ['municipios', 'niveles', 'asuntos', 'oficinas', 'oficinas_por_municipio',
+                                       'json_oficinas', 'json_mapa'])
+
+
+def serializar(datos):
+    """ JSON compacto y determinista; el ETag es el hash del cuerpo. """
+    cuerpo = json.dumps(datos, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return JsonPrecalculado(cuerpo, hashlib.sha256(cuerpo).hexdigest()[:32])
+
+
+_JSON_VACIO = serializar([])
+
+
+class CacheCatalogos:
+    """
+    Municipios, niveles, asuntos y oficinas en memoria del proceso, como
+    tuplas de registros inmutables y en el mismo orden que las consultas
+    originales. Se descartan cuando cambia la versión de catálogos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = None
+        self._generacion = 0
+
+    def municipios(self):
+        return self._obtener().municipios
+
+    def niveles(self):
+        return self._obtener().niveles
+
+    def asuntos(self):
+        return self._obtener().asuntos
+
+    def oficinas(self):
+        return self._obtener().oficinas
+
+    def oficinas_por_municipio(self, id_municipio):
+        return self._obtener().oficinas_por_municipio.get(id_municipio, ())
+
+    def json_oficinas(self, id_municipio):
+        """ JsonPrecalculado con la lista [{id_oficina, oficina}] del municipio. """
+        return self._obtener().json_oficinas.get(id_municipio, _JSON_VACIO)
+
+    def json_mapa_oficinas(self):
+        """ JsonPrecalculado con {id_municipio: [{id_oficina, oficina}]} de todos los municipios. """
+        return self._obtener().json_mapa
+
+    def invalidar(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos = None
+
+    def _obtener(self):
+        version_catalogos.verificar()
+        datos = self._datos
+        if datos is None:
+            datos = self._compilar()
+        return datos
+
+    def _compilar(self):
+        generacion = self._generacion
+
+        municipios = tuple(
+            RegistroMunicipio(m.id_municipio, m.municipio)
+            for m in db.session.scalars(db.select(Municipios).order_by(Municipios.municipio))
+        )
+        por_id = {m.id_municipio: m for m in municipios}
+        niveles = tuple(
+            RegistroNivel(n.id_nivel, n.nivel)
+            for n in db.session.scalars(db.select(NivelesEducativos).order_by(NivelesEducativos.id_nivel))
+        )
+        asuntos = tuple(
+            RegistroAsunto(a.id_asunto, a.descripcion)
+            for a in db.session.scalars(db.select(Asuntos).order_by(Asuntos.descripcion))
+        )
+        oficinas = tuple(
+            RegistroOficina(o.id_oficina, o.oficina, o.id_municipio, por_id.get(o.id_municipio))
+            for o in db.session.execute(
+                db.select(OficinasRegionales.id_oficina, OficinasRegionales.oficina,
+                          OficinasRegionales.id_municipio)
+                .order_by(OficinasRegionales.oficina)
+            )
+        )
+        oficinas_por_municipio = {}
+        for oficina in oficinas:
+            oficinas_por_municipio.setdefault(oficina.id_municipio, []).append(oficina)
+
+        # El mapa municipio -> oficinas se serializa aquí, una vez por versión de catálogos
+        mapa = {m.id_municipio: [{'id_oficina': o.id_oficina, 'oficina': o.oficina}
+                                 for o in oficinas_por_municipio.get(m.id_municipio, ())]
+                for m in municipios}
+        datos = _Catalogos(municipios, niveles, asuntos, oficinas,
+                           {k: tuple(v) for k, v in oficinas_por_municipio.items()},
+                           {k: serializar(v) for k, v in mapa.items()},
+                           serializar(mapa))
+
+        with self._lock:
+            # Si alguien invalidó mientras consultábamos, no guardamos datos viejos
+            if generacion == self._generacion:
+                self._datos = datos
+        return datos
+
+
+cache_catalogos = CacheCatalogos()
+version_catalogos.suscribir(cache_catalogos.invalidar)
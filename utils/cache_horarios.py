@@ -0,0 +1,70 @@
+# utils/cache_horarios.py
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from DB.db import db
+from models.db_models import HorariosAtencion
+from utils.agenda import DIAS_SEMANA_ES, SLOT_DURATION_MINUTES
+from utils.version_catalogos import version_catalogos
+
+# Un día de atención ya "compilado": la última hora a la que puede empezar una cita
+# se calcula una sola vez en lugar de en cada búsqueda.
+HorarioCompilado = namedtuple('HorarioCompilado', ['hora_apertura', 'ultimo_slot', 'max_turnos_dia'])
+
+SIN_HORARIO = (None,) * 7
+_INDICE_DIA = {nombre: indice for indice, nombre in DIAS_SEMANA_ES.items()}
+
+
+def compilar_horario(horario):
+    """ Convierte una fila de HorariosAtencion en un HorarioCompilado. """
+    cierre_dt = datetime.combine(date(2000, 1, 1), horario.hora_cierre)
+    ultimo_slot = (cierre_dt - timedelta(minutes=SLOT_DURATION_MINUTES)).time()
+    return HorarioCompilado(horario.hora_apertura, ultimo_slot, horario.max_turnos_dia)
+
+
+class CacheHorarios:
+    """
+    Horario semanal de todas las oficinas en memoria del proceso:
+    id_oficina -> tupla de 7 entradas (índice = weekday(), None si no abre).
+
+    Se compila con una sola consulta la primera vez que se necesita y se
+    descarta cuando cambia la versión de catálogos (un admin modificó horarios
+    u oficinas en cualquier proceso; ver utils/version_catalogos.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tablas = None
+        self._generacion = 0
+
+    def obtener(self, id_oficina):
+        """ Retorna la tabla de 7 días de la oficina (SIN_HORARIO si no tiene). """
+        version_catalogos.verificar()
+        tablas = self._tablas
+        if tablas is None:
+            tablas = self._compilar()
+        return tablas.get(id_oficina, SIN_HORARIO)
+
+    def invalidar(self):
+        with self._lock:
+            self._generacion += 1
+            self._tablas = None
+
+    def _compilar(self):
+        generacion = self._generacion
+        tablas = {}
+        for horario in db.session.scalars(db.select(HorariosAtencion)):
+            semana = tablas.setdefault(horario.id_oficina, [None] * 7)
+            semana[_INDICE_DIA[horario.dia_semana]] = compilar_horario(horario)
+        tablas = {id_oficina: tuple(semana) for id_oficina, semana in tablas.items()}
+
+        with self._lock:
+            # Si alguien invalidó mientras consultábamos, no guardamos datos viejos
+            if generacion == self._generacion:
+                self._tablas = tablas
+        return tablas
+
+
+cache_horarios = CacheHorarios()
+version_catalogos.suscribir(cache_horarios.invalidar)
@@ -0,0 +1,166 @@
+# utils/cache_pdf.py
+"""
+Cache en disco de comprobantes PDF, direccionado por contenido.
+
+La llave es el sha256 de los datos del comprobante (get_datos_comprobante)
+más la versión de la plantilla: si un turno se edita, sus datos cambian y
+la llave también, así que nunca hay que invalidar. Los archivos viejos
+salen por LRU (mtime, que se actualiza en cada acierto) cuando el directorio
+pasa de PDF_CACHE_MAX_MB.
+
+Los PDF contienen datos personales: el directorio va por defecto en la
+carpeta instance/ de la app, se crea con permisos 0700 y, si ya existía, se
+usa solo si es del usuario del proceso y nadie más tiene permisos sobre él.
+"""
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+
+from flask import current_app
+
+VERSION_PLANTILLA = 2  # Subir al cambiar el diseño del comprobante (invalida todo el cache)
+FRACCION_TRAS_PURGA = 0.9  # Al purgar se baja al 90% del límite para no purgar en cada escritura
+
+
+def clave(datos):
+    """ sha256 (hex) de los datos del comprobante, en JSON canónico. """
+    crudo = json.dumps({'v': VERSION_PLANTILLA, 'datos': datos}, sort_keys=True, default=str,
+                       separators=(',', ':'))
+    return hashlib.sha256(crudo.encode('utf-8')).hexdigest()
+
+
+class CachePdf:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bytes_totales = None  # Estimado de este proceso; se recalcula al purgar
+        self._directorios = {}      # directorio -> si es seguro usarlo (se revisa una vez por proceso)
+
+    def obtener(self, datos, renderizar):
+        """
+        Retorna (ruta, None) con el PDF ya en disco, o (None, pdf_bytes) si no
+        se pudo escribir (disco lleno, sin permisos): el comprobante nunca
+        falla por el cache. 'renderizar(datos)' solo se llama en un fallo.
+        """
+        directorio = self._directorio()
+        if directorio is None:
+            return None, renderizar(datos)
+        ruta = os.path.join(directorio, *self._partes(clave(datos)))
+        try:
+            os.utime(ruta)  # Acierto: se marca como usado recientemente (LRU)
+            return ruta, None
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error al leer el cache de PDF: {e}")
+
+        pdf_bytes = renderizar(datos)
+        try:
+            self._escribir(ruta, pdf_bytes)
+        except OSError as e:
+            print(f"Error al escribir el cache de PDF: {e}")
+            return None, pdf_bytes
+        self._sumar(directorio, ruta, len(pdf_bytes))
+        return ruta, None
+
+    def _directorio(self):
+        """ PDF_CACHE_DIR (o instance/cache_pdf), o None si no es seguro usarlo: el cache se desactiva. """
+        directorio = current_app.config.get('PDF_CACHE_DIR') or os.path.join(current_app.instance_path, 'cache_pdf')
+        with self._lock:
+            seguro = self._directorios.get(directorio)
+        if seguro is None:
+            seguro = self._verificar(directorio)
+            with self._lock:
+                self._directorios[directorio] = seguro
+        return directorio if seguro else None
+
+    def _verificar(self, directorio):
+        """
+        Crea el directorio (0700) si no existe. Uno que ya existía puede ser de
+        otro usuario (p. ej. en un /tmp compartido): podría leer los PDF o
+        plantar comprobantes falsos, así que debe ser nuestro y sin permisos
+        de grupo ni de otros.
+        """
+        try:
+            os.makedirs(directorio, mode=0o700, exist_ok=True)
+            info = os.stat(directorio)
+        except OSError as e:
+            print(f"Cache de PDF desactivado, no se pudo crear {directorio}: {e}")
+            return False
+        if not stat.S_ISDIR(info.st_mode):
+            print(f"Cache de PDF desactivado: {directorio} no es un directorio.")
+            return False
+        # os.getuid no existe en Windows; ahí los permisos los dan las ACL del perfil
+        if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+            print(f"Cache de PDF desactivado: {directorio} no es del usuario del proceso "
+                  f"o tiene permisos para otros ({stat.filemode(info.st_mode)}).")
+            return False
+        return True
+
+    def _partes(self, hexadecimal):
+        # Dos niveles (ab/cd/...) para no tener cientos de miles de archivos en un directorio
+        return hexadecimal[:2], hexadecimal[2:4], hexadecimal + '.pdf'
+
+    def _escribir(self, ruta, pdf_bytes):
+        """ Escritura atómica: archivo temporal en el mismo directorio y os.replace. """
+        os.makedirs(os.path.dirname(ruta), mode=0o700, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(pdf_bytes)
+            os.replace(temporal, ruta)
+        except OSError:
+            try:
+                os.unlink(temporal)
+            except OSError:
+                pass
+            raise
+
+    def _sumar(self, directorio, ruta_nueva, cantidad):
+        limite = current_app.config.get('PDF_CACHE_MAX_MB', 200) * 1024 * 1024
+        with self._lock:
+            if self._bytes_totales is None:
+                self._bytes_totales = sum(tamano for _, tamano, _ in self._archivos(directorio))
+            else:
+                self._bytes_totales += cantidad
+            if self._bytes_totales <= limite:
+                return
+            self._bytes_totales = self._purgar(directorio, int(limite * FRACCION_TRAS_PURGA), ruta_nueva)
+
+    def _archivos(self, directorio):
+        """ (ruta, tamaño, mtime) de cada PDF del cache. """
+        for raiz, _, nombres in os.walk(directorio):
+            for nombre in nombres:
+                if not nombre.endswith('.pdf'):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    info = os.stat(ruta)
+                except FileNotFoundError:
+                    continue  # Otro proceso lo purgó
+                yield ruta, info.st_size, info.st_mtime
+
+    def _purgar(self, directorio, objetivo, conservar):
+        """
+        Borra los menos usados hasta quedar en 'objetivo' bytes, sin tocar
+        'conservar' (el que se está por enviar). Retorna el total resultante.
+        """
+        archivos = sorted(self._archivos(directorio), key=lambda a: a[2])
+        total = sum(tamano for _, tamano, _ in archivos)
+        for ruta, tamano, _ in archivos:
+            if total <= objetivo:
+                break
+            if ruta == conservar:
+                continue
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        return total
+
+
+cache_pdf = CachePdf()
@@ -0,0 +1,97 @@
+# utils/cache_principales.py
+"""
+Cache de principales para el user_loader de Flask-Login.
+
+Cada petición autenticada del admin (incluidas las AJAX del dashboard)
+cargaba su registro de Administradores de la BD solo para saber quién es.
+Aquí se guarda un Admin inmutable (models/admin.py) por id_admin en un LRU
+con TTL (PRINCIPAL_CACHE_TTL segundos).
+
+Los cambios a Administradores hechos por el ORM en este proceso lo invalidan
+al hacer commit (eventos de sesión de SQLAlchemy); el TTL acota lo que tarda
+en verse un cambio hecho por otro worker o por create_admin.py. Un id que ya
+no existe no se guarda: la sesión deja de ser válida en la siguiente petición.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.db_models import Administradores
+
+PRINCIPALES_EN_CACHE = 256
+
+
+class CachePrincipales:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = OrderedDict()  # id_admin -> (expira, Admin), del menos al más reciente
+        self._generacion = 0
+        self._contadores = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+
+    def obtener(self, id_admin, cargar):
+        """ El Admin de 'id_admin'; 'cargar(id_admin)' (Admin o None) solo se llama en un fallo. """
+        with self._lock:
+            guardado = self._valores.get(id_admin)
+            if guardado is not None and guardado[0] > time.monotonic():
+                self._valores.move_to_end(id_admin)
+                self._contadores['aciertos'] += 1
+                return guardado[1]
+            self._contadores['fallos'] += 1
+            generacion = self._generacion
+
+        principal = cargar(id_admin)
+        if principal is None:
+            return None
+        ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+        with self._lock:
+            # Si alguien invalidó mientras se cargaba, lo leído puede ser viejo
+            if generacion == self._generacion:
+                self._valores[id_admin] = (time.monotonic() + ttl, principal)
+                self._valores.move_to_end(id_admin)
+                while len(self._valores) > PRINCIPALES_EN_CACHE:
+                    self._valores.popitem(last=False)
+        return principal
+
+    def invalidar(self, id_admin=None):
+        with self._lock:
+            self._generacion += 1
+            self._contadores['invalidaciones'] += 1
+            if id_admin is None:
+                self._valores.clear()
+            else:
+                self._valores.pop(id_admin, None)
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores, entradas=len(self._valores))
+
+
+cache_principales = CachePrincipales()
+
+
+# --- Invalidación por cambios del ORM ---
+# En el flush se anotan los administradores modificados o borrados; se
+# invalidan solo después del commit (antes, otra petición podría volver a
+# leer y guardar los datos viejos).
+@event.listens_for(Session, 'after_flush')
+def _anotar_admins_cambiados(session, contexto_flush):
+    ids = {obj.id_admin for obj in list(session.dirty) + list(session.deleted)
+           if isinstance(obj, Administradores)}
+    if ids:
+        session.info.setdefault('admins_cambiados', set()).update(ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_admins_cambiados(session):
+    for id_admin in session.info.pop('admins_cambiados', ()):
+        cache_principales.invalidar(id_admin)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_admins_cambiados(session):
+    session.info.pop('admins_cambiados', None)
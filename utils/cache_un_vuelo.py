@@ -0,0 +1,105 @@
+# utils/cache_un_vuelo.py
+"""
+Cache "de un solo vuelo" (single-flight) con TTL para lecturas caras del admin.
+
+Si varias peticiones piden la misma clave a la vez (p. ej. todos los admins
+abriendo el dashboard al inicio del turno), solo la primera consulta la BD;
+las demás esperan y reciben el mismo resultado. El resultado se reutiliza
+durante CACHE_ADMIN_TTL segundos o hasta invalidar().
+
+Los resultados se comparten entre hilos: deben ser de solo lectura
+(dicts/listas de registros como TurnoResumen, nunca objetos ORM).
+"""
+import threading
+import time
+
+from flask import current_app
+
+_registro = []
+
+
+def metricas_caches():
+    """ {nombre: contadores} de todas las instancias, para /admin/metricas. """
+    return {cache.nombre: cache.metricas() for cache in _registro}
+
+
+class _Vuelo:
+    """ Un cálculo en curso: los que llegan tarde esperan su evento. """
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class CacheUnVuelo:
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._valores = {}      # clave -> (expira, resultado)
+        self._en_vuelo = {}     # clave -> _Vuelo
+        self._generacion = 0
+        self._contadores = {'aciertos': 0, 'fallos': 0, 'agrupadas': 0, 'invalidaciones': 0}
+        _registro.append(self)
+
+    def obtener(self, clave, calcular):
+        """
+        Resultado de calcular() para 'clave', compartido. Una excepción de
+        calcular() se propaga a todos los que esperaban y no se guarda.
+        """
+        with self._lock:
+            guardado = self._valores.get(clave)
+            if guardado is not None and guardado[0] > time.monotonic():
+                self._contadores['aciertos'] += 1
+                return guardado[1]
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                self._contadores['fallos'] += 1
+                vuelo = self._en_vuelo[clave] = _Vuelo()
+                generacion = self._generacion
+            else:
+                self._contadores['agrupadas'] += 1
+
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        ttl = current_app.config.get('CACHE_ADMIN_TTL', 5)
+        try:
+            vuelo.resultado = calcular()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._en_vuelo.get(clave) is vuelo:
+                    del self._en_vuelo[clave]
+                # Si alguien invalidó mientras calculábamos, no se guarda el resultado viejo
+                if vuelo.error is None and generacion == self._generacion:
+                    self._valores[clave] = (time.monotonic() + ttl, vuelo.resultado)
+            vuelo.listo.set()
+        return vuelo.resultado
+
+    def invalidar(self, clave=None):
+        """
+        Descarta una clave o, sin argumentos, todo el cache. Los cálculos en
+        curso se desligan: quien llegue después ya no se une a ellos (podrían
+        haber leído la BD antes del cambio).
+        """
+        with self._lock:
+            self._generacion += 1
+            self._contadores['invalidaciones'] += 1
+            if clave is None:
+                self._valores.clear()
+                self._en_vuelo.clear()
+            else:
+                self._valores.pop(clave, None)
+                self._en_vuelo.pop(clave, None)
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores, entradas=len(self._valores), en_vuelo=len(self._en_vuelo))
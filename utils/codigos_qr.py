@@ -0,0 +1,84 @@
+# utils/codigos_qr.py
+"""
+Códigos QR de los turnos, codificados una sola vez.
+
+QrCodeWidget vuelve a codificar la matriz cada vez que se dibuja (y el
+comprobante lo dibujaba dos veces: getBounds y renderPDF). El contenido del
+QR (codigo_qr, hoy la CURP) nunca cambia para un turno, así que aquí se
+codifica una vez y se guardan los tramos oscuros de cada fila en un LRU
+acotado; con ellos se dibuja el PDF (un solo path) y se generan el PNG y
+el SVG de /ticket/qr.
+"""
+import io
+import itertools
+from functools import lru_cache
+
+from reportlab.graphics.barcode import qrencoder
+
+BORDE_MODULOS = 4          # Zona silenciosa alrededor del código (la misma de QrCodeWidget)
+NIVEL_CORRECCION = 'L'
+CODIGOS_EN_CACHE = 2048
+PIXELES_POR_MODULO = 8     # Tamaño del PNG: (módulos + 2 * borde) * 8 px por lado
+
+
+class CodigoQr:
+    """ Matriz de un QR ya codificada (solo lectura: se comparte entre hilos). """
+
+    def __init__(self, texto):
+        codificador = qrencoder.QRCode(None, getattr(qrencoder.QRErrorCorrectLevel, NIVEL_CORRECCION))
+        codificador.addData(texto)
+        codificador.make()
+        self.modulos = codificador.getModuleCount()
+        # (fila, columna, largo) de cada tramo horizontal de módulos oscuros
+        tramos = []
+        for fila, valores in enumerate(codificador.modules):
+            columna = 0
+            for oscuro, grupo in itertools.groupby(bool(v) for v in valores):
+                largo = len(list(grupo))
+                if oscuro:
+                    tramos.append((fila, columna, largo))
+                columna += largo
+        self.tramos = tuple(tramos)
+
+    @property
+    def lado(self):
+        """ Módulos por lado, con la zona silenciosa. """
+        return self.modulos + 2 * BORDE_MODULOS
+
+    def dibujar(self, c, x, y, tamano):
+        """ Dibuja el código en el canvas 'c' como un cuadrado de 'tamano' puntos con esquina inferior en (x, y). """
+        modulo = tamano / self.lado
+        c.saveState()
+        c.setFillColorRGB(0, 0, 0)
+        trazo = c.beginPath()
+        for fila, columna, largo in self.tramos:
+            trazo.rect(x + (columna + BORDE_MODULOS) * modulo, y + tamano - (fila + BORDE_MODULOS + 1) * modulo,
+                       largo * modulo, modulo)
+        c.drawPath(trazo, stroke=0, fill=1)
+        c.restoreState()
+
+    def svg(self):
+        rectangulos = ''.join(f'<rect x="{columna + BORDE_MODULOS}" y="{fila + BORDE_MODULOS}" width="{largo}" height="1"/>'
+                              for fila, columna, largo in self.tramos)
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {self.lado} {self.lado}" '
+                f'shape-rendering="crispEdges"><rect width="100%" height="100%" fill="#fff"/>'
+                f'<g fill="#000">{rectangulos}</g></svg>')
+
+    def png(self, pixeles_por_modulo=PIXELES_POR_MODULO):
+        from PIL import Image, ImageDraw  # Pillow ya es dependencia de ReportLab
+
+        imagen = Image.new('1', (self.lado, self.lado), 1)
+        dibujo = ImageDraw.Draw(imagen)
+        for fila, columna, largo in self.tramos:
+            dibujo.line([(columna + BORDE_MODULOS, fila + BORDE_MODULOS),
+                         (columna + BORDE_MODULOS + largo - 1, fila + BORDE_MODULOS)], fill=0)
+        lado = self.lado * pixeles_por_modulo
+        buffer = io.BytesIO()
+        imagen.resize((lado, lado), Image.NEAREST).save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=CODIGOS_EN_CACHE)
+def codigo_qr(texto):
+    """ CodigoQr de 'texto', del LRU del proceso (codigo_qr.cache_info() da aciertos y fallos). """
+    return CodigoQr(texto)
@@ -0,0 +1,211 @@
+# utils/difusion_dashboard.py
+"""
+Estadísticas del dashboard en vivo (Server-Sent Events).
+
+Cada cambio de turnos se avisa con notificar_cambio() después del commit;
+al recibir el aviso se llaman las funciones registradas con al_cambiar()
+(p. ej. para invalidar caches) y un solo hilo por proceso espera esos
+avisos, los agrupa (DASHBOARD_SSE_ESPERA segundos), recalcula
+get_stats_dashboard() una vez y reparte la diferencia
+a la cola de cada dashboard conectado. Las consultas a la BD dependen del
+número de cambios, no del número de dashboards abiertos.
+
+Cada dashboard conectado mantiene ocupado un hilo del servidor mientras
+tiene la página abierta: el despliegue necesita workers con hilos o gevent
+(ver DASHBOARD_SSE_ESPERA en config.py).
+
+El aviso viaja por un backend intercambiable:
+- BackendLocal (por defecto): dentro del mismo proceso.
+- BackendRedis (DASHBOARD_BROKER_URL=redis://...): PUB/SUB entre todos los
+  workers. Requiere el paquete 'redis' (dependencia opcional).
+"""
+import importlib.util
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+MENSAJES_POR_CLIENTE = 10  # Si un cliente lento acumula más, se le reenvía la foto completa
+SSE_KEEPALIVE_SEGUNDOS = 15  # Comentario SSE periódico para que los proxies no cierren la conexión
+CANAL_REDIS = 'ticket-de-turno:dashboard'
+
+
+def redis_disponible():
+    """ El backend entre procesos depende de redis (opcional). """
+    return importlib.util.find_spec('redis') is not None
+
+
+class BackendLocal:
+    """ Avisos dentro del proceso: publicar() llama directamente al difusor. """
+
+    def __init__(self):
+        self._al_recibir = None
+
+    def escuchar(self, al_recibir):
+        self._al_recibir = al_recibir
+
+    def publicar(self):
+        if self._al_recibir:
+            self._al_recibir()
+
+
+class BackendRedis:
+    """ Avisos entre procesos por PUB/SUB de Redis; cada worker también recibe los suyos. """
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def escuchar(self, al_recibir):
+        def bucle():
+            while True:
+                try:
+                    suscripcion = self._redis.pubsub(ignore_subscribe_messages=True)
+                    suscripcion.subscribe(CANAL_REDIS)
+                    for _ in suscripcion.listen():
+                        al_recibir()
+                except Exception as e:  # Redis caído: se reintenta sin tumbar el proceso
+                    print(f"Error en la suscripción Redis del dashboard: {e}")
+                    time.sleep(5)
+
+        threading.Thread(target=bucle, name="dashboard-redis", daemon=True).start()
+
+    def publicar(self):
+        self._redis.publish(CANAL_REDIS, b'1')
+
+
+def diferencia(anterior, actual):
+    """
+    Lo que cambió entre dos resultados de get_stats_dashboard(): 'totales'
+    completo (son tres filas), solo los municipios con otros conteos y los
+    que desaparecieron. None si no cambió nada.
+    """
+    municipios = {nombre: conteos for nombre, conteos in actual['por_municipio'].items()
+                  if anterior['por_municipio'].get(nombre) != conteos}
+    eliminados = [nombre for nombre in anterior['por_municipio'] if nombre not in actual['por_municipio']]
+    if not municipios and not eliminados and anterior['totales'] == actual['totales']:
+        return None
+    return {'totales': actual['totales'], 'por_municipio': municipios, 'eliminados': eliminados}
+
+
+def formato_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+
+class DifusorDashboard:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clientes = set()
+        self._foto = None           # Último get_stats_dashboard() repartido
+        self._pendiente = threading.Event()
+        self._hilo = None
+        self._app = None
+        self._calcular = None
+        self._backend = BackendLocal()
+        self._al_cambiar = []
+
+    def init_app(self, app, calcular):
+        """
+        'calcular' es la función que produce las estadísticas completas
+        (ticket_controller.get_stats_dashboard); se llama con contexto de app.
+        """
+        self._app = app
+        self._calcular = calcular
+        url = app.config.get('DASHBOARD_BROKER_URL')
+        if url and redis_disponible():
+            self._backend = BackendRedis(url)
+        elif url:
+            app.logger.warning("DASHBOARD_BROKER_URL requiere el paquete redis; se usa el difusor local.")
+        self._backend.escuchar(self._al_recibir_cambio)
+
+    def al_cambiar(self, funcion):
+        """ Registra una función sin argumentos que se llama con cada aviso de cambio (de cualquier worker). """
+        self._al_cambiar.append(funcion)
+
+    def notificar_cambio(self):
+        """ Después del commit de cualquier cambio que afecte las estadísticas. """
+        try:
+            self._backend.publicar()
+        except Exception as e:  # El aviso nunca debe tumbar la petición que hizo el cambio
+            print(f"Error al avisar cambio de estadísticas: {e}")
+
+    @contextmanager
+    def suscribir(self):
+        """
+        Cola de mensajes (evento, datos) para un dashboard conectado. El primer
+        mensaje es la foto completa; después llegan solo diferencias.
+        """
+        cola = queue.Queue(maxsize=MENSAJES_POR_CLIENTE)
+        with self._lock:
+            # La foto se encola dentro del lock: ninguna diferencia puede llegar antes que ella
+            if self._foto is not None:
+                cola.put_nowait(('completo', self._foto))
+            else:
+                self._pendiente.set()
+            self._clientes.add(cola)
+            self._iniciar_hilo()
+        try:
+            yield cola
+        finally:
+            with self._lock:
+                self._clientes.discard(cola)
+
+    def _al_recibir_cambio(self):
+        for funcion in self._al_cambiar:
+            funcion()
+        self._pendiente.set()
+
+    def _iniciar_hilo(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="dashboard-sse", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._pendiente.wait()
+            # Agrupa la ráfaga de cambios (p. ej. una importación) en un solo cálculo
+            time.sleep(self._app.config.get('DASHBOARD_SSE_ESPERA', 1.0))
+            self._pendiente.clear()
+            with self._lock:
+                if not self._clientes:
+                    # Nadie escucha: solo se descarta la foto; se recalcula al conectarse alguien
+                    self._foto = None
+                    continue
+            try:
+                with self._app.app_context():
+                    actual = self._calcular()
+                if actual is not None:
+                    self._repartir(actual)
+            except Exception as e:
+                # Es el único hilo que reparte: un error no debe dejar congelados
+                # los dashboards; se registra y se reintenta con el siguiente aviso.
+                print(f"Error al recalcular las estadísticas del dashboard: {e}")
+
+    def _repartir(self, actual):
+        with self._lock:
+            anterior, self._foto = self._foto, actual
+            clientes = list(self._clientes)
+        if anterior is None:
+            mensaje = ('completo', actual)
+        else:
+            delta = diferencia(anterior, actual)
+            if delta is None:
+                return
+            mensaje = ('delta', delta)
+
+        for cola in clientes:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:
+                # Cliente atrasado: se descarta lo que tenía y se le manda la foto completa
+                while not cola.empty():
+                    try:
+                        cola.get_nowait()
+                    except queue.Empty:
+                        break
+                cola.put_nowait(('completo', actual))
+
+
+difusor_dashboard = DifusorDashboard()
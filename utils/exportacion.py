@@ -0,0 +1,70 @@
+# utils/exportacion.py
+import csv
+import importlib.util
+import io
+import tempfile
+from datetime import date, datetime, time
+
+FILAS_POR_BLOQUE = 500      # Filas CSV por cada trozo enviado al cliente
+BYTES_POR_BLOQUE = 64 * 1024
+
+
+def xlsx_disponible():
+    """ La exportación XLSX depende de openpyxl (opcional). """
+    return importlib.util.find_spec('openpyxl') is not None
+
+
+def _celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    if isinstance(valor, time):
+        return valor.strftime('%H:%M')
+    return valor
+
+
+def generar_csv(filas):
+    """
+    Convierte un iterable de tuplas en trozos de bytes CSV (UTF-8 con BOM
+    para que Excel respete los acentos). Solo mantiene un bloque en memoria.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM
+    for numero, fila in enumerate(filas, start=1):
+        escritor.writerow([_celda(v) for v in fila])
+        if numero % FILAS_POR_BLOQUE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def generar_xlsx(filas, titulo="Turnos"):
+    """
+    Convierte un iterable de tuplas en trozos de bytes XLSX. Requiere openpyxl
+    (dependencia opcional: revisar antes con xlsx_disponible()).
+
+    Un XLSX es un ZIP que solo se puede cerrar al final, así que el libro se
+    escribe en modo write_only (las filas van directo a un archivo temporal,
+    no a memoria) y después se envía por trozos.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo)
+    for fila in filas:
+        hoja.append([_celda(v) for v in fila])
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            trozo = archivo.read(BYTES_POR_BLOQUE)
+            if not trozo:
+                break
+            yield trozo
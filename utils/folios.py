@@ -0,0 +1,115 @@
+# utils/folios.py
+import os
+import threading
+from datetime import date
+
+from flask import current_app
+from sqlalchemy.orm import Session
+
+from DB.db import db
+from models.db_models import ContadorTurnos
+
+
+class AsignadorFolios:
+    """
+    Asigna los folios (numero_turno) de cada municipio a partir de ContadorTurnos.
+
+    FOLIO_BLOCK_SIZE = 1 (por defecto):
+        El contador se incrementa con SELECT ... FOR UPDATE dentro de la misma
+        transacción que crea el turno. Los folios son consecutivos y sin huecos,
+        pero todos los turnos del municipio se serializan en esa fila hasta el commit.
+
+    FOLIO_BLOCK_SIZE = N > 1 (estilo hi/lo):
+        Cada proceso reserva un bloque de N folios en una transacción corta e
+        independiente (la fila se bloquea solo durante ese UPDATE) y los reparte
+        en memoria. La fila caliente se toca una vez por bloque.
+
+    Política de huecos (solo con N > 1):
+        - Los folios de un bloque que un proceso no alcanzó a repartir (reinicio,
+          caída, fin del worker) se pierden; nunca se reutilizan.
+        - Si la transacción de crear_turno hace ROLLBACK, el folio ya tomado
+          también se pierde.
+        - Los folios son únicos por municipio pero, con varios workers, no
+          siguen el orden de creación.
+        Como ContadorTurnos.ultimo_turno es SMALLINT UNSIGNED, conviene un
+        bloque moderado (decenas) para no agotar el rango con huecos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks_municipio = {}
+        self._bloques = {}  # id_municipio -> [siguiente, ultimo]
+        self._pid = os.getpid()
+
+    def siguiente(self, id_municipio):
+        """ Retorna el siguiente folio del municipio. """
+        return self.reservar(id_municipio, 1)[0]
+
+    def reservar(self, id_municipio, cantidad):
+        """ Retorna una lista con 'cantidad' folios del municipio. """
+        tamano_bloque = current_app.config.get('FOLIO_BLOCK_SIZE', 1)
+        if tamano_bloque <= 1:
+            inicio = self._incrementar_en_transaccion(id_municipio, cantidad)
+            return list(range(inicio, inicio + cantidad))
+
+        folios = []
+        with self._lock_de(id_municipio):
+            bloque = self._bloques.get(id_municipio)
+            while len(folios) < cantidad:
+                if bloque is None or bloque[0] > bloque[1]:
+                    # Un lote grande se pide completo en una sola reserva
+                    faltan = cantidad - len(folios)
+                    bloque = self._reservar_bloque(id_municipio, max(tamano_bloque, faltan))
+                    self._bloques[id_municipio] = bloque
+                folios.append(bloque[0])
+                bloque[0] += 1
+        return folios
+
+    def _lock_de(self, id_municipio):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork): los bloques del padre no son nuestros
+                self._pid = os.getpid()
+                self._bloques = {}
+                self._locks_municipio = {}
+            return self._locks_municipio.setdefault(id_municipio, threading.Lock())
+
+    def _incrementar_en_transaccion(self, id_municipio, cantidad):
+        """ Modo clásico: usa la transacción en curso (db.session). """
+        contador = db.session.scalars(
+            db.select(ContadorTurnos)
+            .where(ContadorTurnos.id_municipio == id_municipio)
+            .with_for_update()
+        ).one_or_none()
+
+        if contador is None:
+            contador = ContadorTurnos(id_municipio=id_municipio, ultimo_turno=0)
+            db.session.add(contador)
+
+        inicio = contador.ultimo_turno + 1
+        contador.ultimo_turno += cantidad
+        return inicio
+
+    def _reservar_bloque(self, id_municipio, tamano):
+        """
+        Modo hi/lo: reserva [ultimo_turno + 1, ultimo_turno + tamano] en su propia
+        sesión y hace commit de inmediato, sin esperar a la transacción del turno.
+        """
+        with Session(db.engine) as session, session.begin():
+            contador = session.scalars(
+                db.select(ContadorTurnos)
+                .where(ContadorTurnos.id_municipio == id_municipio)
+                .with_for_update()
+            ).one_or_none()
+
+            if contador is None:
+                contador = ContadorTurnos(id_municipio=id_municipio, ultimo_turno=0)
+                session.add(contador)
+
+            inicio = contador.ultimo_turno + 1
+            contador.ultimo_turno += tamano
+            contador.fecha_ultimo_turno = date.today()
+        return [inicio, inicio + tamano - 1]
+
+
+asignador_folios = AsignadorFolios()
@@ -0,0 +1,181 @@
+# utils/importacion_csv.py
+import csv
+import io
+import re
+
+# Mismas reglas que static/js/validador.js
+CURP_RE = re.compile(
+    r'^([A-Z]{4})(\d{2})(\d{2})(\d{2})([HM])'
+    r'(AS|BC|BS|CC|CL|CM|CS|CH|DF|DG|GT|GR|HG|JC|MC|MN|MS|NT|NL|OC|PL|QT|QR|SP|SL|SR|TC|TS|TL|VZ|YN|ZS|NE)'
+    r'([A-Z]{3})([A-Z0-9])(\d)$'
+)
+NOMBRE_RE = re.compile(r"^[A-Za-zÁÉÍÓÚáéíóúÑñüÜ\s'\-]{2,}$")
+CORREO_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+
+# Columnas del CSV: los mismos nombres que los campos del formulario de turno
+COLUMNAS_OBLIGATORIAS = ('nombreCompleto', 'curp', 'nombre', 'paterno', 'celular',
+                         'correo', 'nivel', 'oficina', 'asunto')
+COLUMNAS_OPCIONALES = ('materno', 'telefono', 'municipio')  # 'municipio' desambigua 'oficina'
+MAX_FILAS = 5000
+# Longitudes de las columnas de 'solicitantes' (un valor más largo abortaría todo el lote)
+LONGITUD_MAXIMA = {'nombreCompleto': 120, 'nombre': 100, 'paterno': 60, 'materno': 60, 'correo': 150}
+
+
+def _validar_nombre(valor):
+    if len(valor) < 2:
+        return "Mínimo 2 caracteres."
+    if valor.isdigit():
+        return "No puede ser solo números."
+    if '  ' in valor:
+        return "No debe tener espacios consecutivos."
+    if not NOMBRE_RE.match(valor):
+        return "Formato de nombre inválido."
+    return None
+
+
+def _validar_correo(valor):
+    if valor.count('@') != 1:
+        return "El correo debe contener un @."
+    if '..' in valor:
+        return "No debe tener puntos consecutivos."
+    if not CORREO_RE.match(valor):
+        return "Formato general inválido."
+    return None
+
+
+def _solo_digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def _resolver(valor, catalogo, nombre_catalogo, grupo=None):
+    """
+    Acepta el ID o el nombre (sin distinguir mayúsculas) de un elemento del catálogo.
+    Con 'grupo' (el municipio de la fila, para oficinas) solo valen los
+    elementos de ese grupo. Un nombre que corresponde a más de un elemento
+    se rechaza en lugar de tomar cualquiera.
+    """
+    clave = valor.strip()
+    if clave.isdigit() and int(clave) in catalogo['por_id']:
+        candidatos = (int(clave),)
+    else:
+        candidatos = catalogo['por_nombre'].get(clave.upper(), ())
+    if grupo is not None:
+        candidatos = tuple(i for i in candidatos if catalogo['grupo_de'].get(i) == grupo)
+        if not candidatos:
+            return None, f"{nombre_catalogo} '{valor}' no existe en el municipio indicado."
+    if not candidatos:
+        return None, f"{nombre_catalogo} '{valor}' no existe."
+    if len(candidatos) > 1:
+        return None, f"{nombre_catalogo} '{valor}' corresponde a varios registros. Use el ID o la columna municipio."
+    return candidatos[0], None
+
+
+def indexar_catalogo(elementos, campo_id, campo_nombre, campo_grupo=None):
+    """
+    Prepara un catálogo para _resolver: búsqueda por ID y por nombre (un
+    nombre puede repetirse, p. ej. oficinas de distintos municipios) y, con
+    'campo_grupo', el grupo de cada ID.
+    """
+    por_nombre = {}
+    for e in elementos:
+        por_nombre.setdefault(getattr(e, campo_nombre).strip().upper(), []).append(getattr(e, campo_id))
+    return {
+        'por_id': {getattr(e, campo_id) for e in elementos},
+        'por_nombre': {nombre: tuple(ids) for nombre, ids in por_nombre.items()},
+        'grupo_de': {getattr(e, campo_id): getattr(e, campo_grupo) for e in elementos} if campo_grupo else {}
+    }
+
+
+def leer_csv(archivo_bytes):
+    """
+    Decodifica el archivo (UTF-8 o Latin-1, separado por ',' o ';') y regresa
+    (filas, error). Cada fila es un dict con las columnas del CSV.
+    """
+    try:
+        texto = archivo_bytes.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = archivo_bytes.decode('latin-1')  # Exportaciones de Excel en Windows
+
+    primera_linea = texto.split('\n', 1)[0]
+    delimitador = ';' if primera_linea.count(';') > primera_linea.count(',') else ','
+    lector = csv.DictReader(io.StringIO(texto), delimiter=delimitador)
+
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in (lector.fieldnames or [])]
+    if faltantes:
+        return [], f"Faltan columnas en el CSV: {', '.join(faltantes)}."
+
+    filas = list(lector)
+    if not filas:
+        return [], "El archivo no tiene filas."
+    if len(filas) > MAX_FILAS:
+        return [], f"El archivo excede el máximo de {MAX_FILAS} filas."
+    return filas, None
+
+
+def validar_filas(filas, niveles, oficinas, asuntos, municipios=None):
+    """
+    Valida todas las filas ANTES de tocar la BD.
+    'niveles', 'oficinas', 'asuntos' y 'municipios' vienen de indexar_catalogo()
+    ('oficinas' agrupado por id_municipio). Si la fila trae 'municipio', la
+    oficina se busca solo dentro de él.
+    Regresa (validas, errores): 'validas' son dicts normalizados con su número
+    de fila; 'errores' es {numero_fila: mensaje}.
+    """
+    validas, errores = [], {}
+    curps_vistas = {}
+
+    for numero_fila, fila in enumerate(filas, start=2):  # fila 1 = encabezados
+        datos = {c: (fila.get(c) or '').strip() for c in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES}
+        datos['curp'] = datos['curp'].upper()
+        problemas = []
+
+        faltantes = [c for c in COLUMNAS_OBLIGATORIAS if not datos[c]]
+        if faltantes:
+            problemas.append(f"Campos vacíos: {', '.join(faltantes)}.")
+        else:
+            if not CURP_RE.match(datos['curp']):
+                problemas.append("CURP inválida.")
+            elif datos['curp'] in curps_vistas:
+                problemas.append(f"CURP repetida en el archivo (fila {curps_vistas[datos['curp']]}).")
+            for campo in ('nombreCompleto', 'nombre', 'paterno') + (('materno',) if datos['materno'] else ()):
+                motivo = _validar_nombre(datos[campo])
+                if motivo:
+                    problemas.append(f"{campo}: {motivo}")
+            motivo = _validar_correo(datos['correo'])
+            if motivo:
+                problemas.append(f"correo: {motivo}")
+            for campo, maximo in LONGITUD_MAXIMA.items():
+                if len(datos[campo]) > maximo:
+                    problemas.append(f"{campo}: máximo {maximo} caracteres.")
+
+            celular = _solo_digitos(datos['celular'])
+            if len(celular) != 10 or len(set(celular)) == 1:
+                problemas.append("Celular inválido (10 dígitos).")
+            telefono = _solo_digitos(datos['telefono'])
+            if telefono and (not 7 <= len(telefono) <= 10 or set(telefono) == {'0'}):
+                problemas.append("Teléfono inválido (7-10 dígitos).")
+            datos['celular'], datos['telefono'] = celular, telefono or None
+
+            id_municipio = None
+            if datos['municipio'] and municipios is not None:
+                id_municipio, motivo = _resolver(datos['municipio'], municipios, 'Municipio')
+                if motivo:
+                    problemas.append(motivo)
+            datos['municipio'] = id_municipio
+
+            for campo, catalogo, nombre, grupo in (('nivel', niveles, 'Nivel', None),
+                                                   ('oficina', oficinas, 'Oficina', id_municipio),
+                                                   ('asunto', asuntos, 'Asunto', None)):
+                datos[campo], motivo = _resolver(datos[campo], catalogo, nombre, grupo)
+                if motivo:
+                    problemas.append(motivo)
+
+        curps_vistas.setdefault(datos['curp'], numero_fila)
+        if problemas:
+            errores[numero_fila] = ' '.join(problemas)
+        else:
+            datos['materno'] = datos['materno'] or None
+            datos['fila'] = numero_fila
+            validas.append(datos)
+
+    return validas, errores
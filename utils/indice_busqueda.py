@@ -0,0 +1,101 @@
+# utils/indice_busqueda.py
+"""
+Búsqueda por subcadena sin '%texto%':
+
+Cada palabra de los campos buscables se normaliza (mayúsculas, sin acentos)
+y se guardan todos sus sufijos de LONGITUD_MINIMA letras o más en
+'indice_busqueda'. Una subcadena de una palabra siempre es el inicio de
+alguno de sus sufijos, así que "contiene 'ERE'" se resuelve con
+token LIKE 'ERE%', que es un rango sobre la llave primaria.
+"""
+import re
+import unicodedata
+
+from DB.db import db
+from models.db_models import IndiceBusqueda, Solicitantes
+
+LONGITUD_MINIMA = 2
+LONGITUD_TOKEN = 60  # = IndiceBusqueda.token
+TAMANO_LOTE = 1000
+
+
+def normalizar(texto):
+    """ 'Peña Nieto-Ruíz' -> 'PENA NIETO RUIZ' """
+    sin_acentos = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Z0-9]+', ' ', sin_acentos.upper()).strip()
+
+
+def textos_de(solicitante):
+    """ Campos buscables de un Solicitantes (o de un objeto con los mismos atributos). """
+    return (solicitante.curp, solicitante.nombre_solicitante, solicitante.paterno_solicitante,
+            solicitante.materno_solicitante, solicitante.nombre_tramitante)
+
+
+def tokens(textos):
+    """ Todos los sufijos (>= LONGITUD_MINIMA) de cada palabra de 'textos'. """
+    resultado = set()
+    for texto in textos:
+        for palabra in normalizar(texto).split():
+            palabra = palabra[:LONGITUD_TOKEN]
+            for inicio in range(len(palabra) - LONGITUD_MINIMA + 1):
+                resultado.add(palabra[inicio:])
+    return resultado
+
+
+def indexar(textos_por_solicitante, nuevos=False):
+    """
+    Reemplaza los tokens de los solicitantes dados, dentro de la transacción
+    en curso. 'textos_por_solicitante' es {id_solicitante: textos}; con
+    nuevos=True se omite el DELETE previo.
+    """
+    ids = list(textos_por_solicitante)
+    if not nuevos:
+        for i in range(0, len(ids), TAMANO_LOTE):
+            db.session.execute(
+                db.delete(IndiceBusqueda).where(IndiceBusqueda.id_solicitante.in_(ids[i:i + TAMANO_LOTE]))
+            )
+    filas = [{'token': token, 'id_solicitante': id_solicitante}
+             for id_solicitante, textos in textos_por_solicitante.items()
+             for token in tokens(textos)]
+    for i in range(0, len(filas), TAMANO_LOTE * 5):
+        db.session.execute(db.insert(IndiceBusqueda), filas[i:i + TAMANO_LOTE * 5])
+
+
+def condicion(query):
+    """
+    Condición SQL sobre Solicitantes: cada palabra de 'query' debe aparecer
+    (como subcadena) en alguno de los campos indexados. None si la búsqueda
+    no tiene palabras de LONGITUD_MINIMA letras o más.
+    """
+    terminos = [t[:LONGITUD_TOKEN] for t in normalizar(query).split() if len(t) >= LONGITUD_MINIMA]
+    if not terminos:
+        return None
+    return db.and_(*[
+        Solicitantes.id_solicitante.in_(
+            db.select(IndiceBusqueda.id_solicitante).where(IndiceBusqueda.token.like(f"{termino}%"))
+        )
+        for termino in terminos
+    ])
+
+
+def reconstruir():
+    """
+    Regenera todo el índice desde 'solicitantes' por lotes (keyset por id).
+    No hace commit. Retorna el número de solicitantes indexados.
+    """
+    db.session.execute(db.delete(IndiceBusqueda))
+    total, ultimo_id = 0, 0
+    while True:
+        lote = db.session.execute(
+            db.select(Solicitantes.id_solicitante, Solicitantes.curp, Solicitantes.nombre_solicitante,
+                      Solicitantes.paterno_solicitante, Solicitantes.materno_solicitante,
+                      Solicitantes.nombre_tramitante)
+            .where(Solicitantes.id_solicitante > ultimo_id)
+            .order_by(Solicitantes.id_solicitante)
+            .limit(TAMANO_LOTE)
+        ).all()
+        if not lote:
+            return total
+        indexar({fila.id_solicitante: textos_de(fila) for fila in lote}, nuevos=True)
+        total += len(lote)
+        ultimo_id = lote[-1].id_solicitante
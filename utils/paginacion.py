@@ -0,0 +1,24 @@
+# utils/paginacion.py
+import base64
+import binascii
+from datetime import datetime
+
+TAMANO_PAGINA = 50
+
+
+def codificar_cursor(fecha, id_turno):
+    """ (fecha_solicitud, id_turno) -> texto opaco y seguro para URL. """
+    crudo = f"{fecha.isoformat()}|{id_turno}".encode('ascii')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """ Inverso de codificar_cursor. Retorna (datetime, int) o None si el cursor no es válido. """
+    if not cursor:
+        return None
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        fecha, id_turno = crudo.split('|')
+        return datetime.fromisoformat(fecha), int(id_turno)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
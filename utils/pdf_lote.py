@@ -0,0 +1,200 @@
+# utils/pdf_lote.py
+"""
+Impresión del día: la lista de turnos (para pasar asistencia) y todos los
+comprobantes de una oficina y fecha, en un ZIP de PDFs de varias páginas.
+
+Dibujar un comprobante es CPU puro (ReportLab, QR) y el GIL impide repartirlo
+entre hilos, así que los comprobantes se reparten en bloques entre procesos
+(ProcessPoolExecutor). Cada proceso devuelve un PDF con las páginas de su
+bloque y el proceso web lo agrega al ZIP en orden (lista.pdf,
+comprobantes_001-025.pdf, ...): los bytes de cada bloque se envían en cuanto
+llega, sin esperar a que terminen todos ni guardar el lote completo en
+memoria o en disco. Los PDF no se unen en uno solo: eso requiere leerlos y
+reescribirlos, y el proceso web no debe depender del formato interno de ReportLab.
+
+Con un solo proceso los bloques se dibujan aquí mismo, uno tras otro, y se
+envían igual.
+"""
+import io
+import math
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.units import mm
+
+from utils.pdf_rl import WIDTH, HEIGHT, dibujar_comprobante
+
+COMPROBANTES_POR_BLOQUE = 25  # Máximo por tarea: bloques grandes amortizan el envío entre procesos
+FILAS_POR_HOJA_LISTA = 35
+
+# (encabezado, x) de las columnas de la lista
+COLUMNAS_LISTA = (
+    ('Hora', 15 * mm),
+    ('Turno', 32 * mm),
+    ('Alumno', 50 * mm),
+    ('CURP', 118 * mm),
+    ('Asunto', 158 * mm),
+)
+
+
+def _recortar(texto, maximo):
+    texto = str(texto or '')
+    return texto if len(texto) <= maximo else texto[:maximo - 1] + '…'
+
+
+def _dibujar_lista(c, oficina, fecha, lista_datos):
+    """ Hoja(s) con todos los turnos del día en orden de hora, y una línea para firmar. """
+    hojas = max(1, math.ceil(len(lista_datos) / FILAS_POR_HOJA_LISTA))
+    for hoja in range(hojas):
+        c.setFont('Helvetica-Bold', 14)
+        c.drawCentredString(WIDTH / 2.0, HEIGHT - 20 * mm, 'Lista de Turnos del Día')
+        c.setFont('Helvetica', 11)
+        c.drawCentredString(WIDTH / 2.0, HEIGHT - 27 * mm, f"{oficina} — {fecha.strftime('%Y-%m-%d')}")
+        c.drawRightString(WIDTH - 15 * mm, 15 * mm,
+                          f"Total: {len(lista_datos)} turnos   Hoja {hoja + 1} de {hojas}")
+
+        y = HEIGHT - 40 * mm
+        c.setFont('Helvetica-Bold', 9)
+        for encabezado, x in COLUMNAS_LISTA:
+            c.drawString(x, y, encabezado)
+        c.drawString(WIDTH - 40 * mm, y, 'Firma')
+        c.line(15 * mm, y - 2 * mm, WIDTH - 15 * mm, y - 2 * mm)
+
+        c.setFont('Helvetica', 9)
+        inicio = hoja * FILAS_POR_HOJA_LISTA
+        for data in lista_datos[inicio:inicio + FILAS_POR_HOJA_LISTA]:
+            y -= 6.5 * mm
+            alumno = f"{data['nombre_solicitante']} {data['paterno_solicitante']} {data['materno_solicitante']}"
+            valores = (data['hora_solicitud'].strftime('%H:%M'), data['numero_turno'],
+                       _recortar(alumno, 38), data['curp'], _recortar(data['descripcion'], 18))
+            for (_, x), valor in zip(COLUMNAS_LISTA, valores):
+                c.drawString(x, y, str(valor))
+            c.line(WIDTH - 40 * mm, y - 1 * mm, WIDTH - 15 * mm, y - 1 * mm)
+        c.showPage()
+    return hojas
+
+
+def _renderizar_bloque(bloque):
+    """ En un proceso del pool: un PDF con un comprobante por página. """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=LETTER)
+    for data in bloque:
+        dibujar_comprobante(c, data)
+    c.save()
+    return buffer.getvalue()
+
+
+_pool = None
+_pool_procesos = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool(procesos):
+    """
+    Pool compartido por el proceso web; arrancar procesos es caro, así que
+    se crea en el primer lote y se reutiliza. Se usa 'spawn': hacer fork de
+    un servidor con hilos (SSE, caches) puede heredar locks tomados.
+    """
+    global _pool, _pool_procesos
+    with _pool_lock:
+        if _pool is None or _pool_procesos != procesos:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+            _pool_procesos = procesos
+        return _pool
+
+
+def _descartar_pool():
+    """ Un proceso murió (p. ej. sin memoria): el pool queda inservible y se recrea en el siguiente lote. """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _bloques(lista_datos, procesos):
+    # Al menos un bloque por proceso aunque el día tenga pocos turnos
+    tamano = max(1, min(COMPROBANTES_POR_BLOQUE, math.ceil(len(lista_datos) / procesos)))
+    return [lista_datos[i:i + tamano] for i in range(0, len(lista_datos), tamano)]
+
+
+def _pdf_lista(oficina, fecha, lista_datos):
+    """ (PDF de la lista del día, hojas). """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=LETTER)
+    hojas = _dibujar_lista(c, oficina, fecha, lista_datos)
+    c.save()
+    return buffer.getvalue(), hojas
+
+
+class _SalidaZip(io.RawIOBase):
+    """ Destino del ZipFile sin seek (escribe descriptores de datos): acumula lo escrito hasta vaciar(). """
+
+    def __init__(self):
+        super().__init__()
+        self._trozos = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._trozos.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._trozos)
+        self._trozos.clear()
+        return datos
+
+
+def renderizar_lote(oficina, fecha, lista_datos, procesos=0):
+    """
+    Generador con los bytes del ZIP: lista.pdf y un comprobante por turno,
+    en el orden de 'lista_datos', repartidos en comprobantes_<desde>-<hasta>.pdf.
+    'procesos' = 0 usa todos los núcleos.
+
+    Al agotarse retorna (valor de 'yield from') {'paginas', 'segundos',
+    'paginas_por_segundo', 'procesos'}.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    salida = _SalidaZip()
+    # Los PDF de ReportLab (ASCII85) se comprimen bien
+    archivo_zip = zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    pdf_lista, paginas = _pdf_lista(oficina, fecha, lista_datos)
+    archivo_zip.writestr('lista.pdf', pdf_lista)
+    yield salida.vaciar()
+
+    bloques = _bloques(lista_datos, procesos)
+    if procesos > 1:
+        # map() entrega los bloques en orden; cada uno se envía en cuanto llega
+        pdfs = _obtener_pool(procesos).map(_renderizar_bloque, bloques)
+    else:
+        pdfs = map(_renderizar_bloque, bloques)
+    desde = 1
+    try:
+        for bloque, pdf_bloque in zip(bloques, pdfs):
+            hasta = desde + len(bloque) - 1
+            archivo_zip.writestr(f'comprobantes_{desde:03d}-{hasta:03d}.pdf', pdf_bloque)
+            paginas += len(bloque)
+            desde = hasta + 1
+            yield salida.vaciar()
+    except BrokenProcessPool:
+        _descartar_pool()
+        raise
+
+    archivo_zip.close()
+    yield salida.vaciar()
+    segundos = time.perf_counter() - inicio
+    return {'paginas': paginas, 'segundos': segundos,
+            'paginas_por_segundo': paginas / segundos if segundos else 0.0, 'procesos': procesos}
@@ -1,11 +1,13 @@
 import io
 import os
+import threading
+from PIL import Image  # Pillow ya es dependencia de ReportLab
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.units import mm
-from reportlab.graphics.barcode import qr
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics import renderPDF
+from utils.codigos_qr import codigo_qr
 
 # Obtenemos la ruta absoluta al directorio 'static'
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,49 +15,116 @@ STATIC_DIR = os.path.join(BASE_DIR, 'static')
 LOGO1_PATH = os.path.join(STATIC_DIR, 'images', 'logo1.png')
 LOGO2_PATH = os.path.join(STATIC_DIR, 'images', 'logo2.png')
 
+WIDTH, HEIGHT = LETTER  # Dimensiones de la hoja (en puntos)
 
-def crear_comprobante_rl(data):
+# (ruta, x, y, ancho, alto) de cada logo. ReportLab usa puntos, no píxeles: 1 mm = 2.83 puntos
+LOGOS = (
+    (LOGO1_PATH, 10 * mm, HEIGHT - 30 * mm, 33 * mm, 25 * mm),          # Izquierda
+    (LOGO2_PATH, WIDTH - 43 * mm, HEIGHT - 30 * mm, 33 * mm, 25 * mm),  # Derecha
+)
+
+FORMA_PLANTILLA = 'plantillaComprobante'
+RESOLUCION_LOGOS = 300  # dpi a los que se guardan los logos de la plantilla, a su tamaño impreso
+
+# Los flujos del PDF se dejan binarios (solo Flate), sin la capa ASCII85 que
+# ReportLab agrega por defecto: su codificador en Python puro era la mayor
+# parte del tiempo de un comprobante. Todos los PDF de la app se envían y se
+# guardan como binarios. Es un ajuste documentado de ReportLab para el proceso.
+rl_config.useA85 = 0
+
+_lectores = None
+_lectores_lock = threading.Lock()
+
+
+def _logo_impreso(ruta, ancho, alto):
+    """ El PNG reducido a RESOLUCION_LOGOS para el recuadro (ancho x alto puntos) en que se imprime. """
+    imagen = Image.open(ruta)
+    transparente = imagen.mode in ('RGBA', 'LA') or 'transparency' in imagen.info
+    imagen = imagen.convert('RGBA' if transparente else 'RGB')
+    escala = min(ancho / imagen.width, alto / imagen.height)  # Puntos por píxel (preserveAspectRatio)
+    pixeles = round(imagen.width * escala / 72 * RESOLUCION_LOGOS)
+    if pixeles < imagen.width:
+        imagen = imagen.resize((pixeles, max(1, round(imagen.height * pixeles / imagen.width))), Image.LANCZOS)
+    return imagen
+
+
+def _lectores_logos():
     """
-    Crea el comprobante en PDF usando ReportLab.
+    (ImageReader, x, y, ancho, alto) de cada logo, decodificado y reducido a su
+    tamaño impreso una vez por proceso; None si no se pudieron cargar.
     """
-    buffer = io.BytesIO()
-
-    # Usamos tamaño Carta (LETTER)
-    c = canvas.Canvas(buffer, pagesize=LETTER)
-    width, height = LETTER  # Obtenemos las dimensiones (en puntos)
-
-    # --- Dibujar Logos ---
-    # (ReportLab usa puntos, no píxeles. 1 mm = 2.83 puntos)
-    try:
-        # [cite_start]Logo 1 (Izquierda) [cite: 10-11]
-        c.drawImage(LOGO1_PATH, x=10 * mm, y=height - 30 * mm, width=33 * mm, height=25 * mm, preserveAspectRatio=True)
-    except Exception as e:
-        print(f"Error al cargar logo1.png: {e}")
-
-    try:
-        # [cite_start]Logo 2 (Derecha) [cite: 2-3]
-        c.drawImage(LOGO2_PATH, x=width - 43 * mm, y=height - 30 * mm, width=33 * mm, height=25 * mm,
-                    preserveAspectRatio=True)
-    except Exception as e:
-        print(f"Error al cargar logo2.png: {e}")
+    global _lectores
+    if _lectores is None:
+        with _lectores_lock:
+            if _lectores is None:
+                try:
+                    lectores = []
+                    for ruta, x, y, ancho, alto in LOGOS:
+                        lector = ImageReader(_logo_impreso(ruta, ancho, alto))
+                        lector.getRGBData()  # Se convierte aquí y no en el primer comprobante de cada hilo
+                        lectores.append((lector, x, y, ancho, alto))
+                    _lectores = tuple(lectores)
+                except Exception as e:
+                    print(f"Error al cargar los logos: {e}")
+                    _lectores = False
+    return _lectores or None
+
+
+def _dibujar_logos(c, logos):
+    """ drawImage de cada (imagen, x, y, ancho, alto); la imagen es una ruta o un ImageReader. """
+    for imagen, x, y, ancho, alto in logos:
+        try:
+            c.drawImage(imagen, x=x, y=y, width=ancho, height=alto, preserveAspectRatio=True)
+        except Exception as e:
+            nombre = os.path.basename(imagen) if isinstance(imagen, str) else 'logo'
+            print(f"Error al cargar {nombre}: {e}")
+
+
+def _dibujar_encabezado(c, logos):
+    """ Lo que es igual en todos los comprobantes: logos, títulos y encabezados. """
+    _dibujar_logos(c, logos)
 
     # --- Título ---
     c.setFont('Helvetica-Bold', 16)
-    c.drawCentredString(width / 2.0, height - 20 * mm, 'Comprobante de Turno')
+    c.drawCentredString(WIDTH / 2.0, HEIGHT - 20 * mm, 'Comprobante de Turno')
     c.setFont('Helvetica', 12)
-    c.drawCentredString(width / 2.0, height - 26 * mm, 'SECRETARÍA DE EDUCACIÓN')
+    c.drawCentredString(WIDTH / 2.0, HEIGHT - 26 * mm, 'SECRETARÍA DE EDUCACIÓN')
+
+    # --- Encabezados de sección ---
+    c.setFont('Helvetica-Bold', 14)
+    c.drawString(20 * mm, HEIGHT - 70 * mm, 'Datos del Solicitante')
+    c.drawString(20 * mm, HEIGHT - 117 * mm, 'Datos del Trámite')
+
 
+def _dibujar_fondo(c, plantilla):
+    """
+    Con plantilla los logos salen ya reducidos (_lectores_logos) y el
+    encabezado se define una vez por documento como forma (beginForm/endForm)
+    que cada página reutiliza con doForm; el canvas lleva la marca de que ya
+    la tiene.
+    """
+    if not plantilla:
+        _dibujar_encabezado(c, LOGOS)
+        return
+    if not getattr(c, 'plantilla_comprobante', False):
+        c.beginForm(FORMA_PLANTILLA)
+        _dibujar_encabezado(c, _lectores_logos() or LOGOS)
+        c.endForm()
+        c.plantilla_comprobante = True
+    c.doForm(FORMA_PLANTILLA)
+
+
+def _dibujar_datos(c, data):
+    """ Los campos del turno y el QR. """
     # --- Datos del Turno ---
-    y_start = height - 50 * mm
+    y_start = HEIGHT - 50 * mm
     c.setFont('Helvetica-Bold', 18)
-    c.drawCentredString(width / 2.0, y_start, f"Turno Asignado: {data['numero_turno']}")
+    c.drawCentredString(WIDTH / 2.0, y_start, f"Turno Asignado: {data['numero_turno']}")
     c.setFont('Helvetica', 12)
-    c.drawCentredString(width / 2.0, y_start - 6 * mm, f"Oficina: {data['oficina']}")
+    c.drawCentredString(WIDTH / 2.0, y_start - 6 * mm, f"Oficina: {data['oficina']}")
 
-    # --- Datos del Solicitante ---
+    # --- Datos del Solicitante (debajo de su encabezado, en HEIGHT - 70 mm) ---
     y_start -= 20 * mm
-    c.setFont('Helvetica-Bold', 14)
-    c.drawString(20 * mm, y_start, 'Datos del Solicitante')
     c.setFont('Helvetica', 11)
     y_start -= 7 * mm
     c.drawString(20 * mm, y_start, f"Tramitante: {data['nombre_tramitante']}")
@@ -69,11 +138,8 @@ def crear_comprobante_rl(data):
     y_start -= 7 * mm
     c.drawString(20 * mm, y_start, f"Correo: {data['correo']}")
 
-    # --- Datos del Trámite ---
+    # --- Datos del Trámite (debajo de su encabezado, en HEIGHT - 117 mm) ---
     y_start -= 12 * mm
-    c.setFont('Helvetica-Bold', 14)
-    c.drawString(20 * mm, y_start, 'Datos del Trámite')
-    c.setFont('Helvetica', 11)
     y_start -= 7 * mm
     c.drawString(20 * mm, y_start, f"Fecha de Solicitud: {data['fecha_solicitud'].strftime('%Y-%m-%d %H:%M')}")
     y_start -= 7 * mm
@@ -83,26 +149,37 @@ def crear_comprobante_rl(data):
     y_start -= 7 * mm
     c.drawString(20 * mm, y_start, f"Asunto: {data['descripcion']}")
 
-    # --- Código QR ---
-    qr_code = qr.QrCodeWidget(data['curp'])  #
-    bounds = qr_code.getBounds()
-    qr_width = bounds[2] - bounds[0]
-    qr_height = bounds[3] - bounds[1]
+    # --- Código QR --- (codificado una vez por contenido, ver utils/codigos_qr.py)
+    codigo_qr(data['codigo_qr']).dibujar(c, WIDTH - 65 * mm, 30 * mm, 50 * mm)
+
+
+def dibujar_comprobante(c, data, plantilla=True):
+    """ Dibuja un comprobante en la página actual de 'c' y la cierra (showPage). """
+    _dibujar_fondo(c, plantilla)
+    _dibujar_datos(c, data)
+    c.showPage()
+
+
+def crear_comprobante_rl(data, plantilla=True):
+    """
+    Crea el comprobante en PDF usando ReportLab.
+
+    Con plantilla=True el encabezado es una forma del documento con los logos
+    ya decodificados y reducidos (ver _dibujar_fondo); con False se dibuja
+    directamente y los logos se cargan desde los PNG en cada llamada (el modo
+    original).
+    """
+    buffer = io.BytesIO()
 
-    # Tamaño y posición del QR
-    qr_size = 50 * mm
-    x_pos = width - 65 * mm
-    y_pos = 30 * mm
+    # Usamos tamaño Carta (LETTER)
+    c = canvas.Canvas(buffer, pagesize=LETTER)
 
-    d = Drawing(qr_size, qr_size, transform=[qr_size / qr_width, 0, 0, qr_size / qr_height, 0, 0])
-    d.add(qr_code)
-    renderPDF.draw(d, c, x_pos, y_pos)
+    dibujar_comprobante(c, data, plantilla)
 
     # --- Finalizar PDF ---
-    c.showPage()
     c.save()
 
     pdf_bytes = buffer.getvalue()
     buffer.close()
 
-    return pdf_bytes
\ No newline at end of file
+    return pdf_bytes
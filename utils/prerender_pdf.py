@@ -0,0 +1,168 @@
+# utils/prerender_pdf.py
+"""
+Pre-render de comprobantes en segundo plano.
+
+Casi todos los ciudadanos abren el PDF segundos después de crear su turno.
+crear_turno() encola el turno después del commit y un grupo fijo de hilos
+(PDF_PRERENDER_HILOS, arrancado con el primer turno) lo dibuja en el cache en disco
+(utils/cache_pdf.py). generar_pdf lee ese mismo cache: si el PDF ya está se
+envía sin renderizar; si un hilo lo está dibujando en ese momento se espera
+hasta PDF_PRERENDER_ESPERA segundos; si no, se renderiza en línea como antes.
+
+La cola es acotada (PDF_PRERENDER_COLA): si está llena el turno no se
+pre-renderiza y solo se cuenta como descartado; la creación nunca espera.
+metricas() expone la profundidad y el retraso (lag) para dimensionarla.
+"""
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from utils.cache_pdf import cache_pdf, clave
+from utils.pdf_rl import crear_comprobante_rl
+
+
+class ColaPrerender:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cola = None           # (id_turno, curp, encolado en monotonic); None = hilos sin arrancar
+        self._pid = None            # Proceso que arrancó la cola y sus hilos
+        self._app = None
+        self._obtener_datos = None
+        self._en_curso = {}         # clave del PDF -> Event que se marca al terminar de dibujarlo
+        self._hilos = 0             # 0 = desactivada
+        self._capacidad = 0
+        self._contadores = {'encolados': 0, 'descartados': 0, 'renderizados': 0, 'ya_en_cache': 0,
+                            'no_encontrados': 0, 'errores': 0}
+        self._retrasos = {'iniciados': 0, 'ultimo': 0.0, 'maximo': 0.0, 'suma': 0.0}
+
+    def init_app(self, app, obtener_datos):
+        """
+        'obtener_datos(id_turno, curp)' produce el DICT del comprobante
+        (ticket_controller.get_datos_comprobante); se llama con contexto de app.
+        Solo guarda la configuración: los hilos arrancan en el primer encolar().
+        """
+        self._app = app
+        self._obtener_datos = obtener_datos
+        self._hilos = app.config.get('PDF_PRERENDER_HILOS', 2)
+        self._capacidad = app.config.get('PDF_PRERENDER_COLA', 200)
+
+    def encolar(self, id_turno, curp):
+        """ Después del commit de un turno nuevo. Nunca bloquea ni falla. """
+        if self._hilos <= 0:
+            return
+        try:
+            self._iniciar_hilos().put_nowait((id_turno, curp, time.monotonic()))
+            contador = 'encolados'
+        except queue.Full:
+            contador = 'descartados'
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def esperar(self, datos):
+        """
+        Si un hilo está dibujando justo este comprobante, espera a que lo
+        termine (hasta PDF_PRERENDER_ESPERA segundos) para no dibujarlo dos veces.
+        """
+        with self._lock:
+            listo = self._en_curso.get(clave(datos))
+        if listo is not None:
+            listo.wait(current_app.config.get('PDF_PRERENDER_ESPERA', 1.0))
+
+    def _iniciar_hilos(self):
+        """
+        La cola de este proceso. Se crea con sus hilos en el primer turno y
+        no al importar la app: tras un fork (gunicorn --preload) los hilos del
+        padre no existen en el hijo, y los procesos del pool de
+        utils/pdf_lote.py que importan la app no necesitan hilos.
+        """
+        with self._lock:
+            if self._cola is None or self._pid != os.getpid():
+                # Primer turno, o proceso hijo: la cola y los dibujos en curso del padre no son nuestros
+                self._pid = os.getpid()
+                self._cola = queue.Queue(maxsize=self._capacidad)
+                self._en_curso = {}
+                for numero in range(self._hilos):
+                    threading.Thread(target=self._bucle, args=(self._cola,),
+                                     name=f"prerender-pdf-{numero}", daemon=True).start()
+            return self._cola
+
+    def _bucle(self, cola):
+        while True:
+            id_turno, curp, encolado = cola.get()
+            retraso = time.monotonic() - encolado
+            with self._lock:
+                self._retrasos['iniciados'] += 1
+                self._retrasos['ultimo'] = retraso
+                self._retrasos['maximo'] = max(self._retrasos['maximo'], retraso)
+                self._retrasos['suma'] += retraso
+            try:
+                with self._app.app_context():
+                    self._prerenderizar(id_turno, curp)
+            except Exception as e:  # Un comprobante fallido no debe matar al hilo
+                print(f"Error al pre-renderizar el comprobante del turno {id_turno}: {e}")
+                with self._lock:
+                    self._contadores['errores'] += 1
+
+    def _prerenderizar(self, id_turno, curp):
+        datos = self._obtener_datos(id_turno, curp)
+        if not datos:
+            with self._lock:
+                self._contadores['no_encontrados'] += 1
+            return
+
+        llave = clave(datos)
+        listo = threading.Event()
+        dibujado = []
+
+        def renderizar(d):
+            dibujado.append(True)
+            return crear_comprobante_rl(d)
+
+        with self._lock:
+            self._en_curso[llave] = listo
+        try:
+            cache_pdf.obtener(datos, renderizar)
+        finally:
+            with self._lock:
+                if self._en_curso.get(llave) is listo:
+                    del self._en_curso[llave]
+                self._contadores['renderizados' if dibujado else 'ya_en_cache'] += 1
+            listo.set()
+
+    def metricas(self):
+        """
+        Profundidad, retraso en segundos (del encolado al inicio del dibujo:
+        'ultimo', 'maximo', 'promedio', y 'actual' = antigüedad del más viejo
+        en espera) y contadores. Un retraso que crece pide más hilos.
+        'hilos' es 0 mientras este proceso no haya encolado ningún turno.
+        """
+        if self._hilos <= 0:
+            return {'activa': False}
+        with self._lock:
+            cola = self._cola if self._pid == os.getpid() else None
+        profundidad, mas_viejo = 0, None
+        if cola is not None:
+            with cola.mutex:
+                profundidad = len(cola.queue)
+                mas_viejo = cola.queue[0][2] if profundidad else None
+        with self._lock:
+            iniciados = self._retrasos['iniciados']
+            return dict(
+                self._contadores,
+                activa=True,
+                hilos=self._hilos if cola is not None else 0,
+                profundidad=profundidad,
+                capacidad=self._capacidad,
+                en_curso=len(self._en_curso),
+                retraso_actual_s=round(time.monotonic() - mas_viejo, 3) if mas_viejo is not None else 0.0,
+                retraso_ultimo_s=round(self._retrasos['ultimo'], 3),
+                retraso_maximo_s=round(self._retrasos['maximo'], 3),
+                retraso_promedio_s=round(self._retrasos['suma'] / iniciados, 3) if iniciados else 0.0,
+            )
+
+
+cola_prerender = ColaPrerender()
@@ -0,0 +1,70 @@
+# utils/version_catalogos.py
+import threading
+import time
+
+from flask import current_app
+
+from DB.db import db
+from DB.contadores import upsert_sumar
+from models.db_models import VersionCatalogos
+
+ID_VERSION = 1
+
+
+class MonitorVersionCatalogos:
+    """
+    Coordina la invalidación de los catálogos en memoria entre procesos.
+
+    Cada cambio de catálogo (CatalogoController) sube 'version_catalogos.version'
+    en su misma transacción. Cada proceso lee esa fila como máximo cada
+    CATALOGO_POLL_SECONDS y, si cambió, invalida a sus suscriptores
+    (cache_catalogos, cache_horarios). En el proceso que hizo el cambio la
+    invalidación es inmediata (notificar()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = []
+        self._version = None
+        self._siguiente_revision = 0.0
+
+    def suscribir(self, invalidar):
+        """ Registra una función sin argumentos que descarta un cache. """
+        self._suscriptores.append(invalidar)
+
+    def verificar(self):
+        """ Barato: solo consulta la BD si ya pasó el intervalo de sondeo. """
+        ahora = time.monotonic()
+        if ahora < self._siguiente_revision:
+            return
+        self._siguiente_revision = ahora + current_app.config.get('CATALOGO_POLL_SECONDS', 5)
+
+        version = self._leer_version()
+        with self._lock:
+            cambio = version != self._version
+            self._version = version
+        if cambio:
+            self._invalidar_suscriptores()
+
+    def incrementar(self):
+        """ Sube la versión dentro de la transacción en curso (antes del commit). """
+        upsert_sumar(VersionCatalogos, {'id_version': ID_VERSION}, {'version': 1})
+
+    def notificar(self):
+        """ Después del commit: invalida este proceso sin esperar al sondeo. """
+        version = self._leer_version()
+        with self._lock:
+            self._version = version
+        self._invalidar_suscriptores()
+
+    def _leer_version(self):
+        return db.session.scalar(
+            db.select(VersionCatalogos.version).where(VersionCatalogos.id_version == ID_VERSION)
+        ) or 0
+
+    def _invalidar_suscriptores(self):
+        for invalidar in self._suscriptores:
+            invalidar()
+
+
+version_catalogos = MonitorVersionCatalogos()